@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline Benchmark Suite for Rona_v5
+مجموعة قياس أداء رونا بدون اتصال
+
+Benchmarks the search-engine parsers on recorded HTML (benchmark_fixtures/),
+web requests against a local fixture server, the LLM, embeddings, vector
+database, text splitter, session store and a full agent turn against the
+Ollama stub, and the chat highlighter on 1 MB replies. Each benchmark is
+warmed up, run repeatedly and summarized (median, mean, stdev, p95).
+Results can be saved as a JSON baseline and two runs compared to flag
+regressions.
+"""
+
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import functools
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Benchmark Configurations ---
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+DEFAULT_RUNS = 20
+DEFAULT_WARMUP = 3
+DEFAULT_TOLERANCE = 0.25
+# Differences below this many milliseconds are treated as noise
+MIN_DELTA_MS = 0.5
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark
+
+    The function receives a BenchmarkEnv and yields the callable to time;
+    code after the yield runs as cleanup.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """Serve the recorded pages quietly"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkEnv:
+    """Local servers and scratch space shared by the benchmarks"""
+
+    def __init__(self):
+        self.stub = None
+        self.fixture_server = None
+        self.temp_dir = None
+
+    def __enter__(self):
+        from ollama_stub import OllamaStubServer
+
+        self.temp_dir = tempfile.mkdtemp(prefix="rona_bench_")
+        self.stub = OllamaStubServer(name="bench", reply="رونا مساعد ذكي يجيب عن أسئلة البرمجة بسرعة").start()
+        self.fixture_server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureRequestHandler)
+        self.fixture_server.daemon_threads = True
+        threading.Thread(target=self.fixture_server.serve_forever, name="bench-fixtures", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stub.stop()
+        self.fixture_server.shutdown()
+        self.fixture_server.server_close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @property
+    def fixture_url(self):
+        host, port = self.fixture_server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def scratch(self, name):
+        path = os.path.join(self.temp_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+
+@functools.lru_cache(maxsize=None)
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _embeddings(env):
+    from langchain_ollama import OllamaEmbeddings
+    return OllamaEmbeddings(model="nomic-embed-text", base_url=env.stub.url)
+
+
+def _quiet(func):
+    """Drop the progress prints of InternetSearch while timing it"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def _sample_texts(count):
+    from bs4 import BeautifulSoup
+    text = BeautifulSoup(load_fixture("page.html"), 'html.parser').get_text(" ", strip=True)
+    size = max(1, len(text) // count)
+    return [text[i * size:(i + 1) * size] for i in range(count)]
+
+
+# --- Benchmarks ---
+
+def _parser_benchmark(engine):
+    def bench(env):
+        from bs4 import BeautifulSoup
+        from internet_search import InternetSearch
+
+        search = InternetSearch()
+        html = load_fixture(f"{engine}.html")
+        parse = getattr(search, f"_parse_{engine}_results")
+        yield lambda: parse(BeautifulSoup(html, 'html.parser'))
+    return bench
+
+
+for _engine in ("google", "bing", "duckduckgo"):
+    benchmark(f"parse.{_engine}")(_parser_benchmark(_engine))
+
+
+@benchmark("web.search_request")
+def bench_search_request(env):
+    from internet_search import InternetSearch
+
+    search = InternetSearch()
+    search.search_engines['google'] = env.fixture_url + "/google.html?q={}"
+    yield _quiet(lambda: search.search_web("python programming", "google"))
+
+
+@benchmark("web.page_content")
+def bench_page_content(env):
+    from internet_search import InternetSearch
+
+    search = InternetSearch()
+    url = env.fixture_url + "/page.html"
+    yield _quiet(lambda: search.get_web_content(url))
+
+
+@benchmark("llm.chat")
+def bench_llm_chat(env):
+    from langchain_ollama import ChatOllama
+
+    llm = ChatOllama(model="mistral:7b", base_url=env.stub.url, temperature=0.3)
+    yield lambda: llm.invoke("ما هي لغة Python؟")
+
+
+@benchmark("embeddings.query")
+def bench_embed_query(env):
+    embeddings = _embeddings(env)
+    yield lambda: embeddings.embed_query("ما هي لغة Python؟")
+
+
+@benchmark("embeddings.batch_32")
+def bench_embed_batch(env):
+    embeddings = _embeddings(env)
+    texts = _sample_texts(32)
+    yield lambda: embeddings.embed_documents(texts)
+
+
+@benchmark("text_splitter.page")
+def bench_text_splitter(env):
+    from langchain_core.documents import Document
+    from rona_v5_updated import get_text_splitter
+
+    splitter = get_text_splitter()
+    documents = [Document(page_content=" ".join(_sample_texts(1) * 4), metadata={"source": "bench"})]
+    yield lambda: splitter.split_documents(documents)
+
+
+@benchmark("vector_db.add_10")
+def bench_vector_add(env):
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+    vector_db = Chroma(persist_directory=env.scratch("chroma_add"), embedding_function=_embeddings(env))
+    documents = [Document(page_content=text, metadata={"source": "bench"}) for text in _sample_texts(10)]
+    yield lambda: vector_db.add_documents(documents)
+
+
+@benchmark("vector_db.search")
+def bench_vector_search(env):
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+
+    vector_db = Chroma(persist_directory=env.scratch("chroma_search"), embedding_function=_embeddings(env))
+    vector_db.add_documents([Document(page_content=text, metadata={"source": "bench"}) for text in _sample_texts(200)])
+    yield lambda: vector_db.similarity_search("Python programming language", k=2)
+
+
+@benchmark("session_store.append")
+def bench_session_append(env):
+    from session_store import SessionStore
+
+    store = SessionStore(os.path.join(env.scratch("sessions"), "bench.db"))
+    session_id = store.create_session("bench")
+    yield lambda: store.append_message(session_id, "user", "ما هي لغة Python؟")
+    store.close()
+
+
+def _long_response(size):
+    """Build an assistant reply of about `size` characters with keywords and code blocks"""
+    paragraph = " ".join(_sample_texts(1)) + " Python و SQL عبر API مع Git.\n```print('rona')```\n"
+    return (paragraph * (size // len(paragraph) + 1))[:size]
+
+
+@benchmark("render.highlight_1mb")
+def bench_render_highlight(env):
+    from chat_renderer import highlight_segments
+
+    text = _long_response(1024 * 1024)
+    yield lambda: highlight_segments(text)
+
+
+@benchmark("render.message_1mb")
+def bench_render_message(env):
+    from chat_renderer import message_segments
+
+    message = {"role": "assistant", "content": _long_response(1024 * 1024)}
+    yield lambda: message_segments(message)
+
+
+@benchmark("render.message_1mb_cached")
+def bench_render_message_cached(env):
+    from chat_renderer import SegmentCache, configured_keywords
+
+    cache = SegmentCache(configured_keywords())
+    message = {"id": 1, "role": "assistant", "content": _long_response(1024 * 1024)}
+    cache.get(message)
+    yield lambda: cache.get(message)
+
+
+@benchmark("agent.turn")
+def bench_agent_turn(env):
+    from langchain_ollama import ChatOllama
+    from rona_v5_updated import (
+        ConversationManager, build_agent, create_agent_executor, create_agent_memory,
+        create_agent_tools, get_agent_prompt, prepare_agent_input
+    )
+    from session_store import SessionStore
+
+    store = SessionStore(os.path.join(env.scratch("agent"), "bench.db"))
+    manager = ConversationManager(store=store, session_id=store.create_session("bench"))
+    llm = ChatOllama(model="mistral:7b", base_url=env.stub.url, temperature=0.3)
+    tools = create_agent_tools()
+    executor = create_agent_executor(build_agent(llm, tools, get_agent_prompt()), tools, create_agent_memory(llm))
+    executor.verbose = False
+
+    def turn():
+        manager.add_message("user", "ما هي لغة Python؟")
+        output = executor.invoke(prepare_agent_input("ما هي لغة Python؟", None, manager))["output"]
+        manager.add_message("assistant", output)
+
+    yield turn
+    store.close()
+
+
+# --- Running and comparing ---
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(fraction * len(ordered))) - 1)]
+
+
+def summarize(samples_ms):
+    """Statistical summary of one benchmark's run times"""
+    return {
+        "runs": len(samples_ms),
+        "median_ms": round(statistics.median(samples_ms), 3),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "stdev_ms": round(statistics.stdev(samples_ms), 3) if len(samples_ms) > 1 else 0.0,
+        "min_ms": round(min(samples_ms), 3),
+        "p95_ms": round(percentile(samples_ms, 0.95), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def run_benchmark(name, env, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP):
+    """Warm up, time `runs` calls and return the summary"""
+    steps = BENCHMARKS[name](env)
+    func = next(steps)
+    try:
+        for _ in range(warmup):
+            func()
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        steps.close()
+    return summarize(samples)
+
+
+def select_benchmarks(patterns=None):
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+
+def run_metadata(runs, warmup):
+    """Describe the machine and settings of a run, stored next to its results"""
+    from hardware_tuner import detect_hardware, hardware_fingerprint
+
+    return {
+        "created_at": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "hardware": hardware_fingerprint(detect_hardware()),
+        "runs": runs,
+        "warmup": warmup,
+    }
+
+
+def run_suite(names=None, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP, on_result=None):
+    """Run benchmarks and return a result document suitable as a baseline"""
+    names = names or list(BENCHMARKS)
+    results = {}
+    with BenchmarkEnv() as env:
+        for name in names:
+            try:
+                results[name] = run_benchmark(name, env, runs, warmup)
+            except Exception as e:
+                results[name] = {"error": str(e)[:100]}
+            if on_result is not None:
+                on_result(name, results[name])
+    return {"meta": run_metadata(runs, warmup), "results": results}
+
+
+def compare_runs(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Compare medians of two runs
+
+    A benchmark regresses when its median grows by more than `tolerance` and
+    by more than twice the baseline's standard deviation (and MIN_DELTA_MS),
+    so jitter on fast benchmarks is not reported.
+    """
+    regressions, improvements = [], []
+    for name, after in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or "error" in before or "error" in after:
+            continue
+        old, new = before["median_ms"], after["median_ms"]
+        delta = new - old
+        noise = max(2 * before.get("stdev_ms", 0.0), MIN_DELTA_MS)
+        change = f"{name}: {old:.2f} -> {new:.2f} ms ({(new / old - 1) * 100 if old else 0:+.0f}%)"
+        if new > old * (1 + tolerance) and delta > noise:
+            regressions.append(change)
+        elif new < old / (1 + tolerance) and -delta > noise:
+            improvements.append(change)
+    return regressions, improvements
+
+
+def print_result(name, result):
+    if "error" in result:
+        print(f"   {name:<24} ❌ {result['error']}")
+        return
+    print(f"   {name:<24} {result['median_ms']:>10.2f} {result['mean_ms']:>10.2f} "
+          f"{result['stdev_ms']:>9.2f} {result['p95_ms']:>10.2f}")
+
+
+def print_comparison(baseline, current, tolerance):
+    """Print the comparison and return True when nothing regressed"""
+    if baseline["meta"].get("hardware") != current["meta"].get("hardware"):
+        print("⚠️ خط الأساس مسجل على جهاز مختلف، قد لا تكون المقارنة دقيقة")
+    regressions, improvements = compare_runs(baseline, current, tolerance)
+    for change in improvements:
+        print(f"   🚀 {change}")
+    if regressions:
+        print("\n❌ تراجع في الأداء:")
+        for change in regressions:
+            print(f"   {change}")
+        return False
+    print("\n✅ لا يوجد تراجع مقارنة بخط الأساس")
+    return True
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Rona_v5 benchmarks")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed runs first")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="benchmarks to run (glob, e.g. 'parse.*')")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a saved JSON baseline")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two saved runs without running")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed median slowdown before failing")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+
+    if args.diff:
+        print(f"📊 مقارنة {args.diff[0]} مع {args.diff[1]}")
+        return 0 if print_comparison(load_results(args.diff[0]), load_results(args.diff[1]), args.tolerance) else 1
+
+    names = select_benchmarks(args.only)
+    if not names:
+        print("❌ لا توجد قياسات مطابقة")
+        return 1
+
+    print(f"🚀 تشغيل {len(names)} قياس ({args.warmup} تسخين + {args.runs} مرات لكل قياس)...\n")
+    print(f"   {'القياس':<24} {'median ms':>10} {'mean ms':>10} {'stdev':>9} {'p95 ms':>10}")
+    current = run_suite(names, args.runs, args.warmup, on_result=print_result)
+    failed = [name for name, result in current["results"].items() if "error" in result]
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 تم حفظ النتائج في {args.save}")
+
+    if args.compare and not print_comparison(load_results(args.compare), current, args.tolerance):
+        return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Cancellation Tokens for Rona_v5
+إلغاء الطلبات الجارية في رونا
+
+A CancellationToken is created for every request run by the LLM scheduler and
+is visible to the code running it through current_token(). Cancelling it runs
+the callbacks registered with on_cancel, which close in-flight HTTP responses,
+and makes the LangChain callback handler stop the agent at its next step or
+streamed token, which closes the stream to Ollama so the model stops generating.
+"""
+
+import contextlib
+import threading
+
+_current = threading.local()
+
+
+class OperationCancelled(BaseException):
+    """Raised inside work whose token has been cancelled
+
+    Like KeyboardInterrupt it derives from BaseException, so the broad
+    `except Exception` handlers of tools and parsers let it through.
+    """
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag with callbacks"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Flag the token and run its callbacks once; return False if it was already cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancellation callback failed: {str(e)[:100]}")
+        return True
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """Call callback() when the token is cancelled (now, if it already is)
+
+        Returns a function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def current_token():
+    """Return the token of the work running on this thread, or None"""
+    return getattr(_current, "token", None)
+
+
+@contextlib.contextmanager
+def use_token(token):
+    """Make token the current token of this thread for the duration of the block"""
+    previous = current_token()
+    _current.token = token
+    try:
+        yield token
+    finally:
+        _current.token = previous
+
+
+def callback_handler(token):
+    """Return a LangChain callback handler that stops a run once token is cancelled
+
+    It checks at every chain, LLM and tool start, agent action and streamed
+    token; raising from on_llm_new_token closes the HTTP stream to Ollama.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class CancellationCallbackHandler(BaseCallbackHandler):
+        """Raises OperationCancelled from inside the run when its token is cancelled"""
+
+        raise_error = True
+
+        def __init__(self, cancel_token):
+            self.cancel_token = cancel_token
+
+        def on_chain_start(self, serialized, inputs, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+        def on_llm_new_token(self, token, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+        def on_agent_action(self, action, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+        def on_tool_start(self, serialized, input_str, **kwargs):
+            self.cancel_token.raise_if_cancelled()
+
+    return CancellationCallbackHandler(token)
@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+"""
+Chat Renderer for Rona_v5
+عارض المحادثة لرونا
+
+Draws chat messages into the transcript textbox one message at a time instead
+of clearing and redrawing the whole conversation. Each rendered message carries
+its own text tag, so a new turn only appends its messages and a single message
+can be redrawn or removed in place. The cost of a turn no longer grows with
+the length of the transcript.
+
+Assistant replies are parsed once into styled segments (code fences with their
+language, inline code, headings, list items and keywords) and the segments are
+cached by message, so redrawing or paging a message back in does not parse it
+again.
+
+VirtualChatView keeps only a window of messages in the textbox and pages older
+or newer ones in from the session store as the user scrolls near an edge, so
+very long sessions cost the same memory and scroll time as short ones.
+"""
+
+import functools
+import itertools
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import metrics
+
+# --- Renderer Configurations ---
+PAGE_SIZE = 40
+# At most this many messages stay in the textbox; the rest are paged in on demand
+MAX_RENDERED_MESSAGES = 120
+# Page in more messages when the view is this close (as a fraction) to an edge
+EDGE_THRESHOLD = 0.15
+# Parsed segments are kept for this many messages
+SEGMENT_CACHE_SIZE = 1000
+HIGHLIGHT_KEYWORDS = ["Python", "JavaScript", "HTML", "CSS", "PHP", "SQL", "API", "Git"]
+HIGHLIGHT_KEYWORDS_ENV = "RONA_HIGHLIGHT_KEYWORDS"
+USER_PREFIX = "أنت: "
+ASSISTANT_PREFIX = "Rona_v5:\n"
+LIST_BULLET = "• "
+
+# A fence may name its language on the opening line; an unclosed fence runs to the end
+CODE_FENCE_PATTERN = re.compile(r"```(?:([\w+#.-]+)?[ \t]*\n)?(.*?)(?:```|\Z)", re.S)
+INLINE_CODE_PATTERN = re.compile(r"`([^`\n]+)`")
+HEADING_PATTERN = re.compile(r"(#{1,6})[ \t]+(.*)")
+LIST_ITEM_PATTERN = re.compile(r"([ \t]*)(?:([-*+])|(\d+[.)]))[ \t]+")
+
+TAG_STYLES = {
+    "user": {"justify": "right", "foreground": "#FFFFFF"},
+    "ai": {"justify": "left", "foreground": "#FF8C00"},
+    "code_block": {"justify": "left", "background": "#333333", "foreground": "#87CEEB"},
+    "code_lang": {"justify": "left", "background": "#333333", "foreground": "#808080"},
+    "inline_code": {"background": "#333333", "foreground": "#87CEEB"},
+    "heading": {"justify": "left", "foreground": "#FFB347", "spacing1": 6, "spacing3": 2},
+    "list_marker": {"foreground": "#FFB347"},
+    "system": {"justify": "center", "foreground": "#808080"},
+    "highlight": {"foreground": "#4a90e2"},
+    "warning": {"foreground": "#ff3b30"},
+}
+
+
+def message_key(message):
+    """Return a stable key for a stored message, or None for transient notices"""
+    if message.get("id") is not None:
+        return f"id:{message['id']}"
+    if message.get("timestamp"):
+        return f"{message.get('role')}:{message['timestamp']}"
+    return None
+
+
+def configured_keywords():
+    """Return the keywords to highlight from RONA_HIGHLIGHT_KEYWORDS (comma-separated), or the defaults"""
+    value = os.environ.get(HIGHLIGHT_KEYWORDS_ENV, "")
+    keywords = [keyword.strip() for keyword in value.split(",") if keyword.strip()]
+    return keywords or HIGHLIGHT_KEYWORDS
+
+
+@functools.lru_cache(maxsize=16)
+def keyword_pattern(keywords):
+    """Compile one alternation regex for a tuple of keywords, or None if it is empty
+
+    Longer keywords come first so "JavaScript" wins over "Java" at the same position.
+    """
+    ordered = sorted({keyword for keyword in keywords if keyword}, key=len, reverse=True)
+    if not ordered:
+        return None
+    return re.compile("|".join(re.escape(keyword) for keyword in ordered))
+
+
+def highlight_segments(text, keywords=HIGHLIGHT_KEYWORDS):
+    """Split text into (text, tag) pairs with the keywords tagged as highlights
+
+    All keywords are found in a single left-to-right pass over the text.
+    """
+    pattern = keyword_pattern(tuple(keywords))
+    segments = []
+    position = 0
+    if pattern is not None:
+        for match in pattern.finditer(text):
+            if match.start() > position:
+                segments.append((text[position:match.start()], "ai"))
+            segments.append((match.group(), "highlight"))
+            position = match.end()
+    if position < len(text):
+        segments.append((text[position:], "ai"))
+    return segments
+
+
+def merge_segments(segments):
+    """Join adjacent segments that share a tag and drop empty ones"""
+    merged = []
+    for text, tag in segments:
+        if not text:
+            continue
+        if merged and merged[-1][1] == tag:
+            merged[-1] = (merged[-1][0] + text, tag)
+        else:
+            merged.append((text, tag))
+    return merged
+
+
+def inline_segments(text, keywords=HIGHLIGHT_KEYWORDS):
+    """Split one line of prose into inline code spans and highlighted text"""
+    segments = []
+    position = 0
+    for match in INLINE_CODE_PATTERN.finditer(text):
+        segments.extend(highlight_segments(text[position:match.start()], keywords))
+        segments.append((match.group(1), "inline_code"))
+        position = match.end()
+    segments.extend(highlight_segments(text[position:], keywords))
+    return segments
+
+
+def prose_segments(text, keywords=HIGHLIGHT_KEYWORDS):
+    """Parse text outside code fences line by line into headings, list items and inline text"""
+    segments = []
+    for line in text.splitlines(keepends=True):
+        body = line.rstrip("\n")
+        newline = line[len(body):]
+        heading = HEADING_PATTERN.fullmatch(body)
+        if heading:
+            segments.append((heading.group(2) + newline, "heading"))
+            continue
+        item = LIST_ITEM_PATTERN.match(body)
+        if item:
+            indent, bullet, number = item.groups()
+            segments.append((indent + (LIST_BULLET if bullet else number + " "), "list_marker"))
+            body = body[item.end():]
+        segments.extend(inline_segments(body, keywords))
+        segments.append((newline, "ai"))
+    return segments
+
+
+def markdown_segments(content, keywords=HIGHLIGHT_KEYWORDS):
+    """Parse an assistant reply into (text, tag) pairs"""
+    segments = []
+    position = 0
+    for fence in CODE_FENCE_PATTERN.finditer(content):
+        segments.extend(prose_segments(content[position:fence.start()], keywords))
+        language, code = fence.group(1), fence.group(2)
+        if language:
+            segments.append((f"{language}\n", "code_lang"))
+        if code.endswith("\n"):
+            code = code[:-1]
+        segments.append((f"{code}\n", "code_block"))
+        position = fence.end()
+    segments.extend(prose_segments(content[position:], keywords))
+    return segments
+
+
+def message_segments(message, keywords=HIGHLIGHT_KEYWORDS):
+    """Return the (text, tag) pairs that make up one rendered message"""
+    content = message["content"]
+    if message["role"] == "user":
+        return [(f"{USER_PREFIX}{content}\n\n", "user")]
+
+    segments = [(ASSISTANT_PREFIX, "ai")]
+    segments.extend(markdown_segments(content, keywords))
+    segments.append(("\n", None))
+    return merge_segments(segments)
+
+
+class SegmentCache:
+    """Parsed segments of recent messages, keyed by message key
+
+    Entries remember the content they were parsed from, so an edited message
+    is parsed again. Safe to fill from a worker thread while the UI reads it.
+    """
+
+    def __init__(self, keywords, maxsize=SEGMENT_CACHE_SIZE):
+        self.keywords = keywords
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, message, key=None):
+        """Return the segments of a message, parsing it only if it is not cached"""
+        key = key or message_key(message)
+        if key is None:
+            return message_segments(message, self.keywords)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == message["content"]:
+                self._entries.move_to_end(key)
+                metrics.record_cache("chat_segments", True)
+                return entry[1]
+        metrics.record_cache("chat_segments", False)
+        segments = message_segments(message, self.keywords)
+        with self._lock:
+            self._entries[key] = (message["content"], segments)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return segments
+
+
+class ChatRenderer:
+    """Append-only rendering of chat messages with per-message updates
+
+    `keys` lists the rendered messages in display order; each key maps to a
+    text tag that spans exactly that message, so its position can be looked up
+    and its text replaced without touching the rest of the widget.
+    """
+
+    def __init__(self, textbox, keywords=None, scroll=None):
+        self.textbox = textbox
+        # Called instead of see("end") after appending, so a UI queue can do it once per frame
+        self.scroll = scroll or (lambda: self.textbox.see("end"))
+        # CTkTextbox.insert takes a single text/tags pair; the tk.Text inside it takes many
+        self._text = getattr(textbox, "_textbox", textbox)
+        self.keywords = keywords if keywords is not None else configured_keywords()
+        self.segments = SegmentCache(self.keywords)
+        self.keys = []
+        self._tags = {}
+        self._counter = itertools.count()
+        for tag, style in TAG_STYLES.items():
+            self.textbox.tag_config(tag, **style)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._tags
+
+    def reset(self):
+        """Clear the widget and forget every rendered message"""
+        self.textbox.delete("1.0", "end")
+        for tag in self._tags.values():
+            self.textbox.tag_delete(tag)
+        self.keys = []
+        self._tags = {}
+
+    def prepare(self, message):
+        """Parse a message ahead of rendering; may be called from a worker thread"""
+        self.segments.get(message)
+
+    def _insert(self, index, entries):
+        # All segments of the messages go to Tk in one insert call as text/tags pairs
+        args = []
+        for message, tag, key in entries:
+            for text, style in self.segments.get(message, key):
+                args += [text, (style, tag) if style else (tag,)]
+        if args:
+            self._text.insert(index, *args)
+
+    def _new_tag(self, message, key):
+        key = key or message_key(message) or f"local:{next(self._counter)}"
+        if key in self._tags:
+            return key, None
+        tag = f"msg-{next(self._counter)}"
+        self._tags[key] = tag
+        return key, tag
+
+    def _new_entries(self, messages):
+        entries = []
+        for message in messages:
+            key, tag = self._new_tag(message, None)
+            if tag is not None:
+                entries.append((message, tag, key))
+        return entries
+
+    def extend(self, messages, see=True):
+        """Render messages at the end of the transcript in one insert; return how many were added"""
+        entries = self._new_entries(messages)
+        self._insert("end-1c", entries)
+        self.keys.extend(key for _, _, key in entries)
+        if see and entries:
+            self.scroll()
+        return len(entries)
+
+    def extend_front(self, messages):
+        """Render messages, oldest first, at the start of the transcript in one insert"""
+        entries = self._new_entries(messages)
+        self._insert("1.0", entries)
+        self.keys[:0] = [key for _, _, key in entries]
+        return len(entries)
+
+    def append(self, message, key=None, see=True):
+        """Render a message at the end of the transcript and return its key"""
+        key, tag = self._new_tag(message, key)
+        if tag is None:
+            return key
+        self._insert("end-1c", [(message, tag, key)])
+        self.keys.append(key)
+        if see:
+            self.scroll()
+        return key
+
+    def prepend(self, message, key=None):
+        """Render a message at the start of the transcript and return its key"""
+        key, tag = self._new_tag(message, key)
+        if tag is None:
+            return key
+        self._insert("1.0", [(message, tag, key)])
+        self.keys.insert(0, key)
+        return key
+
+    def sync(self, messages):
+        """Append the messages at the end of `messages` that are not rendered yet
+
+        Walks back from the newest message to the last one already shown, so
+        the work done is proportional to the number of new messages only.
+        """
+        pending = []
+        for message in reversed(messages):
+            key = message_key(message)
+            if key is not None and key in self._tags:
+                break
+            pending.append(message)
+        pending.reverse()
+        return self.extend(pending)
+
+    def index_of(self, key):
+        """Return the text index where a rendered message starts, or None"""
+        tag = self._tags.get(key)
+        ranges = self.textbox.tag_ranges(tag) if tag else ()
+        return str(ranges[0]) if ranges else None
+
+    def update(self, key, message):
+        """Redraw one rendered message in place"""
+        tag = self._tags.get(key)
+        ranges = self.textbox.tag_ranges(tag) if tag else ()
+        if not ranges:
+            return False
+        start = self.textbox.index(ranges[0])
+        self.textbox.delete(ranges[0], ranges[-1])
+        self._insert(start, [(message, tag, key)])
+        return True
+
+    def remove(self, key):
+        """Delete one rendered message from the widget"""
+        tag = self._tags.pop(key, None)
+        if tag is None:
+            return False
+        ranges = self.textbox.tag_ranges(tag)
+        if ranges:
+            self.textbox.delete(ranges[0], ranges[-1])
+        self.textbox.tag_delete(tag)
+        self.keys.remove(key)
+        return True
+
+
+def _stored_id(key):
+    return int(key[3:]) if key.startswith("id:") else None
+
+
+class VirtualChatView:
+    """Windowed view of one session's transcript backed by the session store
+
+    Only up to `max_messages` messages are kept in the textbox. When the view
+    is scrolled near the top the previous page is loaded from the store and
+    the newest messages are dropped, and the reverse near the bottom. Feed it
+    the textbox's yscrollcommand fractions through on_yview.
+    """
+
+    def __init__(self, renderer, store, session_id=None, page_size=PAGE_SIZE,
+                 max_messages=MAX_RENDERED_MESSAGES, schedule=None):
+        self.renderer = renderer
+        self.textbox = renderer.textbox
+        self.store = store
+        self.session_id = session_id
+        self.page_size = page_size
+        self.max_messages = max(max_messages, 2 * page_size)
+        # Paging is deferred so it never runs inside a scroll callback
+        self.schedule = schedule or (lambda callback: callback())
+        self.has_older = False
+        self.has_newer = False
+        self._view = (0.0, 1.0)
+        self._pending = False
+
+    def _edge_id(self, newest):
+        keys = reversed(self.renderer.keys) if newest else self.renderer.keys
+        for key in keys:
+            stored_id = _stored_id(key)
+            if stored_id is not None:
+                return stored_id
+        return None
+
+    def load(self, session_id=None):
+        """Show the latest page of a session"""
+        if session_id is not None:
+            self.session_id = session_id
+        self.renderer.reset()
+        messages = self.store.get_messages(self.session_id, limit=self.page_size)
+        self.renderer.extend(messages, see=False)
+        self.has_older = len(messages) == self.page_size
+        self.has_newer = False
+        self.renderer.scroll()
+        return len(messages)
+
+    def sync(self, messages):
+        """Show new messages of the conversation, jumping back to the latest page if needed"""
+        if self.has_newer:
+            return self.load()
+        added = self.renderer.sync(messages)
+        if self._trim(from_top=True):
+            self.has_older = True
+        return added
+
+    def on_yview(self, first, last):
+        """Scroll callback: page in more messages when the view nears an edge"""
+        self._view = (float(first), float(last))
+        if not self._pending and self._wants_page():
+            self._pending = True
+            self.schedule(self._page)
+
+    def _wants_page(self):
+        first, last = self._view
+        return (first <= EDGE_THRESHOLD and self.has_older) or (last >= 1 - EDGE_THRESHOLD and self.has_newer)
+
+    def _page(self):
+        self._pending = False
+        first, _ = self._view
+        if first <= EDGE_THRESHOLD and self.has_older:
+            self.page_older()
+        elif self.has_newer:
+            self.page_newer()
+
+    def _trim(self, from_top):
+        """Drop messages beyond max_messages from one end; True if stored messages were dropped"""
+        dropped = False
+        while len(self.renderer) > self.max_messages:
+            key = self.renderer.keys[0] if from_top else self.renderer.keys[-1]
+            dropped = dropped or _stored_id(key) is not None
+            self.renderer.remove(key)
+        return dropped
+
+    def _keep_view(self):
+        """Mark the first visible character so the view can be restored after paging"""
+        self.textbox.mark_set("rona_view", "@0,0")
+
+    def _restore_view(self):
+        self.textbox.yview("rona_view")
+        self.textbox.mark_unset("rona_view")
+
+    def page_older(self):
+        """Load the page before the oldest rendered message; return how many were added"""
+        oldest_id = self._edge_id(newest=False)
+        if oldest_id is None:
+            self.has_older = False
+            return 0
+        messages = self.store.get_messages(self.session_id, limit=self.page_size, before_id=oldest_id)
+        self.has_older = len(messages) == self.page_size
+        if not messages:
+            return 0
+        self._keep_view()
+        self.renderer.extend_front(messages)
+        if self._trim(from_top=False):
+            self.has_newer = True
+        self._restore_view()
+        return len(messages)
+
+    def page_newer(self):
+        """Load the page after the newest rendered message; return how many were added"""
+        newest_id = self._edge_id(newest=True)
+        if newest_id is None:
+            self.has_newer = False
+            return 0
+        messages = self.store.get_messages(self.session_id, limit=self.page_size, after_id=newest_id)
+        self.has_newer = len(messages) == self.page_size
+        if not messages:
+            return 0
+        self._keep_view()
+        self.renderer.extend(messages, see=False)
+        if self._trim(from_top=True):
+            self.has_older = True
+        self._restore_view()
+        return len(messages)
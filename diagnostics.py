@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Background Diagnostics for Rona_v5
+فحوصات رونا في الخلفية
+
+Self-tests such as the web-search check and the database status used to run
+on the Tk main thread and could freeze the window for the length of a network
+timeout. DiagnosticsRunner runs them on background threads instead: each task
+can report progress while it runs, gets a deadline after which it is reported
+as timed out, and only one task of a given name runs at a time.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Diagnostics Configurations ---
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 15.0
+WEB_TEST_QUERY = "أحدث إصدار من Python"
+
+# --- Task States ---
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_TIMED_OUT = "timed_out"
+
+
+class DiagnosticTask:
+    """One diagnostic running in the background
+
+    on_progress(task, message) and on_done(task) are called from background
+    threads; post them to the UI queue before touching widgets. on_done is
+    called exactly once, when the check finishes, fails or times out,
+    whichever comes first.
+    """
+
+    def __init__(self, name, timeout, on_progress=None, on_done=None):
+        self.name = name
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.state = STATE_RUNNING
+        self.result = None
+        self.error = None
+        self.progress = []
+        self.started_at = time.monotonic()
+        self.duration = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def report(self, message):
+        """Record a progress message; ignored once the task has finished"""
+        if self.finished:
+            return
+        self.progress.append(message)
+        if self.on_progress is not None:
+            self.on_progress(self, message)
+
+    def _finish(self, state, result=None, error=None):
+        with self._lock:
+            if self.finished:
+                return False
+            self.state = state
+            self.result = result
+            self.error = error
+            self.duration = time.monotonic() - self.started_at
+            self._done.set()
+        if self.on_done is not None:
+            self.on_done(self)
+        return True
+
+
+class DiagnosticsRunner:
+    """Thread pool for diagnostics with per-task deadlines"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="diagnostics")
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def running(self, name):
+        """Return the task of this name that is still running, if any"""
+        with self._lock:
+            task = self._tasks.get(name)
+        return task if task is not None and not task.finished else None
+
+    def run(self, name, check, timeout=DEFAULT_TIMEOUT, on_progress=None, on_done=None):
+        """Start check(task) in the background and return its DiagnosticTask
+
+        If a task with the same name is still running it is returned instead
+        of starting another one.
+        """
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is not None and not task.finished:
+                return task
+            task = DiagnosticTask(name, timeout, on_progress, on_done)
+            self._tasks[name] = task
+
+        timer = threading.Timer(timeout, task._finish, args=(STATE_TIMED_OUT,))
+        timer.daemon = True
+        timer.start()
+
+        def execute():
+            try:
+                result = check(task)
+            except Exception as e:
+                task._finish(STATE_FAILED, error=str(e)[:100])
+            else:
+                task._finish(STATE_DONE, result=result)
+            finally:
+                timer.cancel()
+
+        self._pool.submit(execute)
+        return task
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def web_search_check(search, query=WEB_TEST_QUERY, timeout=None):
+    """Return a check that queries every search engine in parallel, reporting each as it finishes"""
+    def check(task):
+        return search.check_engines(query, timeout=timeout, on_result=task.report)
+    return check
+
+
+def database_status_check(vector_db):
+    """Return a check that counts the documents in the vector database"""
+    def check(task):
+        started = time.perf_counter()
+        total = vector_db._collection.count()
+        return {"documents": total, "latency": time.perf_counter() - started}
+    return check
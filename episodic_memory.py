@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Long-term Episodic Memory for Rona_v5
+ذاكرة المحادثات طويلة المدى لرونا
+
+Conversation turns that fall out of the short conversation window are embedded
+on a background thread into a dedicated Chroma collection, and recalled later by
+relevance within a bounded time window.
+"""
+
+import datetime
+import queue
+import threading
+import time
+import uuid
+
+try:
+    from langchain_chroma import Chroma
+except ImportError:
+    from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from llm_scheduler import PRIORITY_SUMMARIZATION
+
+# --- Episodic Memory Configurations ---
+EPISODIC_COLLECTION_NAME = "rona_episodic_memory"
+EPISODIC_MAX_AGE_DAYS = 90
+EPISODIC_MIN_RELEVANCE = 0.35
+EPISODIC_MAX_RESULTS = 3
+EPISODIC_MAX_CHARS = 1200
+
+
+def _timestamp_to_epoch(timestamp):
+    """Convert an ISO timestamp from the conversation history to epoch seconds"""
+    try:
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class EpisodicMemory:
+    """Indexes evicted conversation turns and recalls them by time and relevance"""
+
+    def __init__(self, embeddings, persist_directory,
+                 collection_name=EPISODIC_COLLECTION_NAME,
+                 max_age_days=EPISODIC_MAX_AGE_DAYS,
+                 min_relevance=EPISODIC_MIN_RELEVANCE,
+                 max_results=EPISODIC_MAX_RESULTS,
+                 max_chars=EPISODIC_MAX_CHARS,
+                 scheduler=None):
+        self.scheduler = scheduler
+        self.max_age_days = max_age_days
+        self.min_relevance = min_relevance
+        self.max_results = max_results
+        self.max_chars = max_chars
+
+        # Cosine space gives comparable relevance scores for any embeddings model
+        self.vector_db = Chroma(
+            collection_name=collection_name,
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_metadata={"hnsw:space": "cosine"}
+        )
+
+        self._queue = queue.Queue()
+        # A user message waiting for its reply, per session, so turns never pair across sessions
+        self._pending_user_messages = {}
+        self._worker = threading.Thread(target=self._index_worker, daemon=True)
+        self._worker.start()
+
+    def remember(self, messages, session_id=None, user_id=None):
+        """Queue evicted messages for background indexing"""
+        if messages:
+            self._queue.put((list(messages), session_id, user_id))
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been indexed"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _index_worker(self):
+        """Embed queued messages as user/assistant episodes"""
+        while True:
+            messages, session_id, user_id = self._queue.get()
+            try:
+                episodes = self._build_episodes(messages, session_id, user_id)
+                if episodes:
+                    ids = [str(uuid.uuid4()) for _ in episodes]
+                    if self.scheduler is not None:
+                        # Embedding calls wait behind interactive turns
+                        self.scheduler.submit(
+                            self.vector_db.add_documents, episodes, ids=ids,
+                            priority=PRIORITY_SUMMARIZATION, block=True
+                        ).result()
+                    else:
+                        self.vector_db.add_documents(episodes, ids=ids)
+            except Exception as e:
+                print(f"⚠️ Episodic memory indexing failed: {str(e)[:100]}")
+            finally:
+                self._queue.task_done()
+
+    def _build_episodes(self, messages, session_id, user_id=None):
+        """Pair each user message with the assistant reply that followed it"""
+        episodes = []
+        for msg in messages:
+            if msg.get("role") == "user":
+                pending = self._pending_user_messages.get(session_id)
+                if pending is not None:
+                    episodes.append(self._make_episode(pending, None, session_id, user_id))
+                self._pending_user_messages[session_id] = msg
+            elif msg.get("role") == "assistant":
+                pending = self._pending_user_messages.pop(session_id, None)
+                episodes.append(self._make_episode(pending, msg, session_id, user_id))
+        return episodes
+
+    def _make_episode(self, user_msg, assistant_msg, session_id, user_id=None):
+        """Create a single document for one conversation turn"""
+        parts = []
+        if user_msg is not None:
+            parts.append(f"User: {user_msg['content']}")
+        if assistant_msg is not None:
+            parts.append(f"Assistant: {assistant_msg['content']}")
+
+        anchor = user_msg if user_msg is not None else assistant_msg
+        timestamp = anchor.get("timestamp") or datetime.datetime.now().isoformat()
+        metadata = {
+            "timestamp": timestamp,
+            "timestamp_epoch": _timestamp_to_epoch(timestamp),
+        }
+        if session_id:
+            metadata["session_id"] = session_id
+        if user_id:
+            metadata["user_id"] = user_id
+        return Document(page_content="\n".join(parts), metadata=metadata)
+
+    def recall(self, query, k=None, session_id=None, user_id=None):
+        """Return relevant past episodes formatted for the prompt, within the configured budget
+
+        With a user_id only that user's episodes are searched, otherwise with a
+        session_id only that session's.
+        """
+        k = k or self.max_results
+        cutoff = time.time() - self.max_age_days * 86400
+        conditions = [{"timestamp_epoch": {"$gte": cutoff}}]
+        if user_id:
+            conditions.append({"user_id": user_id})
+        elif session_id:
+            conditions.append({"session_id": session_id})
+        where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+        try:
+            results = self.vector_db.similarity_search_with_score(query, k=k, filter=where)
+        except Exception as e:
+            print(f"⚠️ Episodic memory recall failed: {str(e)[:100]}")
+            return ""
+
+        recalled = []
+        used_chars = 0
+        for doc, distance in results:
+            if 1.0 - distance < self.min_relevance:
+                continue
+            date = doc.metadata.get("timestamp", "")[:10]
+            entry = f"[{date}] {doc.page_content}"
+            remaining = self.max_chars - used_chars
+            if remaining <= 0:
+                break
+            entry = entry[:remaining]
+            recalled.append(entry)
+            used_chars += len(entry)
+
+        return "\n\n".join(recalled)
+
+    def count(self):
+        """Return the number of indexed episodes"""
+        try:
+            return self.vector_db._collection.count()
+        except Exception:
+            return 0
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI Benchmark for Rona_v5
+قياس أداء واجهة رونا
+
+test_gui.py checks that widgets can be created; this benchmark measures what
+the user feels. It opens the real RonaApp window with a replay agent that
+answers with a recorded conversation (benchmark_fixtures/conversation.json:
+Markdown, code blocks and highlighted keywords) and drives it like a user:
+each message is typed and sent, and the reply travels through the worker
+thread, the UI queue and the chat renderer until the window is painted.
+
+Measured per turn: input-to-paint latency, UI frame time, the cost of
+update_chat_history and display_agent_response, and process memory at
+intervals over thousands of turns. Without a display an Xvfb virtual display
+is started, so it runs on servers and in CI.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_suite import FIXTURES_DIR, load_results, print_comparison, print_result, run_metadata, summarize
+
+# --- GUI Benchmark Configurations ---
+CONVERSATION_FIXTURE = "conversation.json"
+DEFAULT_TURNS = 2000
+DEFAULT_WARMUP = 20
+DEFAULT_TOLERANCE = 0.25
+# A recorded notice (web-search result, database status) is shown every this many turns
+NOTICE_EVERY = 10
+MEMORY_SAMPLES = 20
+TURN_TIMEOUT = 10.0
+XVFB_SCREEN = "1280x800x24"
+
+
+def load_conversation(name=CONVERSATION_FIXTURE):
+    """Return the recorded turns and notices"""
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class VirtualDisplay:
+    """An Xvfb server on a free display number, exported as DISPLAY while it runs"""
+
+    def __init__(self, xvfb="Xvfb", screen=XVFB_SCREEN):
+        self.xvfb = xvfb
+        self.screen = screen
+        self.process = None
+        self.display = None
+        self._previous = None
+
+    def start(self):
+        path = shutil.which(self.xvfb)
+        if path is None:
+            raise RuntimeError(f"{self.xvfb} is not installed (apt install xvfb) and no DISPLAY is set")
+
+        # Xvfb picks a free display itself and writes its number to the pipe once it accepts clients
+        read_fd, write_fd = os.pipe()
+        self.process = subprocess.Popen(
+            [path, "-displayfd", str(write_fd), "-screen", "0", self.screen, "-nolisten", "tcp"],
+            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            number = f.readline().strip()
+        if not number:
+            self.process.kill()
+            self.process.wait()
+            raise RuntimeError(f"{self.xvfb} exited before opening a display")
+
+        self.display = f":{number}"
+        self._previous = os.environ.get("DISPLAY")
+        os.environ["DISPLAY"] = self.display
+        return self
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self._previous is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = self._previous
+        self.process.terminate()
+        self.process.wait()
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def display_context():
+    """Use the current display, or start a virtual one"""
+    if os.environ.get("DISPLAY"):
+        return contextlib.nullcontext()
+    return VirtualDisplay()
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Run in a temporary directory so the app's session database is thrown away"""
+    previous = os.getcwd()
+    path = tempfile.mkdtemp(prefix="rona_gui_bench_")
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class ReplayAgent:
+    """Stands in for the agent executor and answers with the recorded replies"""
+
+    def __init__(self, turns, delay=0.0):
+        self.replies = {turn["user"]: turn["assistant"] for turn in turns}
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, agent_input, config=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return {"output": self.replies.get(agent_input["input"], "لا يوجد رد مسجل لهذه الرسالة.")}
+
+
+class MethodTimer:
+    """Replace obj.name with a wrapper that records each call's duration in ms
+
+    Only calls for which keep(result) is true are recorded.
+    """
+
+    def __init__(self, obj, name, keep=None):
+        self.samples = []
+        original = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            result = original(*args, **kwargs)
+            if keep is None or keep(result):
+                self.samples.append((time.perf_counter() - started) * 1000)
+            return result
+
+        setattr(obj, name, timed)
+
+    def reset(self):
+        self.samples = []
+
+
+def create_replay_app(agent):
+    """Create a RonaApp whose components are the replay agent instead of Ollama and Chroma"""
+    from lazy_components import ComponentLoader
+    from rona_v5_updated import RonaApp
+
+    class ReplayApp(RonaApp):
+        def initialize_agent(self):
+            self.components = ComponentLoader()
+            self.components.add("agent", lambda: agent)
+            self.components.add("episodic_memory", lambda: None)
+            for name in ("agent", "episodic_memory"):
+                self.components.get(name)
+            self.agent_executor = agent
+            self.update_chat_history(full=True)
+
+    return ReplayApp(fast_start=True)
+
+
+def process_memory_mb():
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def wait_until(app, condition, timeout=TURN_TIMEOUT):
+    """Run the Tk event loop until condition() holds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("The window did not finish the turn in time")
+        app.update()
+        time.sleep(0.001)
+
+
+def send_and_wait(app, message, reply):
+    """Type and send a message and return the ms until its reply has been painted"""
+    started = time.perf_counter()
+    app.insert_input(message)
+    app.send_message()
+
+    def painted():
+        history = app.conversation_manager.messages()
+        return (not app.turn_queue.busy and not len(app.ui_queue) and bool(history)
+                and history[-1]["role"] == "assistant" and history[-1]["content"] == reply)
+
+    wait_until(app, painted)
+    app.update_idletasks()
+    return (time.perf_counter() - started) * 1000
+
+
+def replay(app, conversation, turns, warmup=DEFAULT_WARMUP, on_progress=None):
+    """Replay the recorded conversation for `turns` turns and return the measurements"""
+    recorded, notices = conversation["turns"], conversation["notices"]
+    frames = MethodTimer(app.ui_queue, "pump", keep=lambda ran: ran > 0)
+    history_updates = MethodTimer(app, "update_chat_history")
+    notice_displays = MethodTimer(app, "display_agent_response")
+    timers = (frames, history_updates, notice_displays)
+
+    latencies = []
+    memory = []
+    memory_every = max(1, turns // MEMORY_SAMPLES)
+    for turn in range(warmup + turns):
+        if turn == warmup:
+            for timer in timers:
+                timer.reset()
+            latencies = []
+            gc.collect()
+            memory.append((0, round(process_memory_mb(), 1)))
+
+        exchange = recorded[turn % len(recorded)]
+        latencies.append(send_and_wait(app, exchange["user"], exchange["assistant"]))
+        if turn % NOTICE_EVERY == NOTICE_EVERY - 1:
+            app.display_agent_response(notices[turn // NOTICE_EVERY % len(notices)])
+            app.update_idletasks()
+
+        done = turn - warmup + 1
+        if done > 0 and (done % memory_every == 0 or done == turns):
+            gc.collect()
+            memory.append((done, round(process_memory_mb(), 1)))
+            if on_progress is not None:
+                on_progress(done, turns)
+
+    return {
+        "gui.input_to_paint": summarize_samples(latencies),
+        "gui.frame": summarize_samples(frames.samples),
+        "gui.update_chat_history": summarize_samples(history_updates.samples),
+        "gui.display_agent_response": summarize_samples(notice_displays.samples),
+    }, memory_report(memory)
+
+
+def summarize_samples(samples):
+    if not samples:
+        return {"error": "no calls were measured"}
+    return summarize(samples)
+
+
+def memory_report(samples):
+    """Summarize (turn, MB) samples; growth is measured from the end of the warmup"""
+    start, end = samples[0][1], samples[-1][1]
+    turns = samples[-1][0]
+    return {
+        "start_mb": start,
+        "end_mb": end,
+        "growth_mb": round(end - start, 1),
+        "growth_mb_per_1000_turns": round((end - start) / turns * 1000, 2) if turns else 0.0,
+        "samples": samples,
+    }
+
+
+def run_gui_benchmark(turns=DEFAULT_TURNS, warmup=DEFAULT_WARMUP, delay=0.0, on_progress=None):
+    """Open the app on a real or virtual display, replay the conversation and return a result document"""
+    conversation = load_conversation()
+    agent = ReplayAgent(conversation["turns"], delay=delay)
+    with display_context(), scratch_directory():
+        app = create_replay_app(agent)
+        try:
+            app.update()
+            results, memory = replay(app, conversation, turns, warmup, on_progress)
+        finally:
+            app.ui_queue.stop()
+            app.destroy()
+    meta = run_metadata(turns, warmup)
+    meta["reply_delay"] = delay
+    return {"meta": meta, "results": results, "memory": memory}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rona_v5 GUI benchmark (uses Xvfb when there is no display)")
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="timed turns to replay")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed turns first")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the replay agent waits before answering")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed median slowdown before failing")
+    parser.add_argument("--max-growth", type=float, metavar="MB",
+                        help="fail when memory grows by more than this many MB over the run")
+    args = parser.parse_args(argv)
+
+    print(f"🚀 تشغيل الواجهة وإعادة {args.turns} رسالة ({args.warmup} تسخين)...\n")
+    try:
+        current = run_gui_benchmark(
+            args.turns, args.warmup, args.delay,
+            on_progress=lambda done, total: print(f"   ⏳ {done}/{total}", flush=True)
+        )
+    except RuntimeError as e:
+        print(f"❌ تعذر فتح الواجهة: {str(e)[:100]}")
+        return 1
+
+    print(f"\n   {'القياس':<24} {'median ms':>10} {'mean ms':>10} {'stdev':>9} {'p95 ms':>10}")
+    for name, result in current["results"].items():
+        print_result(name, result)
+    memory = current["memory"]
+    print(f"\n🧠 الذاكرة: {memory['start_mb']} → {memory['end_mb']} MB "
+          f"({memory['growth_mb_per_1000_turns']:+} MB لكل 1000 رسالة)")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 تم حفظ النتائج في {args.save}")
+
+    ok = True
+    if args.max_growth is not None and memory["growth_mb"] > args.max_growth:
+        print(f"\n❌ زادت الذاكرة بمقدار {memory['growth_mb']} MB (الحد {args.max_growth} MB)")
+        ok = False
+    if args.compare and not print_comparison(load_results(args.compare), current, args.tolerance):
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hardware Auto-Tuner for Rona_v5
+ضبط إعدادات النموذج تلقائياً حسب الجهاز لرونا
+
+Detects CPU cores, RAM and an NVIDIA GPU, benchmarks a few candidate
+num_thread / num_gpu settings against Ollama (or the stub) once, and stores
+the fastest profile. num_ctx is not benchmarked: a smaller context is always
+faster, so it is chosen from the total RAM instead, which keeps it the same for
+the warm-up and the chat model. get_agent_llm applies the stored profile, or a
+heuristic one when the machine has not been benchmarked yet.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import psutil
+import requests
+
+# --- Tuner Configurations ---
+TUNING_PROFILE_FILE = "rona_tuning.json"
+DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
+BENCHMARK_PROMPT = "اشرح باختصار ما هي لغة Python وفيم تُستخدم."
+BENCHMARK_PREDICT = 64
+BENCHMARK_TIMEOUT = 300
+
+
+def detect_gpu():
+    """Return total memory (GB) and name of the first NVIDIA GPU, or None"""
+    if shutil.which("nvidia-smi") is None:
+        return None
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=5
+        )
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        name, memory_mb = result.stdout.strip().splitlines()[0].rsplit(",", 1)
+        return {"name": name.strip(), "memory_gb": round(float(memory_mb) / 1024, 1)}
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
+
+
+def detect_hardware():
+    """Describe the cores, memory and GPU of this machine"""
+    memory = psutil.virtual_memory()
+    logical = psutil.cpu_count(logical=True) or 1
+    return {
+        "physical_cores": psutil.cpu_count(logical=False) or logical,
+        "logical_cores": logical,
+        "total_ram_gb": round(memory.total / 1024 ** 3, 1),
+        "available_ram_gb": round(memory.available / 1024 ** 3, 1),
+        "gpu": detect_gpu(),
+    }
+
+
+def hardware_fingerprint(hardware):
+    """Fields that must match for a stored profile to apply to this machine"""
+    gpu = hardware.get("gpu") or {}
+    return {
+        "physical_cores": hardware["physical_cores"],
+        "logical_cores": hardware["logical_cores"],
+        "total_ram_gb": round(hardware["total_ram_gb"]),
+        "gpu": gpu.get("name"),
+    }
+
+
+def context_sizes(total_ram_gb):
+    """Context windows worth trying for the installed memory
+
+    Free memory changes from one call to the next, and a different num_ctx makes
+    Ollama reload the model, so only the total is used.
+    """
+    if total_ram_gb >= 32:
+        return [4096, 8192]
+    if total_ram_gb >= 16:
+        return [2048, 4096]
+    return [2048]
+
+
+def heuristic_options(hardware):
+    """Reasonable settings without benchmarking"""
+    options = {
+        "num_thread": hardware["physical_cores"],
+        "num_ctx": context_sizes(hardware["total_ram_gb"])[0],
+    }
+    # num_gpu is left to Ollama, which offloads as many layers as fit in VRAM
+    # (and may still use Metal or ROCm without an NVIDIA GPU)
+    return options
+
+
+def candidate_options(hardware):
+    """Every thread count and GPU setting around the heuristic, with its context size"""
+    cores = hardware["physical_cores"]
+    threads = sorted({cores, max(1, cores - 1), max(1, cores // 2)}, reverse=True)
+    # Ollama's own VRAM-bounded offload against CPU only; forcing every layer
+    # onto a GPU too small for the model fails or thrashes
+    gpu_layers = [None, 0] if hardware.get("gpu") else [None]
+    num_ctx = heuristic_options(hardware)["num_ctx"]
+
+    candidates = []
+    for num_thread, num_gpu in itertools.product(threads, gpu_layers):
+        options = {"num_thread": num_thread, "num_ctx": num_ctx}
+        if num_gpu is not None:
+            options["num_gpu"] = num_gpu
+        candidates.append(options)
+    return candidates
+
+
+def benchmark_options(options, model, base_url=DEFAULT_OLLAMA_URL, prompt=BENCHMARK_PROMPT,
+                      num_predict=BENCHMARK_PREDICT, runs=1):
+    """Generate with the given options and return the best tokens per second"""
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = requests.post(
+            f"{base_url}/api/generate",
+            json={
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "options": {**options, "num_predict": num_predict, "temperature": 0},
+            },
+            timeout=BENCHMARK_TIMEOUT
+        )
+        response.raise_for_status()
+        wall = time.perf_counter() - started
+        data = response.json()
+
+        tokens = data.get("eval_count") or 0
+        eval_seconds = (data.get("eval_duration") or 0) / 1e9 or wall
+        result = {
+            "tokens_per_second": tokens / eval_seconds if eval_seconds > 0 else 0.0,
+            "wall_seconds": wall,
+            "tokens": tokens,
+        }
+        if best is None or result["tokens_per_second"] > best["tokens_per_second"]:
+            best = result
+    return best
+
+
+def tune(model, base_url=DEFAULT_OLLAMA_URL, hardware=None, candidates=None, runs=1, measure=None):
+    """Benchmark candidate settings and return the fastest as a profile"""
+    hardware = hardware or detect_hardware()
+    candidates = candidates or candidate_options(hardware)
+    measure = measure or (lambda options: benchmark_options(options, model, base_url, runs=runs))
+
+    # The first request also pays the model load time, so warm up before measuring
+    try:
+        measure(candidates[0])
+    except Exception as e:
+        print(f"⚠️ Warm-up request failed: {str(e)[:100]}")
+
+    results = []
+    for options in candidates:
+        try:
+            result = measure(options)
+            results.append({"options": options, **result})
+            print(f"   {json.dumps(options)}: {result['tokens_per_second']:.1f} tokens/s")
+        except Exception as e:
+            print(f"   {json.dumps(options)}: ❌ {str(e)[:100]}")
+
+    if not results:
+        raise RuntimeError("Every benchmark run failed")
+
+    best = max(results, key=lambda result: result["tokens_per_second"])
+    return {
+        "model": model,
+        "base_url": base_url,
+        "options": best["options"],
+        "tokens_per_second": best["tokens_per_second"],
+        "hardware": hardware_fingerprint(hardware),
+        "results": results,
+        "tuned_at": datetime.datetime.now().isoformat(),
+    }
+
+
+def save_profile(profile, path=TUNING_PROFILE_FILE):
+    """Store a tuned profile, keeping the profiles of other models"""
+    profiles = load_profiles(path)
+    profiles[profile["model"]] = profile
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, ensure_ascii=False, indent=2)
+    except IOError as e:
+        print(f"Error saving tuning profile: {str(e)[:100]}")
+
+
+def load_profiles(path=TUNING_PROFILE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+        return profiles if isinstance(profiles, dict) else {}
+    except (IOError, json.JSONDecodeError) as e:
+        print(f"Error loading tuning profile: {str(e)[:100]}")
+        return {}
+
+
+def get_llm_options(model, path=TUNING_PROFILE_FILE, hardware=None):
+    """Return the tuned options for a model on this machine, or heuristic ones"""
+    hardware = hardware or detect_hardware()
+    profile = load_profiles(path).get(model)
+    if profile and profile.get("hardware") == hardware_fingerprint(hardware):
+        return dict(profile["options"])
+    return heuristic_options(hardware)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Ollama settings for this machine")
+    parser.add_argument("--model", default="mistral:7b")
+    parser.add_argument("--base-url", default=os.environ.get("OLLAMA_HOST", DEFAULT_OLLAMA_URL))
+    parser.add_argument("--runs", type=int, default=1, help="runs per candidate (best is kept)")
+    parser.add_argument("--profile", default=TUNING_PROFILE_FILE, help="where to store the result")
+    args = parser.parse_args(argv)
+
+    hardware = detect_hardware()
+    print("🖥️ الجهاز:")
+    print(f"   أنوية فعلية: {hardware['physical_cores']} / منطقية: {hardware['logical_cores']}")
+    print(f"   الذاكرة: {hardware['total_ram_gb']} GB (المتاح: {hardware['available_ram_gb']} GB)")
+    print(f"   GPU: {hardware['gpu']['name'] if hardware['gpu'] else 'غير موجود'}")
+
+    print(f"\n⏱️ قياس الإعدادات على {args.model}...")
+    try:
+        profile = tune(args.model, args.base_url, hardware, runs=args.runs)
+    except Exception as e:
+        print(f"❌ فشل الضبط: {str(e)[:100]}")
+        return 1
+
+    save_profile(profile, args.profile)
+    print(f"\n✅ أفضل إعدادات: {json.dumps(profile['options'])} ({profile['tokens_per_second']:.1f} tokens/s)")
+    print(f"💾 تم الحفظ في {args.profile}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,83 @@ from bs4 import BeautifulSoup
 from urllib.parse import quote_plus
 import time
 import re
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import cancellation
+import metrics
+import tracing
+
+# Results searched ahead of time for a queued message, shared by all instances
+# so the agent's search tool can use what the turn queue fetched
+PREFETCH_TTL = 120.0
+# Seconds search_web waits for a prefetch still in progress before searching itself
+PREFETCH_WAIT_TIMEOUT = 5.0
+PREFETCH_WORKERS = 2
+_prefetched = {}
+_prefetched_lock = threading.Lock()
+# Web requests get their own threads so they never hold an LLM scheduler worker
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="web-prefetch")
+
+def _prefetch_key(query, engine):
+    return engine, " ".join(query.lower().split())
+
+def _take_prefetched(query, engine):
+    """Remove and return the prefetched results future for a search, if still fresh"""
+    now = time.monotonic()
+    with _prefetched_lock:
+        for key in [key for key, (expires_at, _) in _prefetched.items() if expires_at < now]:
+            del _prefetched[key]
+        entry = _prefetched.pop(_prefetch_key(query, engine), None)
+    return entry[1] if entry is not None else None
+
+def _wait_prefetched(future, timeout):
+    """Return a prefetch's results, or [] if it is not done within timeout
+
+    Raises OperationCancelled as soon as the request waiting for it is cancelled.
+    """
+    token = cancellation.current_token()
+    wake = threading.Event()
+    future.add_done_callback(lambda _: wake.set())
+    unregister = token.on_cancel(wake.set) if token is not None else (lambda: None)
+    try:
+        wake.wait(timeout)
+    finally:
+        unregister()
+    if token is not None:
+        token.raise_if_cancelled()
+    if not future.done():
+        return []
+    try:
+        return future.result()
+    except Exception:
+        return []
+
+def _abort_response(response):
+    """Shut down the socket of a streaming response from another thread
+
+    Closing the response alone does not wake a read blocked in recv(); shutting
+    the socket down does, and the read then fails straight away.
+    """
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
+def _decode_body(response, body):
+    """Decode a streamed body the way response.text would"""
+    encoding = response.encoding
+    if encoding is None and body:
+        encoding = requests.compat.chardet.detect(body)["encoding"]
+    try:
+        return str(body, encoding or "utf-8", errors="replace")
+    except LookupError:
+        return str(body, "utf-8", errors="replace")
+
 
 class InternetSearch:
     """Manages internet search functionality for Rona"""
@@ -29,27 +106,14 @@ class InternetSearch:
             if engine not in self.search_engines:
                 engine = 'google'
             
-            # Encode the query for URL
-            encoded_query = quote_plus(query)
-            search_url = self.search_engines[engine].format(encoded_query)
+            prefetched = _take_prefetched(query, engine)
+            results = _wait_prefetched(prefetched, PREFETCH_WAIT_TIMEOUT) if prefetched is not None else []
+            metrics.record_cache("web_prefetch", bool(results))
+            if results:
+                return results
             
             print(f"🔍 Searching web for: {query}")
-            
-            # Make the request
-            response = self.session.get(search_url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # Parse the results
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            if engine == 'google':
-                return self._parse_google_results(soup)
-            elif engine == 'bing':
-                return self._parse_bing_results(soup)
-            elif engine == 'duckduckgo':
-                return self._parse_duckduckgo_results(soup)
-            else:
-                return self._parse_google_results(soup)
+            return self._search_engine(query, engine)
                 
         except requests.RequestException as e:
             print(f"❌ Search request failed: {str(e)[:50]}")
@@ -58,6 +122,117 @@ class InternetSearch:
             print(f"❌ Search parsing failed: {str(e)[:50]}")
             return []
     
+    def prefetch(self, query, engine='google'):
+        """
+        Search ahead of time in the background so a later search_web for the same
+        query returns at once; returns a Future of the results
+        """
+        future = Future()
+        with _prefetched_lock:
+            _prefetched[_prefetch_key(query, engine)] = (time.monotonic() + PREFETCH_TTL, future)
+        _prefetch_executor.submit(self._run_prefetch, query, engine, future)
+        return future
+    
+    def _run_prefetch(self, query, engine, future):
+        results = []
+        try:
+            results = self._search_engine(query, engine)
+        except Exception as e:
+            print(f"⚠️ Search prefetch failed: {str(e)[:50]}")
+        finally:
+            # Empty results make search_web search again itself
+            future.set_result(results)
+    
+    def _get_text(self, url, timeout):
+        """GET a page and return its text, aborting the download if the current request is cancelled
+
+        HTTP errors are raised before the body is read.
+        """
+        token = cancellation.current_token()
+        if token is None:
+            response = self.session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.text
+        
+        token.raise_if_cancelled()
+        response = self.session.get(url, timeout=timeout, stream=True)
+        unregister = token.on_cancel(lambda: _abort_response(response))
+        try:
+            response.raise_for_status()
+            # read1 returns as soon as any data arrives, so a slow page is
+            # checked for cancellation between chunks instead of at the end
+            chunks = []
+            while True:
+                token.raise_if_cancelled()
+                chunk = response.raw.read1(65536, decode_content=True)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except Exception:
+            token.raise_if_cancelled()
+            raise
+        finally:
+            unregister()
+            response.close()
+        token.raise_if_cancelled()
+        return _decode_body(response, b"".join(chunks))
+    
+    def _search_engine(self, query, engine, timeout=None):
+        """Fetch and parse one engine's results; request errors are raised"""
+        # Encode the query for URL
+        encoded_query = quote_plus(query)
+        search_url = self.search_engines[engine].format(encoded_query)
+        
+        with tracing.span("web.search", engine=engine) as search_span:
+            # Make the request
+            with metrics.WEB_FETCH_SECONDS.labels(engine).time():
+                html = self._get_text(search_url, timeout or self.timeout)
+            
+            # Parse the results
+            soup = BeautifulSoup(html, 'html.parser')
+            
+            if engine == 'bing':
+                results = self._parse_bing_results(soup)
+            elif engine == 'duckduckgo':
+                results = self._parse_duckduckgo_results(soup)
+            else:
+                results = self._parse_google_results(soup)
+            search_span.set(results=len(results))
+            return results
+    
+    def _check_engine(self, query, engine, timeout):
+        started = time.perf_counter()
+        try:
+            results = self._search_engine(query, engine, timeout)
+            error = None if results else "no results"
+        except Exception as e:
+            results, error = [], str(e)[:100]
+        return {
+            'engine': engine,
+            'ok': error is None,
+            'results': results,
+            'latency': time.perf_counter() - started,
+            'error': error
+        }
+    
+    def check_engines(self, query, engines=None, timeout=None, on_result=None):
+        """
+        Query several search engines in parallel and report each one's latency
+        
+        Returns one dict per engine (engine, ok, results, latency, error) in the
+        order given; on_result is called with each dict as soon as it is ready.
+        """
+        engines = list(engines or self.search_engines)
+        checks = {}
+        with ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="engine-check") as pool:
+            futures = [pool.submit(self._check_engine, query, engine, timeout) for engine in engines]
+            for future in as_completed(futures):
+                check = future.result()
+                checks[check['engine']] = check
+                if on_result is not None:
+                    on_result(check)
+        return [checks[engine] for engine in engines]
+    
     def _parse_google_results(self, soup):
         """Parse Google search results"""
         results = []
@@ -144,10 +319,10 @@ class InternetSearch:
         Get content from a specific URL
         """
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            with tracing.span("web.fetch"), metrics.WEB_FETCH_SECONDS.labels("page").time():
+                html = self._get_text(url, self.timeout)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'html.parser')
             
             # Remove script and style elements
             for script in soup(["script", "style"]):
@@ -171,6 +346,8 @@ def create_web_search_tool():
     """
     Create a web search tool for LangChain
     """
+    from langchain.tools import tool
+
     internet_search = InternetSearch()
     
     @tool
@@ -210,6 +387,8 @@ def create_web_content_tool():
     """
     Create a tool to get content from specific URLs
     """
+    from langchain.tools import tool
+
     internet_search = InternetSearch()
     
     @tool
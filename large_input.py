@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Large Input Handling for Rona_v5
+معالجة النصوص الملصقة الكبيرة في رونا
+
+Pasting a long log into the input box used to send all of it to retrieval and
+to the model, overflowing the context window. Text above LARGE_INPUT_CHARS is
+kept out of the input widget as an attachment instead. When its turn runs, on
+a worker thread, the text is split into chunks, the chunks are embedded into a
+temporary in-memory index that only lives for that turn, and only the chunks
+closest to the user's question are sent to the model, in document order.
+"""
+
+import re
+
+import tracing
+
+# --- Large Input Configurations ---
+LARGE_INPUT_CHARS = 4000
+EXCERPT_CHARS = 3000
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 80
+# Beyond this many chunks only the ones sharing the most words with the question are embedded
+MAX_INDEXED_CHUNKS = 200
+QUERY_CHARS = 300
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def is_large(text):
+    return len(text) >= LARGE_INPUT_CHARS
+
+
+def describe(question, document):
+    """Return the short form of a message with pasted text shown in the chat"""
+    lines = document.count("\n") + 1
+    note = f"📎 نص ملصق: {len(document):,} حرف، {lines:,} سطر"
+    return f"{question}\n\n{note}" if question else note
+
+
+def search_query(question, document):
+    """Return the text used to pick excerpts and retrieve context"""
+    return question or document[:QUERY_CHARS]
+
+
+def split_document(document):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    return splitter.split_text(document)
+
+
+def keyword_scores(chunks, query):
+    """Count for each chunk how many of the query's words it contains"""
+    words = set(_WORD_PATTERN.findall(query.lower()))
+    return [len(words.intersection(_WORD_PATTERN.findall(chunk.lower()))) for chunk in chunks]
+
+
+def select_excerpts(document, question, embeddings=None, max_chars=EXCERPT_CHARS):
+    """Return (excerpts, total_chunks) where excerpts are the (chunk number, text)
+    pairs most relevant to the question, in document order
+
+    Without embeddings, or if embedding fails, chunks are ranked by the words
+    they share with the question.
+    """
+    chunks = split_document(document)
+    query = search_query(question, document)
+    scores = keyword_scores(chunks, query)
+    # sorted is stable, so ties keep document order
+    by_keywords = sorted(range(len(chunks)), key=lambda i: -scores[i])
+    candidates = sorted(by_keywords[:MAX_INDEXED_CHUNKS])
+
+    ranked = by_keywords
+    if embeddings is not None:
+        try:
+            from langchain_core.vectorstores import InMemoryVectorStore
+
+            with tracing.span("input.index_excerpts", chunks=len(candidates)):
+                index = InMemoryVectorStore(embeddings)
+                index.add_texts([chunks[i] for i in candidates], metadatas=[{"chunk": i} for i in candidates])
+                k = min(len(candidates), max_chars // CHUNK_SIZE + 2)
+                ranked = [doc.metadata["chunk"] for doc in index.similarity_search(query, k=k)]
+        except Exception as e:
+            print(f"⚠️ Embedding pasted text failed, selecting by keywords: {str(e)[:100]}")
+
+    selected = []
+    total = 0
+    for i in ranked:
+        if total + len(chunks[i]) > max_chars and selected:
+            break
+        selected.append(i)
+        total += len(chunks[i])
+    return [(i, chunks[i]) for i in sorted(selected)], len(chunks)
+
+
+def compose_message(question, document, excerpts, total_chunks):
+    """Build the message the agent sees in place of the full pasted text"""
+    parts = [
+        question or "حلل النص الملصق التالي.",
+        "",
+        f"[نص ملصق طويل ({len(document):,} حرف). هذه أكثر {len(excerpts)} أجزاء صلة بالسؤال من أصل {total_chunks}:]"
+    ]
+    for i, chunk in excerpts:
+        parts.append(f"--- الجزء {i + 1} ---\n{chunk}")
+    return "\n".join(parts)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy Component Loader for Rona_v5
+تحميل مكونات رونا في الخلفية عند الحاجة
+
+Heavy components (embeddings, Chroma, ChatOllama, the agent executor) are built
+on background threads so the window can be drawn first. Each component moves
+through pending -> loading -> ready/failed and may depend on other components.
+"""
+
+import threading
+import time
+
+# --- Component States ---
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+class ComponentFailedError(RuntimeError):
+    """Raised when a component (or one of its dependencies) failed to load"""
+
+
+class LazyComponent:
+    """A value built once by a factory, possibly on a background thread"""
+
+    def __init__(self, name, factory, depends_on=()):
+        self.name = name
+        self.factory = factory
+        self.depends_on = tuple(depends_on)
+        self.state = STATE_PENDING
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def _claim(self):
+        """Move from pending to loading; False if another caller got there first"""
+        with self._lock:
+            if self.state != STATE_PENDING:
+                return False
+            self.state = STATE_LOADING
+            return True
+
+    def wait(self, timeout=None):
+        """Block until the component has finished loading, successfully or not"""
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+
+class ComponentLoader:
+    """Registry that loads components lazily and reports their readiness"""
+
+    def __init__(self, on_state_change=None):
+        self.on_state_change = on_state_change
+        self._components = {}
+
+    def add(self, name, factory, depends_on=()):
+        """Register a factory; it receives the values of its dependencies in order"""
+        for dependency in depends_on:
+            if dependency not in self._components:
+                raise KeyError(f"Unknown dependency '{dependency}' for component '{name}'")
+        self._components[name] = LazyComponent(name, factory, depends_on)
+        return self._components[name]
+
+    def __contains__(self, name):
+        return name in self._components
+
+    def component(self, name):
+        return self._components[name]
+
+    def _load(self, component):
+        """Build a component in the calling thread"""
+        self._notify(component.name, STATE_LOADING)
+        started = time.perf_counter()
+        try:
+            dependencies = [self.get(name) for name in component.depends_on]
+            component.value = component.factory(*dependencies)
+            component.state = STATE_READY
+        except Exception as e:
+            component.error = e
+            component.state = STATE_FAILED
+            print(f"❌ Failed to load {component.name}: {str(e)[:100]}")
+        finally:
+            component.load_seconds = time.perf_counter() - started
+            component._done.set()
+        self._notify(component.name, component.state)
+
+    def _notify(self, name, state):
+        if self.on_state_change is not None:
+            try:
+                self.on_state_change(name, state)
+            except Exception as e:
+                print(f"⚠️ Component state callback failed: {str(e)[:100]}")
+
+    def start(self, name):
+        """Start loading a component on a background thread if not started yet"""
+        component = self._components[name]
+        if component._claim():
+            threading.Thread(
+                target=self._load, args=(component,), name=f"load-{name}", daemon=True
+            ).start()
+        return component
+
+    def start_all(self):
+        """Start loading every registered component in the background"""
+        for name in self._components:
+            self.start(name)
+
+    def get(self, name, timeout=None):
+        """Return a component's value, loading it in this thread if nobody has started it"""
+        component = self._components[name]
+        if component._claim():
+            self._load(component)
+        elif not component.wait(timeout):
+            raise TimeoutError(f"Component '{name}' is still loading")
+
+        if component.state == STATE_FAILED:
+            raise ComponentFailedError(f"Component '{name}' failed to load: {str(component.error)[:100]}")
+        return component.value
+
+    def wait(self, name, timeout=None):
+        """Wait for a component to finish loading without raising on failure"""
+        return self._components[name].wait(timeout)
+
+    def is_ready(self, name):
+        return self._components[name].state == STATE_READY
+
+    def states(self):
+        return {name: component.state for name, component in self._components.items()}
+
+    def timings(self):
+        """Return how long each finished component took to load, in seconds"""
+        return {name: component.load_seconds for name, component in self._components.items()
+                if component.load_seconds is not None}
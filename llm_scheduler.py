@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Request Scheduler for Rona_v5
+مُجدول طلبات نموذج اللغة لرونا
+
+Agent turns, document ingestion and memory indexing reach Ollama through a
+bounded pool of workers fed by a priority queue, so interactive turns are served
+before background work and a busy server cannot flood a single Ollama instance.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import cancellation
+
+# --- Scheduler Configurations ---
+PRIORITY_INTERACTIVE = 0
+# Retrieval for messages waiting behind the running turn
+PRIORITY_PREFETCH = 5
+PRIORITY_SUMMARIZATION = 10
+PRIORITY_INGESTION = 20
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_QUEUE_DEPTH = 32
+
+_PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_PREFETCH: "prefetch",
+    PRIORITY_SUMMARIZATION: "summarization",
+    PRIORITY_INGESTION: "ingestion",
+}
+
+_current = threading.local()
+
+
+class SchedulerFullError(RuntimeError):
+    """Raised when the scheduler queue is at capacity"""
+
+
+class ScheduledRequest:
+    """A queued call together with its future and cancellation token"""
+
+    def __init__(self, fn, args, kwargs, priority, key, group=None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.group = group
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.token = cancellation.CancellationToken()
+
+    def cancel(self):
+        """Cancel a pending request, or cancel the token of a running one so it stops early"""
+        self.token.cancel()
+        return self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+
+def current_request():
+    """Return the request being executed on this worker thread, if any"""
+    return getattr(_current, "request", None)
+
+
+def is_current_request_cancelled():
+    """Let long-running work check whether it has been superseded or cancelled"""
+    request = current_request()
+    return request is not None and request.cancelled
+
+
+class LLMScheduler:
+    """Bounded worker pool with a priority queue and backpressure"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_queue_depth=DEFAULT_MAX_QUEUE_DEPTH):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._by_key = {}
+        # Groups with a running request, and the requests of those groups set aside until it finishes
+        self._running_groups = set()
+        self._parked = {}
+        self._parked_count = 0
+        self._in_flight = 0
+        self._shutdown = False
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "superseded": 0,
+        }
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._max_depth_seen = 0
+
+        self._workers = []
+        for i in range(max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"llm-scheduler-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, *args, priority=PRIORITY_INTERACTIVE, key=None, group=None, block=False, timeout=None,
+               **kwargs):
+        """Queue a call and return a Future for its result
+
+        A request submitted with the same `key` as an earlier one supersedes it:
+        the earlier request is cancelled if still queued, or flagged if running.
+        Requests of the same `group` run one at a time, in queue order, without
+        holding a worker while they wait for each other.
+        When the queue is full, SchedulerFullError is raised unless `block` is
+        set, in which case the caller waits up to `timeout` seconds for space.
+        """
+        request = ScheduledRequest(fn, args, kwargs, priority, key, group)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._depth() >= self.max_queue_depth:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    self._stats["rejected"] += 1
+                    raise SchedulerFullError(
+                        f"LLM queue is full ({self._depth()}/{self.max_queue_depth} requests waiting)"
+                    )
+                self._condition.wait(remaining)
+
+            if key is not None:
+                previous = self._by_key.get(key)
+                if previous is not None and not previous.future.done():
+                    previous.cancel()
+                    self._stats["superseded"] += 1
+                self._by_key[key] = request
+
+            heapq.heappush(self._heap, (priority, next(self._sequence), request))
+            self._stats["submitted"] += 1
+            self._max_depth_seen = max(self._max_depth_seen, self._depth())
+            self._condition.notify_all()
+        return request.future
+
+    def _depth(self):
+        return len(self._heap) + self._parked_count
+
+    def _worker_loop(self):
+        """Run queued requests in priority order"""
+        while True:
+            with self._condition:
+                while not self._heap and not self._shutdown:
+                    self._condition.wait()
+                if self._shutdown and not self._heap:
+                    return
+                entry = heapq.heappop(self._heap)
+                request = entry[2]
+                if request.group is not None and request.group in self._running_groups:
+                    # Set aside until the running request of its group finishes
+                    self._parked.setdefault(request.group, deque()).append(entry)
+                    self._parked_count += 1
+                    continue
+                # Wake producers blocked on a full queue
+                self._condition.notify_all()
+
+                if not request.future.set_running_or_notify_cancel():
+                    self._stats["cancelled"] += 1
+                    self._forget(request)
+                    continue
+
+                if request.group is not None:
+                    self._running_groups.add(request.group)
+
+                request.started_at = time.monotonic()
+                wait = request.started_at - request.submitted_at
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+                self._in_flight += 1
+
+            _current.request = request
+            try:
+                with cancellation.use_token(request.token):
+                    result = request.fn(*request.args, **request.kwargs)
+            except BaseException as e:
+                request.future.set_exception(e)
+                outcome = "cancelled" if isinstance(e, cancellation.OperationCancelled) else "failed"
+            else:
+                request.future.set_result(result)
+                outcome = "completed"
+            finally:
+                _current.request = None
+
+            with self._condition:
+                self._in_flight -= 1
+                self._stats[outcome] += 1
+                self._forget(request)
+                if request.group is not None:
+                    self._release_group(request.group)
+
+    def _release_group(self, group):
+        """Let the next request of a group run, back at its original place in the queue"""
+        self._running_groups.discard(group)
+        parked = self._parked.get(group)
+        if parked:
+            heapq.heappush(self._heap, parked.popleft())
+            self._parked_count -= 1
+            if not parked:
+                del self._parked[group]
+            self._condition.notify_all()
+
+    def _forget(self, request):
+        """Drop the key index entry of a finished request"""
+        if request.key is not None and self._by_key.get(request.key) is request:
+            del self._by_key[request.key]
+
+    def cancel(self, key):
+        """Cancel the latest request submitted with the given key"""
+        with self._condition:
+            request = self._by_key.get(key)
+        if request is None:
+            return False
+        request.cancel()
+        return True
+
+    def queue_depth(self):
+        with self._condition:
+            return self._depth()
+
+    def metrics(self):
+        """Return a snapshot of queue depth, throughput and wait times"""
+        with self._condition:
+            depth_by_priority = {}
+            waiting = self._heap + [entry for parked in self._parked.values() for entry in parked]
+            for priority, _, _ in waiting:
+                name = _PRIORITY_NAMES.get(priority, str(priority))
+                depth_by_priority[name] = depth_by_priority.get(name, 0) + 1
+            started = self._stats["completed"] + self._stats["failed"] + self._in_flight
+            return {
+                "queue_depth": self._depth(),
+                "queue_depth_by_priority": depth_by_priority,
+                "max_queue_depth": self.max_queue_depth,
+                "max_queue_depth_seen": self._max_depth_seen,
+                "in_flight": self._in_flight,
+                "max_workers": self.max_workers,
+                "avg_wait_ms": (self._total_wait / started * 1000) if started else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                **self._stats,
+            }
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Stop accepting requests and let workers exit"""
+        with self._condition:
+            self._shutdown = True
+            if cancel_pending:
+                for _, _, request in self._heap:
+                    request.cancel()
+                for parked in self._parked.values():
+                    for _, _, request in parked:
+                        request.cancel()
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """Return the process-wide scheduler shared by the app, server and background jobs"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+        return _default_scheduler
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load Generator for Rona_v5
+مولد الحمل لرونا
+
+Simulates users holding conversations at the same time to find how many
+concurrent sessions one Ollama host can sustain. Each user has its own
+session, memory and agent executor built with get_agent_prompt, build_agent
+and create_agent_executor, waits a think time between turns and sends each
+turn through an LLMScheduler the way the headless server does, so retrieval
+and the agent loop run on the same bounded worker pool. The report gives
+throughput, queue wait, service time and tail latency for each user count.
+
+Runs against the Ollama server in OLLAMA_HOST, any --ollama URL, or an
+in-process stub (--stub):
+    python load_test.py --stub --users 1,2,4,8 --turns 5 --think-time exponential:1
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from llm_scheduler import LLMScheduler, SchedulerFullError, DEFAULT_MAX_WORKERS, DEFAULT_MAX_QUEUE_DEPTH
+from ollama_stub import LatencyDistribution
+from tracing import percentile
+
+# --- Load Test Configurations ---
+DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
+DEFAULT_USERS = "1,2,4"
+DEFAULT_TURNS = 5
+DEFAULT_THINK_TIME = "exponential:1"
+DEFAULT_TURN_TIMEOUT = 120
+DEFAULT_SLO_SECONDS = 10.0
+
+QUESTIONS = [
+    "ما هي لغة Python؟",
+    "كيف أقرأ ملف JSON في Python؟",
+    "ما الفرق بين القائمة والمجموعة؟",
+    "اشرح لي المزخرفات (decorators)",
+    "كيف أكتب اختباراً لدالة؟",
+    "ما هي قاعدة البيانات المتجهة؟",
+]
+
+SEED_DOCUMENTS = [
+    "Python لغة برمجة عالية المستوى تتميز بسهولة القراءة ومكتبة قياسية غنية.",
+    "json.load يقرأ ملف JSON ويحوله إلى قاموس في Python.",
+    "القائمة مرتبة وتقبل التكرار، أما المجموعة فغير مرتبة ولا تقبل التكرار.",
+    "المزخرف دالة تستقبل دالة أخرى وتعيد دالة جديدة تضيف سلوكاً حولها.",
+    "قاعدة البيانات المتجهة تخزن التضمينات وتبحث عن أقرب النصوص دلالياً.",
+]
+
+
+class SimulatedUser:
+    """Conversation state of one simulated user"""
+
+    def __init__(self, name, conversation_manager, executor):
+        self.name = name
+        self.conversation_manager = conversation_manager
+        self.executor = executor
+
+
+class LoadTestPipeline:
+    """Agent components shared by all simulated users, built the way the server builds them"""
+
+    def __init__(self, base_url, workers=DEFAULT_MAX_WORKERS, max_queue_depth=DEFAULT_MAX_QUEUE_DEPTH):
+        from rona_v5_updated import (
+            build_agent, create_agent_tools, get_agent_llm, get_agent_prompt, get_embeddings_model
+        )
+        from session_store import SessionStore
+
+        try:
+            from langchain_chroma import Chroma
+        except ImportError:
+            from langchain_community.vectorstores import Chroma
+
+        self.base_url = base_url
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.temp_dir = tempfile.mkdtemp(prefix="rona_load_")
+
+        # The Ollama client reads OLLAMA_HOST when the models are created
+        self._saved_host = os.environ.get("OLLAMA_HOST")
+        os.environ["OLLAMA_HOST"] = base_url
+
+        self.llm = get_agent_llm()
+        embeddings = get_embeddings_model()
+        if self.llm is None or embeddings is None:
+            self.close()
+            raise RuntimeError(f"Cannot initialize the models on {base_url}")
+
+        self.vector_db = Chroma(
+            collection_name="load_test",
+            persist_directory=os.path.join(self.temp_dir, "chroma_db"),
+            embedding_function=embeddings
+        )
+        self.vector_db.add_texts(SEED_DOCUMENTS)
+        self.tools = create_agent_tools()
+        self.agent_runnable = build_agent(self.llm, self.tools, get_agent_prompt())
+        self.session_store = SessionStore(os.path.join(self.temp_dir, "sessions.db"))
+
+    def new_user(self, name):
+        """Create a session, memory and executor for one user"""
+        from rona_v5_updated import ConversationManager, create_agent_executor, create_agent_memory
+
+        session_id = self.session_store.create_session(title=name, user_id=name)
+        manager = ConversationManager(store=self.session_store, session_id=session_id)
+        executor = create_agent_executor(self.agent_runnable, self.tools, create_agent_memory(self.llm))
+        executor.verbose = False
+        return SimulatedUser(name, manager, executor)
+
+    def run_turn(self, user, message, submitted_at):
+        """Execute one turn on a scheduler worker; return (queue wait, service time)"""
+        from rona_v5_updated import prepare_agent_input
+
+        started_at = time.monotonic()
+        user.conversation_manager.add_message("user", message)
+        agent_input = prepare_agent_input(message, self.vector_db, user.conversation_manager)
+        result = user.executor.invoke(agent_input)
+        user.conversation_manager.add_message("assistant", result.get('output', 'No response found.'))
+        return started_at - submitted_at, time.monotonic() - started_at
+
+    def close(self):
+        if getattr(self, "session_store", None) is not None:
+            self.session_store.close()
+        if self._saved_host is None:
+            os.environ.pop("OLLAMA_HOST", None)
+        else:
+            os.environ["OLLAMA_HOST"] = self._saved_host
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _user_loop(pipeline, scheduler, user, index, turns, deadline, think_time, rng, start_delay,
+               turn_timeout, started, results, lock):
+    """Hold one user's conversation: wait, send a turn, think, repeat"""
+    time.sleep(start_delay)
+    turn = 0
+    while (turns is None or turn < turns) and (deadline is None or time.monotonic() < deadline):
+        message = QUESTIONS[(index + turn) % len(QUESTIONS)]
+        submitted_at = time.monotonic()
+        record = {"user": user.name, "turn": turn, "submitted": round(submitted_at - started, 3)}
+        try:
+            future = scheduler.submit(pipeline.run_turn, user, message, submitted_at)
+            queue_wait, service = future.result(timeout=turn_timeout)
+            record.update(status="ok", queue_wait=queue_wait, service=service)
+        except SchedulerFullError:
+            record["status"] = "rejected"
+        except Exception as e:
+            record.update(status="error", error=str(e)[:100])
+        record["latency"] = time.monotonic() - submitted_at
+        with lock:
+            results.append(record)
+        turn += 1
+        time.sleep(think_time.sample(rng))
+
+
+def _stats(values):
+    """p50/p95/p99/max/mean of a list of seconds"""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    return {
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+        "mean": statistics.fmean(values),
+    }
+
+
+def run_load(pipeline, users, turns=DEFAULT_TURNS, duration=None, think_time=DEFAULT_THINK_TIME,
+             ramp_up=0.0, seed=None, turn_timeout=DEFAULT_TURN_TIMEOUT):
+    """Run `users` concurrent conversations and return a report
+
+    Each user sends `turns` turns, or keeps going for `duration` seconds when
+    it is given. Users start evenly spread over `ramp_up` seconds.
+    """
+    think_time = LatencyDistribution.parse(think_time)
+    scheduler = LLMScheduler(max_workers=pipeline.workers, max_queue_depth=pipeline.max_queue_depth)
+    simulated = [pipeline.new_user(f"user-{users}-{i}") for i in range(users)]
+    results = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration if duration else None
+
+    threads = []
+    for index, user in enumerate(simulated):
+        thread = threading.Thread(
+            target=_user_loop,
+            args=(pipeline, scheduler, user, index, None if duration else turns, deadline, think_time,
+                  random.Random(None if seed is None else seed + index), ramp_up * index / users,
+                  turn_timeout, started, results, lock),
+            name=f"load-{user.name}",
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    scheduler_metrics = scheduler.metrics()
+    scheduler.shutdown(wait=False, cancel_pending=True)
+
+    completed = [record for record in results if record["status"] == "ok"]
+    errors = [record for record in results if record["status"] == "error"]
+    return {
+        "users": users,
+        "turns": len(results),
+        "ok": len(completed),
+        "errors": len(errors),
+        "rejected": sum(1 for record in results if record["status"] == "rejected"),
+        "elapsed": elapsed,
+        "throughput": len(completed) / elapsed if elapsed else 0.0,
+        "latency": _stats([record["latency"] for record in completed]),
+        "queue_wait": _stats([record["queue_wait"] for record in completed]),
+        "service": _stats([record["service"] for record in completed]),
+        "max_queue_depth_seen": scheduler_metrics["max_queue_depth_seen"],
+        "sample_errors": sorted({record["error"] for record in errors})[:3],
+    }
+
+
+def sustainable_users(reports, slo_seconds=DEFAULT_SLO_SECONDS):
+    """Largest user count whose p95 latency met the SLO without errors or rejections"""
+    passing = [report["users"] for report in reports
+               if not report["errors"] and not report["rejected"] and report["ok"]
+               and report["latency"]["p95"] <= slo_seconds]
+    return max(passing) if passing else 0
+
+
+def print_report(reports, slo_seconds=DEFAULT_SLO_SECONDS):
+    """Print one row per user count"""
+    print("\n📊 نتائج اختبار الحمل:")
+    print(f"   {'users':>5} {'ok':>5} {'err':>4} {'rej':>4} {'turns/s':>8} "
+          f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'wait p95':>9} {'service p50':>12}")
+    for report in reports:
+        print(f"   {report['users']:>5} {report['ok']:>5} {report['errors']:>4} {report['rejected']:>4} "
+              f"{report['throughput']:>8.2f} {report['latency']['p50']:>7.2f} {report['latency']['p95']:>7.2f} "
+              f"{report['latency']['p99']:>7.2f} {report['queue_wait']['p95']:>9.2f} "
+              f"{report['service']['p50']:>12.2f}")
+        for error in report["sample_errors"]:
+            print(f"         ⚠️ {error}")
+    print(f"\n✅ أكبر عدد مستخدمين ضمن p95 ≤ {slo_seconds:g} ثانية: {sustainable_users(reports, slo_seconds)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure concurrent-session throughput of the agent pipeline")
+    parser.add_argument("--users", default=DEFAULT_USERS, help="user counts to run, e.g. 1,2,4,8")
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="turns per user")
+    parser.add_argument("--duration", type=float, help="run each level for this many seconds instead of --turns")
+    parser.add_argument("--think-time", default=DEFAULT_THINK_TIME,
+                        help="pause between a user's turns, e.g. 2 or exponential:1 (seconds)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which users start")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="scheduler workers")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_MAX_QUEUE_DEPTH, help="scheduler queue limit")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TURN_TIMEOUT, help="seconds before a turn fails")
+    parser.add_argument("--slo", type=float, default=DEFAULT_SLO_SECONDS, help="p95 latency target in seconds")
+    parser.add_argument("--seed", type=int, help="make think times and stub behaviour reproducible")
+    parser.add_argument("--ollama", default=os.environ.get("OLLAMA_HOST", DEFAULT_OLLAMA_URL),
+                        help="Ollama server to load (default: OLLAMA_HOST)")
+    parser.add_argument("--stub", action="store_true", help="use an in-process stub instead of Ollama")
+    parser.add_argument("--stub-token-rate", type=float, default=40.0)
+    parser.add_argument("--stub-latency", default="0.05")
+    parser.add_argument("--stub-reply-tokens", type=int, default=30)
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0)
+    parser.add_argument("--json", dest="json_file", help="also write the reports to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(value) for value in args.users.split(",") if value.strip()]
+        think_time = LatencyDistribution.parse(args.think_time)
+    except ValueError as e:
+        print(f"❌ قيمة غير صالحة: {str(e)[:100]}")
+        return 1
+
+    stub = None
+    if args.stub:
+        from ollama_stub import OllamaStubServer
+        stub = OllamaStubServer(
+            name="load", token_rate=args.stub_token_rate, latency=args.stub_latency,
+            reply_tokens=args.stub_reply_tokens, failure_rate=args.stub_failure_rate, seed=args.seed
+        ).start()
+        args.ollama = stub.url
+
+    print(f"🚀 اختبار الحمل على {args.ollama} ({args.workers} عمال، مهلة تفكير {think_time})")
+    reports = []
+    try:
+        with LoadTestPipeline(args.ollama, args.workers, args.queue_depth) as pipeline:
+            for users in levels:
+                print(f"👥 {users} مستخدمين...")
+                reports.append(run_load(
+                    pipeline, users, args.turns, args.duration, think_time, args.ramp_up, args.seed, args.timeout
+                ))
+    except Exception as e:
+        print(f"❌ فشل اختبار الحمل: {str(e)[:100]}")
+        return 1
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print_report(reports, args.slo)
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump({"ollama": args.ollama, "workers": args.workers, "reports": reports}, f, ensure_ascii=False, indent=2)
+        print(f"💾 تم حفظ النتائج في {args.json_file}")
+    return 0 if all(report["ok"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
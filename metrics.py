@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Operational Metrics for Rona_v5
+مقاييس تشغيل رونا بصيغة Prometheus
+
+Counters, gauges and histograms for turns, tokens, LLM latency, tool calls,
+cache hits, vector DB size, ingestion, web fetch latency and UI frame time.
+Updating a metric is a dict lookup and an addition under a lock, so they are
+always on. The values can be served as Prometheus text on a local port
+(RONA_METRICS_PORT) or written to a file periodically (RONA_METRICS_FILE).
+"""
+
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Metrics Configurations ---
+METRICS_PORT_ENV = "RONA_METRICS_PORT"
+METRICS_FILE_ENV = "RONA_METRICS_FILE"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_DUMP_INTERVAL = 15
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base for metrics with optional labels; each label set gets a child"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """Return the child for one combination of label values"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabeled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._unlabeled().inc(amount)
+
+    def value(self, *labels):
+        child = self._children.get(tuple(str(value) for value in labels))
+        return child.value if child is not None else 0.0
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from a function when the metrics are collected"""
+        self._function = function
+
+    @property
+    def value(self):
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float("nan")
+        return self._value
+
+    def render(self, name, labelnames, key):
+        value = self.value
+        if value != value:  # NaN: the source was not available
+            return []
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._unlabeled().set(value)
+
+    def inc(self, amount=1):
+        self._unlabeled().inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabeled().dec(amount)
+
+    def set_function(self, function):
+        self._unlabeled().set_function(function)
+
+    def value(self, *labels):
+        child = self._children.get(tuple(str(value) for value in labels))
+        return child.value if child is not None else 0.0
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(list(self.buckets) + [float("inf")], counts):
+            cumulative += bucket_count
+            labels = _format_labels(labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    """Context manager that observes the elapsed seconds"""
+
+    def __init__(self, child):
+        self.child = child
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._unlabeled().observe(value)
+
+    def time(self):
+        return self._unlabeled().time()
+
+
+class Registry:
+    """A set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TURNS = Counter("rona_turns_total", "Conversation turns answered", ["status"], REGISTRY)
+TOKENS = Counter("rona_tokens_total", "LLM tokens by direction (in = prompt, out = completion)",
+                 ["direction"], REGISTRY)
+LLM_LATENCY = Histogram("rona_llm_latency_seconds", "Duration of one LLM call", ["model"], REGISTRY)
+TOOL_CALLS = Counter("rona_tool_calls_total", "Agent tool calls", ["tool", "status"], REGISTRY)
+CACHE_REQUESTS = Counter("rona_cache_requests_total", "Cache lookups by cache and result (hit/miss)",
+                         ["cache", "result"], REGISTRY)
+VECTOR_DB_DOCUMENTS = Gauge("rona_vector_db_documents", "Documents stored in the vector database",
+                            registry=REGISTRY)
+INGESTED_CHUNKS = Counter("rona_ingested_chunks_total", "Chunks added to the vector database", [], REGISTRY)
+INGESTED_CHARACTERS = Counter("rona_ingested_characters_total", "Characters of text ingested", [], REGISTRY)
+INGESTION_SECONDS = Histogram("rona_ingestion_seconds", "Duration of one ingestion (split and embed)",
+                              registry=REGISTRY)
+WEB_FETCH_SECONDS = Histogram("rona_web_fetch_seconds", "HTTP fetch latency per search engine",
+                              ["engine"], REGISTRY, buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20))
+UI_FRAME_SECONDS = Histogram("rona_ui_frame_seconds", "Time spent applying queued UI updates in one frame",
+                             registry=REGISTRY, buckets=(0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25))
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_ingestion(chunks, characters, seconds):
+    INGESTED_CHUNKS.inc(chunks)
+    INGESTED_CHARACTERS.inc(characters)
+    INGESTION_SECONDS.observe(seconds)
+
+
+def track_vector_db(vector_db):
+    """Report the vector database size at collection time"""
+    VECTOR_DB_DOCUMENTS.set_function(lambda: vector_db._collection.count())
+
+
+_handler = None
+
+
+def callback_handler():
+    """Return the shared LangChain callback handler that feeds the LLM and tool metrics"""
+    global _handler
+    if _handler is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class MetricsCallbackHandler(BaseCallbackHandler):
+            """Counts tokens, LLM latency and tool calls from LangChain callbacks"""
+
+            def __init__(self):
+                self.started = {}
+
+            def _start_llm(self, serialized, run_id, kwargs):
+                params = kwargs.get("invocation_params") or {}
+                model = params.get("model") or (kwargs.get("metadata") or {}).get("ls_model_name") or "unknown"
+                self.started[run_id] = (time.perf_counter(), model)
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                self._start_llm(serialized, run_id, kwargs)
+
+            def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                self._start_llm(serialized, run_id, kwargs)
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                started = self.started.pop(run_id, None)
+                if started is not None:
+                    LLM_LATENCY.labels(started[1]).observe(time.perf_counter() - started[0])
+                for generations in response.generations:
+                    for generation in generations:
+                        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                        if usage.get("input_tokens"):
+                            TOKENS.labels("in").inc(usage["input_tokens"])
+                        if usage.get("output_tokens"):
+                            TOKENS.labels("out").inc(usage["output_tokens"])
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self.started.pop(run_id, None)
+
+            def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+                self.started[run_id] = (serialized or {}).get("name", "tool")
+
+            def on_tool_end(self, output, *, run_id, **kwargs):
+                TOOL_CALLS.labels(self.started.pop(run_id, "tool"), "ok").inc()
+
+            def on_tool_error(self, error, *, run_id, **kwargs):
+                TOOL_CALLS.labels(self.started.pop(run_id, "tool"), "error").inc()
+
+        _handler = MetricsCallbackHandler()
+    return _handler
+
+
+# --- Exporters ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port, host=DEFAULT_HOST, registry=REGISTRY):
+    """Serve /metrics on a background thread and return the server"""
+    httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    httpd.daemon_threads = True
+    httpd.registry = registry
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+    return httpd
+
+
+def write_metrics(path, registry=REGISTRY):
+    """Write the current metrics to a file, replacing it atomically"""
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.replace(temp_path, path)
+    except IOError as e:
+        print(f"⚠️ Could not write metrics file: {str(e)[:100]}")
+
+
+class MetricsFileDumper:
+    """Write the metrics to a file every few seconds"""
+
+    def __init__(self, path, interval=DEFAULT_DUMP_INTERVAL, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            write_metrics(self.path, self.registry)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        write_metrics(self.path, self.registry)
+
+
+def start_exporters(port=None, path=None, interval=DEFAULT_DUMP_INTERVAL):
+    """Start the HTTP endpoint and/or file dump, falling back to the environment"""
+    port = port or os.environ.get(METRICS_PORT_ENV)
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    exporters = []
+    if port:
+        try:
+            exporters.append(start_http_server(int(port)))
+            print(f"📈 Metrics available on http://{DEFAULT_HOST}:{port}/metrics")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not start metrics endpoint: {str(e)[:100]}")
+    if path:
+        exporters.append(MetricsFileDumper(path, interval).start())
+        print(f"📈 Metrics written to {path} every {interval}s")
+    return exporters
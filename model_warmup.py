@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Model Warm-up Manager for Rona_v5
+تسخين النماذج وإبقاؤها في الذاكرة لرونا
+
+Loading a model into Ollama can take longer than the agent's execution limit,
+so the first question after launch used to time out. The chat and embedding
+models are loaded in the background at startup with an explicit keep-alive and
+reloaded shortly before that keep-alive expires.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import hardware_tuner
+from preflight import ollama_base_urls
+
+# --- Warm-up Configurations ---
+KEEP_ALIVE_ENV = "RONA_KEEP_ALIVE"
+DEFAULT_KEEP_ALIVE = 30 * 60
+REFRESH_FRACTION = 0.8
+RETRY_DELAY = 30.0
+WARMUP_TIMEOUT = 300.0
+
+STATE_COLD = "cold"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+def configured_keep_alive():
+    """Return the keep-alive in seconds from RONA_KEEP_ALIVE, or the default"""
+    value = os.environ.get(KEEP_ALIVE_ENV, "").strip()
+    if not value:
+        return DEFAULT_KEEP_ALIVE
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        print(f"⚠️ Invalid {KEEP_ALIVE_ENV} value '{value}', using {DEFAULT_KEEP_ALIVE}s")
+        return DEFAULT_KEEP_ALIVE
+
+
+class WarmModel:
+    """Residency state of one model on one Ollama host"""
+
+    def __init__(self, model, kind, base_url):
+        self.model = model
+        self.kind = kind
+        self.base_url = base_url
+        self.state = STATE_COLD
+        self.warmed_at = None
+        self.expires_at = None
+        self.load_seconds = None
+        self.error = None
+        self.options = None
+
+    def current_state(self, now):
+        if self.state == STATE_READY and self.expires_at is not None and now >= self.expires_at:
+            return STATE_COLD
+        return self.state
+
+    def to_dict(self, now):
+        return {
+            "model": self.model,
+            "kind": self.kind,
+            "base_url": self.base_url,
+            "state": self.current_state(now),
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "expires_in": round(self.expires_at - now) if self.expires_at is not None else None,
+            "error": self.error,
+        }
+
+
+class ModelWarmupManager:
+    """Preload models on startup and keep them resident"""
+
+    def __init__(self, targets, keep_alive=None, refresh_fraction=REFRESH_FRACTION,
+                 on_status_change=None, timeout=WARMUP_TIMEOUT, retry_delay=RETRY_DELAY):
+        self.entries = [WarmModel(model, kind, base_url) for model, kind, base_url in targets]
+        self.keep_alive = configured_keep_alive() if keep_alive is None else keep_alive
+        self.refresh_fraction = refresh_fraction
+        self.on_status_change = on_status_change
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def for_models(cls, chat_model, embedding_model, **kwargs):
+        """Warm the chat model on every chat host and the embedding model on every embedding host"""
+        targets = [(chat_model, "chat", url) for url in ollama_base_urls("chat")]
+        targets += [(embedding_model, "embeddings", url) for url in ollama_base_urls("embeddings")]
+        return cls(targets, **kwargs)
+
+    def _set_state(self, entry, state):
+        with self._lock:
+            entry.state = state
+        if self.on_status_change is not None:
+            try:
+                self.on_status_change(entry.model, state)
+            except Exception as e:
+                print(f"⚠️ Warm-up status callback failed: {str(e)[:100]}")
+
+    def warm(self, entry):
+        """Load one model into memory with the configured keep-alive"""
+        if entry.state != STATE_READY:
+            self._set_state(entry, STATE_WARMING)
+        started = time.monotonic()
+        try:
+            if entry.kind == "embeddings":
+                response = requests.post(
+                    f"{entry.base_url}/api/embed",
+                    json={"model": entry.model, "input": "warm-up", "keep_alive": self.keep_alive},
+                    timeout=self.timeout
+                )
+            else:
+                # Ollama reloads a model whose runner options change, so load it with the
+                # options get_agent_llm uses, and keep them the same for every refresh
+                if entry.options is None:
+                    entry.options = hardware_tuner.get_llm_options(entry.model)
+                # A generate request without a prompt only loads the model
+                response = requests.post(
+                    f"{entry.base_url}/api/generate",
+                    json={"model": entry.model, "keep_alive": self.keep_alive, "stream": False,
+                          "options": entry.options},
+                    timeout=self.timeout
+                )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            entry.error = str(e)[:100]
+            entry.expires_at = None
+            print(f"⚠️ Failed to warm up {entry.model} on {entry.base_url}: {entry.error}")
+            self._set_state(entry, STATE_FAILED)
+            return False
+
+        now = time.monotonic()
+        entry.load_seconds = now - started
+        entry.warmed_at = now
+        entry.expires_at = now + self.keep_alive
+        entry.error = None
+        self._set_state(entry, STATE_READY)
+        return True
+
+    def warm_all(self):
+        """Warm every model in parallel and return True if all succeeded"""
+        if not self.entries:
+            return True
+        with ThreadPoolExecutor(max_workers=len(self.entries)) as executor:
+            return all(executor.map(self.warm, self.entries))
+
+    def _run(self):
+        self.warm_all()
+        # Failed models are retried after retry_delay counted from their last attempt
+        attempts = {id(entry): time.monotonic() for entry in self.entries}
+
+        while self.entries and not self._stop.is_set():
+            due_times = []
+            for entry in self.entries:
+                if entry.state == STATE_READY:
+                    due_times.append((entry.warmed_at + self.keep_alive * self.refresh_fraction, entry))
+                else:
+                    due_times.append((attempts[id(entry)] + self.retry_delay, entry))
+
+            next_due = min(due for due, _ in due_times)
+            if self._stop.wait(max(0.0, next_due - time.monotonic())):
+                return
+
+            now = time.monotonic()
+            for due, entry in due_times:
+                if due <= now:
+                    attempts[id(entry)] = now
+                    self.warm(entry)
+
+    def start(self):
+        """Warm up and keep refreshing on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [entry.to_dict(now) for entry in self.entries]
+
+    def state_of(self, kind):
+        """Overall state of a kind of model: ready only when every host has it loaded"""
+        states = [entry["state"] for entry in self.status() if entry["kind"] == kind]
+        if not states:
+            return STATE_COLD
+        for state in (STATE_FAILED, STATE_WARMING, STATE_COLD):
+            if state in states:
+                return state
+        return STATE_READY
+
+    def is_ready(self, kind="chat"):
+        return self.state_of(kind) == STATE_READY
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama Host Pool for Rona_v5
+توزيع الطلبات على عدة خوادم Ollama لرونا
+
+Spreads chat and embedding requests over several Ollama base URLs. Each request
+goes to the healthy host with the fewest requests in flight; hosts that keep
+failing are ejected for a cool-down period and reinstated by health checks.
+Chat and embeddings can use separate pools.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+import requests
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+from pydantic import PrivateAttr
+
+# --- Pool Configurations ---
+CHAT_HOSTS_ENV = "RONA_OLLAMA_HOSTS"
+EMBED_HOSTS_ENV = "RONA_OLLAMA_EMBED_HOSTS"
+
+DEFAULT_MAX_FAILURES = 3
+DEFAULT_EJECT_SECONDS = 30.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 10.0
+DEFAULT_HEALTH_CHECK_TIMEOUT = 2.0
+LATENCY_SMOOTHING = 0.3
+
+
+class NoHealthyHostError(RuntimeError):
+    """Raised when every host in the pool has failed the current request"""
+
+
+def parse_hosts(value):
+    """Parse a comma-separated list of Ollama base URLs"""
+    hosts = []
+    for item in (value or "").split(","):
+        item = item.strip().rstrip("/")
+        if not item:
+            continue
+        if "://" not in item:
+            item = f"http://{item}"
+        if item not in hosts:
+            hosts.append(item)
+    return hosts
+
+
+def configured_hosts(kind="chat"):
+    """Return the base URLs configured for chat or embeddings
+
+    Embeddings fall back to the chat hosts when no separate list is set.
+    """
+    chat_hosts = parse_hosts(os.environ.get(CHAT_HOSTS_ENV, ""))
+    if kind == "embeddings":
+        return parse_hosts(os.environ.get(EMBED_HOSTS_ENV, "")) or chat_hosts
+    return chat_hosts
+
+
+def is_host_error(error):
+    """Whether an exception points at the host rather than at the request"""
+    if isinstance(error, (ConnectionError, TimeoutError, requests.RequestException)):
+        return True
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class OllamaHost:
+    """Load and health state of a single Ollama base URL"""
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.latency = None
+
+    def is_available(self, now):
+        return now >= self.ejected_until
+
+    def status(self, now):
+        return {
+            "url": self.url,
+            "healthy": self.is_available(now),
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+        }
+
+
+class OllamaPool:
+    """Least-loaded routing with ejection of unhealthy hosts"""
+
+    def __init__(self, base_urls, max_failures=DEFAULT_MAX_FAILURES, eject_seconds=DEFAULT_EJECT_SECONDS,
+                 health_check_timeout=DEFAULT_HEALTH_CHECK_TIMEOUT):
+        if not base_urls:
+            raise ValueError("OllamaPool needs at least one base URL")
+        self.hosts = [OllamaHost(url) for url in parse_hosts(",".join(base_urls))]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_check_timeout = health_check_timeout
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop_health_checks = threading.Event()
+
+    @property
+    def urls(self):
+        return [host.url for host in self.hosts]
+
+    def _choose(self, exclude):
+        """Pick the least-loaded available host, or the one that recovers soonest"""
+        now = time.monotonic()
+        candidates = [host for host in self.hosts if host.url not in exclude]
+        if not candidates:
+            raise NoHealthyHostError("All Ollama hosts failed this request")
+
+        available = [host for host in candidates if host.is_available(now)]
+        if available:
+            return min(available, key=lambda host: (
+                host.in_flight,
+                host.latency if host.latency is not None else 0.0
+            ))
+        # Every host is ejected: try the one whose cool-down ends first rather than failing outright
+        return min(candidates, key=lambda host: host.ejected_until)
+
+    @contextmanager
+    def acquire(self, exclude=()):
+        """Reserve a host for one request and record how it went"""
+        with self._lock:
+            host = self._choose(exclude)
+            host.in_flight += 1
+            host.total_requests += 1
+        started = time.monotonic()
+        try:
+            yield host.url
+        except Exception as e:
+            if is_host_error(e):
+                with self._lock:
+                    self._record_failure(host)
+            raise
+        else:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                host.consecutive_failures = 0
+                host.latency = elapsed if host.latency is None else \
+                    (1 - LATENCY_SMOOTHING) * host.latency + LATENCY_SMOOTHING * elapsed
+        finally:
+            # Also reached when a stream is cancelled (a BaseException) or closed early
+            with self._lock:
+                host.in_flight -= 1
+
+    def _record_failure(self, host):
+        host.consecutive_failures += 1
+        host.total_failures += 1
+        if host.consecutive_failures >= self.max_failures:
+            host.ejected_until = time.monotonic() + self.eject_seconds
+            print(f"⚠️ Ejected Ollama host {host.url} for {self.eject_seconds:.0f}s")
+
+    def call(self, fn):
+        """Run fn(base_url) on the best host, retrying on other hosts after host errors"""
+        tried = set()
+        last_error = None
+        while len(tried) < len(self.hosts):
+            url = None
+            try:
+                with self.acquire(exclude=tried) as url:
+                    return fn(url)
+            except Exception as e:
+                if not is_host_error(e):
+                    raise
+                tried.add(url)
+                last_error = e
+        raise NoHealthyHostError(f"All Ollama hosts failed: {str(last_error)[:100]}")
+
+    # --- Health checks ---
+
+    def check_health(self):
+        """Probe every host once, reinstating healthy hosts and ejecting dead ones"""
+        for host in self.hosts:
+            try:
+                response = requests.get(f"{host.url}/api/version", timeout=self.health_check_timeout)
+                healthy = response.status_code == 200
+            except requests.RequestException:
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    host.consecutive_failures = 0
+                    host.ejected_until = 0.0
+                else:
+                    host.consecutive_failures = max(host.consecutive_failures, self.max_failures - 1)
+                    self._record_failure(host)
+        return self.status()
+
+    def start_health_checks(self, interval=DEFAULT_HEALTH_CHECK_INTERVAL):
+        """Run health checks periodically on a daemon thread"""
+        if self._health_thread is not None:
+            return
+
+        def loop():
+            while not self._stop_health_checks.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name="ollama-pool-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        self._stop_health_checks.set()
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [host.status(now) for host in self.hosts]
+
+
+class PooledChatOllama(BaseChatModel):
+    """ChatOllama that sends each request to the least-loaded host of a pool"""
+
+    pool: Any
+    model: str
+    llm_kwargs: dict = {}
+    _llms: dict = PrivateAttr(default_factory=dict)
+    _llms_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "pooled-ollama"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "hosts": self.pool.urls, **self.llm_kwargs}
+
+    def _llm_for(self, base_url):
+        with self._llms_lock:
+            llm = self._llms.get(base_url)
+            if llm is None:
+                llm = ChatOllama(model=self.model, base_url=base_url, **self.llm_kwargs)
+                self._llms[base_url] = llm
+            return llm
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self.pool.call(
+            lambda url: self._llm_for(url)._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # A stream cannot be retried elsewhere once tokens have been emitted
+        with self.pool.acquire() as url:
+            yield from self._llm_for(url)._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """OllamaEmbeddings that spreads requests over a pool of hosts"""
+
+    def __init__(self, pool, model, **embeddings_kwargs):
+        self.pool = pool
+        self.model = model
+        self.embeddings_kwargs = embeddings_kwargs
+        self._embedders = {}
+        self._lock = threading.Lock()
+
+    def _embedder_for(self, base_url):
+        with self._lock:
+            embedder = self._embedders.get(base_url)
+            if embedder is None:
+                embedder = OllamaEmbeddings(model=self.model, base_url=base_url, **self.embeddings_kwargs)
+                self._embedders[base_url] = embedder
+            return embedder
+
+    def embed_documents(self, texts):
+        return self.pool.call(lambda url: self._embedder_for(url).embed_documents(texts))
+
+    def embed_query(self, text):
+        return self.pool.call(lambda url: self._embedder_for(url).embed_query(text))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(base_urls, start_health_checks=True):
+    """Return the shared pool for a set of base URLs"""
+    key = tuple(parse_hosts(",".join(base_urls)))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = OllamaPool(list(key))
+            if start_health_checks:
+                pool.start_health_checks()
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ollama Stub Server for Rona_v5
+خادم Ollama وهمي لاختبار رونا
+
+A small HTTP server speaking the parts of the Ollama API that Rona uses, so
+pooling, failover and load tests can run without real models. Replies can be
+streamed at a fixed token rate, request latency drawn from a distribution and
+failures injected at a given rate; embeddings come from a hash of the text.
+With a seed, a run is reproducible.
+
+Run standalone and point Rona at it:
+    python ollama_stub.py --token-rate 30 --latency lognormal:0.2,0.5
+    OLLAMA_HOST=http://127.0.0.1:11434 python rona_v5_updated.py
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_EMBEDDING_SIZE = 64
+DEFAULT_KEEP_ALIVE = 300
+DEFAULT_PORT = 11434
+DEFAULT_HANG_SECONDS = 30
+STUB_VERSION = "0.0.0-stub"
+FAILURE_MODES = ("error", "timeout", "disconnect", "malformed")
+# Endpoints that do model work; injected failures only apply here
+MODEL_PATHS = ("/api/chat", "/api/generate", "/api/embed", "/api/embeddings")
+# Words used to build replies of a requested length
+REPLY_WORDS = ("رونا", "تساعدك", "في", "البرمجة", "Python", "والبحث", "عن", "المعلومات", "بسرعة", "ودقة")
+
+
+def deterministic_embedding(text, size=DEFAULT_EMBEDDING_SIZE):
+    """Return a unit vector derived from a hash of the text"""
+    values = []
+    counter = 0
+    while len(values) < size:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        values.extend((byte - 127.5) / 127.5 for byte in digest)
+        counter += 1
+    values = values[:size]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def deterministic_reply(prompt, tokens):
+    """Return a reply of `tokens` words chosen from a hash of the prompt"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return " ".join(REPLY_WORDS[(digest[i % len(digest)] + i) % len(REPLY_WORDS)] for i in range(tokens))
+
+
+def parse_keep_alive(value):
+    """Convert an Ollama keep_alive value (seconds or a duration like '5m') to seconds"""
+    if value is None or value == "":
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in ("ms", "s", "m", "h"):
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * units[suffix]
+    return float(value)
+
+
+class LatencyDistribution:
+    """Seconds of delay drawn from a named distribution
+
+    Specs: "0.2" or "fixed:0.2", "uniform:low,high", "normal:mean,stdev",
+    "lognormal:median,sigma" and "exponential:mean". Samples are never negative.
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+    ARITY = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, kind="fixed", *params):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        params = [float(param) for param in params] or [0.0]
+        if len(params) != self.ARITY[kind]:
+            raise ValueError(f"{kind} latency takes {self.ARITY[kind]} parameter(s)")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec):
+        """Build a distribution from a number, a spec string or an existing distribution"""
+        if isinstance(spec, cls):
+            return spec
+        if spec is None or spec == "":
+            return cls("fixed", 0.0)
+        if isinstance(spec, (int, float)):
+            return cls("fixed", spec)
+        kind, _, params = str(spec).partition(":")
+        if not params:
+            return cls("fixed", kind)
+        return cls(kind, *params.split(","))
+
+    @property
+    def is_zero(self):
+        return self.kind == "fixed" and self.params[0] == 0
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = p[0] * math.exp(rng.gauss(0, p[1]))
+        else:
+            value = rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self):
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    """Handle Ollama API requests using the settings of the owning stub"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per request
+    disable_nagle_algorithm = True
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def log_message(self, format, *args):
+        if self.stub.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _begin(self):
+        """Record the request and apply latency/failure settings
+
+        Returns (ok, failure): ok is False when the request has already been
+        answered; failure is "disconnect" when the reply should be cut short.
+        """
+        self.stub.record_request(self.path)
+        delay = self.stub.sample_latency()
+        if delay:
+            time.sleep(delay)
+        if self.stub.fail:
+            self._send_json(500, {"error": "stub failure"})
+            return False, None
+        failure = self.stub.draw_failure(self.path)
+        if failure == "error":
+            self._send_json(500, {"error": "injected failure"})
+            return False, None
+        if failure == "timeout":
+            time.sleep(self.stub.hang_seconds)
+            self.close_connection = True
+            return False, None
+        if failure == "malformed":
+            body = b'{"model": "stub", "message": {"content": '
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return False, None
+        return True, failure
+
+    def _disconnect(self):
+        """Drop the connection without completing the response"""
+        self.close_connection = True
+        self.wfile.flush()
+        self.connection.close()
+
+    def do_GET(self):
+        ok, _ = self._begin()
+        if not ok:
+            return
+        if self.path == "/api/version":
+            self._send_json(200, {"version": STUB_VERSION})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name, "model": name} for name in self.stub.models]})
+        elif self.path == "/api/ps":
+            self._send_json(200, {"models": [
+                {"name": name, "model": name,
+                 "expires_at": datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc).isoformat()}
+                for name, expires_at in self.stub.loaded_models().items()
+            ]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        payload = self._read_json()
+        self.stub.last_payload = payload
+        ok, failure = self._begin()
+        if not ok:
+            return
+        if payload.get("model"):
+            self.stub.load_model(payload["model"], payload.get("keep_alive"))
+        if self.path == "/api/chat":
+            self._chat(payload, failure)
+        elif self.path == "/api/generate":
+            self._generate(payload, failure)
+        elif failure == "disconnect":
+            self._disconnect()
+        elif self.path == "/api/embed":
+            inputs = payload.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            self._send_json(200, {
+                "model": payload.get("model", ""),
+                "embeddings": [deterministic_embedding(text, self.stub.embedding_size) for text in inputs],
+                "prompt_eval_count": sum(len(text.split()) for text in inputs)
+            })
+        elif self.path == "/api/embeddings":
+            self._send_json(200, {
+                "embedding": deterministic_embedding(payload.get("prompt", ""), self.stub.embedding_size)
+            })
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _reply_text(self, prompt):
+        if self.stub.reply:
+            return self.stub.reply
+        if self.stub.reply_tokens:
+            return deterministic_reply(prompt, self.stub.reply_tokens)
+        return f"stub reply from {self.stub.name}: {prompt[-40:]}"
+
+    def _final_fields(self, prompt, tokens):
+        eval_duration = int(len(tokens) / self.stub.token_rate * 1e9) if self.stub.token_rate else 0
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": eval_duration,
+            "prompt_eval_count": len(prompt.split()),
+            "eval_count": len(tokens),
+            "eval_duration": eval_duration,
+        }
+
+    def _chat(self, payload, failure=None):
+        messages = payload.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        text = self._reply_text(prompt)
+        model = payload.get("model", "")
+        tokens = text.split(" ")
+        self.stub.record_tokens(len(tokens))
+
+        if payload.get("stream", True) is False:
+            if self._wait_for_tokens(len(tokens), failure):
+                return
+            self._send_json(200, {
+                "model": model,
+                "created_at": "1970-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": text},
+                **self._final_fields(prompt, tokens)
+            })
+            return
+
+        lines = [{
+            "model": model,
+            "created_at": "1970-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": token + (" " if i < len(tokens) - 1 else "")},
+            "done": False,
+        } for i, token in enumerate(tokens)]
+        lines.append({
+            "model": model,
+            "created_at": "1970-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": ""},
+            **self._final_fields(prompt, tokens)
+        })
+        self._send_ndjson(lines, failure)
+
+    def _generate(self, payload, failure=None):
+        model = payload.get("model", "")
+        if not payload.get("prompt"):
+            # Like Ollama, a request without a prompt only loads the model
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "load"})
+            return
+        prompt = payload.get("prompt", "")
+        text = self._reply_text(prompt)
+        tokens = text.split(" ")
+        self.stub.record_tokens(len(tokens))
+        if payload.get("stream", True) is False:
+            if self._wait_for_tokens(len(tokens), failure):
+                return
+            self._send_json(200, {"model": model, "response": text, **self._final_fields(prompt, tokens)})
+            return
+        lines = [{"model": model, "response": token + " ", "done": False} for token in tokens]
+        lines.append({"model": model, "response": "", **self._final_fields(prompt, tokens)})
+        self._send_ndjson(lines, failure)
+
+    def _wait_for_tokens(self, count, failure=None):
+        """Spend the time generating `count` tokens would take; True if the connection was dropped"""
+        if self.stub.token_rate:
+            time.sleep((count // 2 if failure == "disconnect" else count) / self.stub.token_rate)
+        if failure == "disconnect":
+            self._disconnect()
+            return True
+        return False
+
+    def _send_ndjson(self, lines, failure=None):
+        """Send NDJSON lines, paced at the token rate and cut off halfway on a disconnect"""
+        if not self.stub.token_rate and failure is None:
+            body = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1 / self.stub.token_rate if self.stub.token_rate else 0
+        count = len(lines) // 2 if failure == "disconnect" else len(lines)
+        for i, line in enumerate(lines[:count]):
+            # The final line carries no token, so it is sent right after the last one
+            if interval and i < len(lines) - 1:
+                time.sleep(interval)
+            data = (json.dumps(line) + "\n").encode("utf-8")
+            try:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away, as Ollama sees when a caller cancels; stop generating
+                self.stub.record_abort()
+                self.close_connection = True
+                return
+        if failure == "disconnect":
+            self._disconnect()
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class OllamaStubServer:
+    """Run a stub Ollama server on a background thread
+
+    latency: seconds or a LatencyDistribution spec, applied to every request.
+    token_rate: reply tokens per second for chat/generate (None means instant).
+    reply_tokens: reply length in words when no fixed reply is given.
+    failure_rate/failure_mode: share of model requests that fail and how -
+    "error" (HTTP 500), "timeout" (hang for hang_seconds), "disconnect"
+    (connection dropped mid-reply) or "malformed" (truncated JSON).
+    fail: when set, every request gets an HTTP 500.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, name="stub", latency=0.0, load_latency=0.0, reply=None,
+                 models=("mistral:7b", "nomic-embed-text"), embedding_size=DEFAULT_EMBEDDING_SIZE, verbose=False,
+                 token_rate=None, reply_tokens=None, failure_rate=0.0, failure_mode="error",
+                 hang_seconds=DEFAULT_HANG_SECONDS, seed=None):
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"Unknown failure mode: {failure_mode}")
+        self.name = name
+        self.latency = LatencyDistribution.parse(latency)
+        self.load_latency = load_latency
+        self.reply = reply
+        self.reply_tokens = reply_tokens
+        self.token_rate = token_rate
+        self.models = list(models)
+        self.embedding_size = embedding_size
+        self.verbose = verbose
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.hang_seconds = hang_seconds
+        self.fail = False
+        self.request_count = 0
+        self.requests_by_path = {}
+        self.failures_injected = 0
+        self.tokens_generated = 0
+        self.streams_aborted = 0
+        self.loads = 0
+        self.last_payload = None
+        self._loaded = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), OllamaStubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, path):
+        with self._lock:
+            self.request_count += 1
+            self.requests_by_path[path] = self.requests_by_path.get(path, 0) + 1
+
+    def record_tokens(self, count):
+        with self._lock:
+            self.tokens_generated += count
+
+    def record_abort(self):
+        with self._lock:
+            self.streams_aborted += 1
+
+    def sample_latency(self):
+        """Draw the delay for one request"""
+        if not isinstance(self.latency, LatencyDistribution):
+            # Allow assigning a plain number or spec while the stub is running
+            self.latency = LatencyDistribution.parse(self.latency)
+        if self.latency.is_zero:
+            return 0.0
+        with self._lock:
+            return self.latency.sample(self._random)
+
+    def draw_failure(self, path):
+        """Return the failure mode to inject for this request, or None"""
+        if not self.failure_rate or path not in MODEL_PATHS:
+            return None
+        with self._lock:
+            if self._random.random() >= self.failure_rate:
+                return None
+            self.failures_injected += 1
+        return self.failure_mode
+
+    def load_model(self, model, keep_alive=None):
+        """Mark a model as resident, paying load_latency if it was not loaded"""
+        keep_alive = parse_keep_alive(keep_alive)
+        with self._lock:
+            resident = self._loaded.get(model, 0) > time.time()
+            if not resident:
+                self.loads += 1
+        if not resident and self.load_latency:
+            time.sleep(self.load_latency)
+        with self._lock:
+            if keep_alive == 0:
+                self._loaded.pop(model, None)
+            else:
+                self._loaded[model] = time.time() + keep_alive
+
+    def loaded_models(self):
+        """Return resident models and the wall-clock time they expire"""
+        now = time.time()
+        with self._lock:
+            return {model: expires_at for model, expires_at in self._loaded.items() if expires_at > now}
+
+    def stats(self):
+        """Return counters describing the traffic served so far"""
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "requests_by_path": dict(self.requests_by_path),
+                "failures_injected": self.failures_injected,
+                "tokens_generated": self.tokens_generated,
+                "streams_aborted": self.streams_aborted,
+                "model_loads": self.loads,
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"ollama-stub-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    """Run the stub in the foreground until interrupted"""
+    parser = argparse.ArgumentParser(description="Stub Ollama server for load and latency tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--models", nargs="+", default=["mistral:7b", "nomic-embed-text"])
+    parser.add_argument("--token-rate", type=float, help="reply tokens per second (default: instant)")
+    parser.add_argument("--latency", default="0", help="e.g. 0.2, uniform:0.1,0.3 or lognormal:0.2,0.5")
+    parser.add_argument("--load-latency", type=float, default=0.0, help="seconds to load a cold model")
+    parser.add_argument("--reply", help="fixed reply text")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="reply length when --reply is not given")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of model requests that fail")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="error")
+    parser.add_argument("--hang-seconds", type=float, default=DEFAULT_HANG_SECONDS)
+    parser.add_argument("--embedding-size", type=int, default=DEFAULT_EMBEDDING_SIZE)
+    parser.add_argument("--seed", type=int, help="make latency and failures reproducible")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    try:
+        stub = OllamaStubServer(
+            args.host, args.port, latency=args.latency, load_latency=args.load_latency, reply=args.reply,
+            models=args.models, embedding_size=args.embedding_size, verbose=args.verbose,
+            token_rate=args.token_rate, reply_tokens=args.reply_tokens, failure_rate=args.failure_rate,
+            failure_mode=args.failure_mode, hang_seconds=args.hang_seconds, seed=args.seed
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ لا يمكن تشغيل الخادم الوهمي: {str(e)[:100]}")
+        return 1
+
+    print(f"🤖 خادم Ollama الوهمي يعمل على {stub.url}")
+    print(f"   latency={stub.latency} token_rate={args.token_rate or 'instant'} "
+          f"failure_rate={args.failure_rate} ({args.failure_mode})")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 تم الإيقاف: {json.dumps(stub.stats())}")
+    finally:
+        stub.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
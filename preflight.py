@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Preflight Checks for Rona_v5
+فحوصات ما قبل تشغيل رونا
+
+Checks that the required packages are installed (without importing them) and
+that Ollama answers on its HTTP API with the required models pulled. The checks
+run in parallel, Ollama is polled with exponential backoff instead of a fixed
+sleep, and a successful result is cached for a short time so repeated launches
+skip the probes.
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+
+# --- Preflight Configurations ---
+DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
+REQUIRED_MODELS = ["mistral:7b"]
+# Missing recommended models are reported as warnings: Rona starts, but memory search is unavailable
+RECOMMENDED_MODELS = ["nomic-embed-text"]
+# Import name -> pip package name
+REQUIRED_MODULES = {
+    "customtkinter": "customtkinter",
+    "langchain": "langchain",
+    "langchain_ollama": "langchain-ollama",
+    "langchain_community": "langchain-community",
+    "requests": "requests",
+    "bs4": "beautifulsoup4",
+    "chromadb": "chromadb",
+}
+
+PROBE_TIMEOUT = 2.0
+BACKOFF_INITIAL = 0.1
+BACKOFF_MAX_DELAY = 2.0
+SERVER_START_TIMEOUT = 15.0
+CACHE_TTL_SECONDS = 60.0
+CACHE_FILE = os.path.join(tempfile.gettempdir(), "rona_preflight.json")
+
+
+class CheckResult:
+    """Outcome of one preflight check"""
+
+    def __init__(self, name, ok, message, details=None, duration=0.0):
+        self.name = name
+        self.ok = ok
+        self.message = message
+        self.details = details or {}
+        self.duration = duration
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "ok": self.ok,
+            "message": self.message,
+            "details": self.details,
+            "duration": self.duration,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data["ok"], data["message"], data.get("details"), data.get("duration", 0.0))
+
+
+class PreflightReport:
+    """Results of all preflight checks"""
+
+    def __init__(self, results, cached=False, duration=0.0):
+        self.results = results
+        self.cached = cached
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    def failures(self):
+        return [result for result in self.results if not result.ok]
+
+    def warnings(self):
+        return [result for result in self.results if result.ok and result.details.get("missing_recommended")]
+
+    def print_summary(self):
+        source = " (من الذاكرة المؤقتة)" if self.cached else ""
+        for result in self.results:
+            icon = ("⚠️" if result.details.get("missing_recommended") else "✅") if result.ok else "❌"
+            print(f"{icon} {result.message}")
+        print(f"⏱️ مدة الفحص: {self.duration * 1000:.0f} ms{source}")
+
+
+def ollama_base_urls(kind="chat"):
+    """Return the Ollama servers Rona is configured to use for chat or embeddings"""
+    # Imported here: ollama_pool needs langchain, whose absence check_dependencies reports
+    try:
+        from ollama_pool import configured_hosts
+        hosts = configured_hosts(kind)
+    except ImportError:
+        hosts = []
+    if hosts:
+        return hosts
+    host = os.environ.get("OLLAMA_HOST", DEFAULT_OLLAMA_URL).rstrip("/")
+    return [host if "://" in host else f"http://{host}"]
+
+
+def is_local_url(url):
+    return urlparse(url).hostname in ("127.0.0.1", "localhost", "::1")
+
+
+def check_dependencies(modules=None):
+    """Check that required packages are installed without importing them"""
+    modules = REQUIRED_MODULES if modules is None else modules
+    started = time.perf_counter()
+    missing = []
+    for module_name, package_name in modules.items():
+        try:
+            if importlib.util.find_spec(module_name) is None:
+                missing.append(package_name)
+        except (ImportError, ValueError):
+            missing.append(package_name)
+
+    duration = time.perf_counter() - started
+    if missing:
+        return CheckResult("dependencies", False, f"المكتبات التالية مفقودة: {', '.join(missing)}",
+                           {"missing": missing}, duration)
+    return CheckResult("dependencies", True, f"جميع المكتبات المطلوبة مثبتة ({len(modules)})", {}, duration)
+
+
+def probe_ollama(base_url=DEFAULT_OLLAMA_URL, timeout=PROBE_TIMEOUT):
+    """Return the list of model names served by Ollama, or None if it is unreachable"""
+    try:
+        response = requests.get(f"{base_url}/api/tags", timeout=timeout)
+        if response.status_code != 200:
+            return None
+        return [model.get("name", "") for model in response.json().get("models", [])]
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def wait_for_ollama(base_url=DEFAULT_OLLAMA_URL, max_wait=0.0, initial_delay=BACKOFF_INITIAL,
+                    max_delay=BACKOFF_MAX_DELAY):
+    """Poll Ollama with exponential backoff for up to max_wait seconds"""
+    deadline = time.monotonic() + max_wait
+    delay = initial_delay
+    while True:
+        models = probe_ollama(base_url)
+        remaining = deadline - time.monotonic()
+        if models is not None or remaining <= 0:
+            return models
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def has_model(available, model):
+    """Whether a model name matches one of the served models, ignoring the ':latest' tag"""
+    wanted = model if ":" in model else f"{model}:latest"
+    return any(name == model or name == wanted for name in available)
+
+
+def check_ollama(base_url=DEFAULT_OLLAMA_URL, models=None, start_server=False, max_wait=SERVER_START_TIMEOUT,
+                 recommended=None):
+    """Check that Ollama answers at base_url and serves the required models
+
+    Missing recommended models only produce a warning.
+    """
+    models = REQUIRED_MODELS if models is None else models
+    recommended = RECOMMENDED_MODELS if recommended is None else recommended
+    started = time.perf_counter()
+    available = probe_ollama(base_url)
+
+    if available is None and start_server:
+        if shutil.which("ollama") is None:
+            return CheckResult(f"ollama:{base_url}", False, "Ollama غير مثبت",
+                               {"installed": False}, time.perf_counter() - started)
+        print("🚀 بدء تشغيل Ollama...")
+        subprocess.Popen(['ollama', 'serve'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        available = wait_for_ollama(base_url, max_wait=max_wait)
+
+    duration = time.perf_counter() - started
+    if available is None:
+        return CheckResult(f"ollama:{base_url}", False, f"Ollama لا يستجيب على {base_url}",
+                           {"reachable": False}, duration)
+
+    missing = [model for model in models if not has_model(available, model)]
+    if missing:
+        return CheckResult(f"ollama:{base_url}", False,
+                           f"النماذج التالية غير متاحة على {base_url}: {', '.join(missing)}",
+                           {"reachable": True, "missing_models": missing}, duration)
+    missing_recommended = [model for model in recommended if not has_model(available, model)]
+    if missing_recommended:
+        return CheckResult(f"ollama:{base_url}", True,
+                           f"Ollama يعمل على {base_url}، لكن النماذج التالية غير متاحة "
+                           f"ولن يعمل البحث في الذاكرة: {', '.join(missing_recommended)}",
+                           {"reachable": True, "missing_recommended": missing_recommended}, duration)
+    return CheckResult(f"ollama:{base_url}", True, f"Ollama يعمل على {base_url} والنماذج متاحة",
+                       {"reachable": True}, duration)
+
+
+def _cache_key(host_models):
+    return json.dumps({url: [sorted(models), sorted(recommended)]
+                       for url, (models, recommended) in host_models.items()}, sort_keys=True)
+
+
+def _load_cached(key, cache_file, ttl):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("key") == key and time.time() - cached.get("timestamp", 0) < ttl:
+            return [CheckResult.from_dict(result) for result in cached["results"]]
+    except (IOError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _save_cached(key, results, cache_file):
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "timestamp": time.time(),
+                       "results": [result.to_dict() for result in results]}, f, ensure_ascii=False)
+    except IOError as e:
+        print(f"⚠️ Could not cache preflight result: {str(e)[:100]}")
+
+
+def run_preflight(base_urls=None, models=None, modules=None, start_server=False,
+                  use_cache=True, cache_file=CACHE_FILE, ttl=CACHE_TTL_SECONDS, recommended=None,
+                  embedding_urls=None):
+    """Run all checks in parallel and return a PreflightReport
+
+    The chat hosts (base_urls) are checked for the required models and the
+    embedding hosts for the recommended ones; a host in both lists is checked
+    once for all of them. Only successful reports are cached, so a failure is
+    always rechecked.
+    """
+    if base_urls is None:
+        base_urls = ollama_base_urls("chat")
+        if embedding_urls is None:
+            embedding_urls = ollama_base_urls("embeddings")
+    embedding_urls = base_urls if embedding_urls is None else embedding_urls
+    models = REQUIRED_MODELS if models is None else models
+    recommended = RECOMMENDED_MODELS if recommended is None else recommended
+    started = time.perf_counter()
+
+    host_models = {}
+    for url in base_urls:
+        host_models.setdefault(url, ([], []))[0].extend(models)
+    for url in embedding_urls:
+        host_models.setdefault(url, ([], []))[1].extend(recommended)
+    key = _cache_key(host_models)
+
+    if use_cache:
+        cached = _load_cached(key, cache_file, ttl)
+        metrics.record_cache("preflight", cached is not None)
+        if cached is not None:
+            return PreflightReport(cached, cached=True, duration=time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=len(host_models) + 1) as executor:
+        futures = [executor.submit(check_dependencies, modules)]
+        # `ollama serve` can only help with a server on this machine
+        futures += [executor.submit(check_ollama, url, host_required, start_server and is_local_url(url),
+                                    recommended=host_recommended)
+                    for url, (host_required, host_recommended) in host_models.items()]
+        results = [future.result() for future in futures]
+
+    report = PreflightReport(results, duration=time.perf_counter() - started)
+    if use_cache and report.ok:
+        _save_cached(key, results, cache_file)
+    return report
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rona_v5 Headless HTTP Server
+خادم HTTP لرونا بدون واجهة رسومية
+
+Serves chat, ingest and search over HTTP using the same agent components as the
+desktop app, so several users can share one model host. Chat replies can be
+streamed as Server-Sent Events. No display is required.
+
+Endpoints:
+    GET  /health
+    GET  /sessions                      list sessions (?user_id=)
+    POST /sessions                      {"title", "user_id"}
+    GET  /sessions/<id>/messages        (?limit=&before_id=)
+    POST /chat                          {"session_id", "message", "stream"}
+    POST /ingest                        {"text", "source"}
+    GET  /search                        (?q=&k=&source=local|web&engine=)
+    GET  /metrics                       Prometheus text format
+"""
+
+import argparse
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+
+import cancellation
+import metrics
+import tracing
+from internet_search import InternetSearch
+from session_store import SessionStore, SESSION_DB_FILE
+from model_warmup import ModelWarmupManager
+from llm_scheduler import get_default_scheduler, SchedulerFullError, PRIORITY_INTERACTIVE, PRIORITY_INGESTION
+from rona_v5_updated import (
+    MODEL_NAME,
+    EMBEDDING_MODEL_NAME,
+    ConversationManager,
+    get_agent_llm,
+    get_vector_db,
+    get_episodic_memory,
+    get_agent_prompt,
+    build_agent,
+    create_agent_executor,
+    create_agent_tools,
+    create_agent_memory,
+    prepare_agent_input,
+    get_text_splitter,
+    save_memory_to_store,
+    load_memory_from_store,
+)
+
+# --- Server Configurations ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+MAX_ACTIVE_SESSIONS = 100
+BUSY_RETRY_AFTER_SECONDS = 5
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """Forwards LLM tokens and tool calls of one turn to an event queue"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def on_llm_new_token(self, token, **kwargs):
+        if token:
+            self.events.put(("token", {"token": token}))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        name = (serialized or {}).get("name", "")
+        self.events.put(("tool", {"name": name, "input": input_str}))
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put(("tool_result", {"output": str(output)[:500]}))
+
+
+class SessionState:
+    """Conversation, memory and executor of one active session"""
+
+    def __init__(self, conversation_manager, memory, executor, user_id=None):
+        self.conversation_manager = conversation_manager
+        self.memory = memory
+        self.executor = executor
+        # Episodic memory is recalled only from this user's sessions, or this session without a user
+        self.user_id = user_id
+        # Turns queued or running; a session with any is never unloaded
+        self.active_turns = 0
+
+
+class RonaService:
+    """Agent components shared by every session served over HTTP"""
+
+    def __init__(self, session_store=None, scheduler=None, warmup=None):
+        self.session_store = session_store or SessionStore(SESSION_DB_FILE)
+        self.scheduler = scheduler or get_default_scheduler()
+        self.warmup = warmup
+        self.tools = create_agent_tools()
+        self.vector_db = get_vector_db()
+        self.episodic_memory = None
+        if self.vector_db is not None:
+            self.episodic_memory = get_episodic_memory(self.vector_db.embeddings)
+
+        self.llm = get_agent_llm()
+        if self.llm is None:
+            raise RuntimeError(f"Cannot initialize ChatOllama with model {MODEL_NAME}")
+        self.agent_runnable = build_agent(self.llm, self.tools, get_agent_prompt())
+        self.internet_search = InternetSearch()
+
+        self._sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self._stream_ids = itertools.count()
+
+    def health(self):
+        health = {"status": "ok", "model": MODEL_NAME, "scheduler": self.scheduler.metrics()}
+        if self.warmup is not None:
+            health["models"] = self.warmup.status()
+        return health
+
+    # --- Sessions ---
+
+    def list_sessions(self, user_id=None):
+        return self.session_store.list_sessions(user_id=user_id)
+
+    def create_session(self, title=None, user_id=None):
+        return self.session_store.create_session(title=title, user_id=user_id)
+
+    def get_messages(self, session_id, limit=None, before_id=None):
+        if self.session_store.get_session(session_id) is None:
+            raise KeyError(session_id)
+        return self.session_store.get_messages(session_id, limit=limit, before_id=before_id)
+
+    def _remember_evicted(self, session_id, user_id, messages):
+        if self.episodic_memory is not None:
+            self.episodic_memory.remember(messages, session_id, user_id)
+
+    def get_session(self, session_id):
+        """Return the active state of a session, loading it on first use"""
+        with self._sessions_lock:
+            return self._get_session_locked(session_id)
+
+    def _get_session_locked(self, session_id):
+        state = self._sessions.get(session_id)
+        metrics.record_cache("sessions", state is not None)
+        if state is not None:
+            self._sessions.move_to_end(session_id)
+            return state
+
+        session = self.session_store.get_session(session_id)
+        if session is None:
+            raise KeyError(session_id)
+
+        user_id = session["user_id"]
+        manager = ConversationManager(
+            store=self.session_store,
+            session_id=session_id,
+            on_evict=partial(self._remember_evicted, session_id, user_id)
+        )
+        memory = create_agent_memory(self.llm)
+        load_memory_from_store(memory, self.session_store, session_id)
+        executor = create_agent_executor(self.agent_runnable, self.tools, memory)
+        state = SessionState(manager, memory, executor, user_id)
+        self._sessions[session_id] = state
+
+        # Unload idle sessions; their history stays in the session store
+        for idle_id in list(self._sessions):
+            if len(self._sessions) <= MAX_ACTIVE_SESSIONS:
+                break
+            if idle_id != session_id and not self._sessions[idle_id].active_turns:
+                del self._sessions[idle_id]
+        return state
+
+    # --- Chat ---
+
+    def submit_turn(self, session_id, message, callbacks=None, key=None):
+        """Queue one agent turn on the LLM scheduler and return its Future
+
+        Cancelling the turn with scheduler.cancel(key) stops it even while it runs.
+        """
+        # Counted before releasing the sessions lock, so the session cannot be unloaded while queued
+        with self._sessions_lock:
+            state = self._get_session_locked(session_id)
+            state.active_turns += 1
+        try:
+            # Turns of the same session run one at a time without holding a worker while they wait
+            future = self.scheduler.submit(
+                self._count_turn, state, session_id, message, callbacks,
+                priority=PRIORITY_INTERACTIVE, key=key, group=f"session:{session_id}"
+            )
+        except Exception:
+            self._release_turn(state)
+            raise
+        future.add_done_callback(lambda _: self._release_turn(state))
+        return future
+
+    def _release_turn(self, state):
+        with self._sessions_lock:
+            state.active_turns -= 1
+
+    def chat(self, session_id, message, callbacks=None):
+        """Run one agent turn in a session and return the reply"""
+        return self.submit_turn(session_id, message, callbacks).result()
+
+    def _count_turn(self, state, session_id, message, callbacks):
+        try:
+            output = self._run_turn(state, session_id, message, callbacks)
+        except cancellation.OperationCancelled:
+            metrics.TURNS.labels("cancelled").inc()
+            raise
+        except Exception:
+            metrics.TURNS.labels("error").inc()
+            raise
+        metrics.TURNS.labels("ok").inc()
+        return output
+
+    def _run_turn(self, state, session_id, message, callbacks):
+        """Execute a turn on a scheduler worker"""
+        with tracing.trace("turn", session_id=session_id):
+            if not state.conversation_manager.messages():
+                self.session_store.rename_session(session_id, message[:40])
+            state.conversation_manager.add_message("user", message)
+
+            agent_input = prepare_agent_input(
+                message, self.vector_db, state.conversation_manager, self.episodic_memory,
+                session_id=session_id, user_id=state.user_id
+            )
+            callbacks = list(callbacks or []) + [metrics.callback_handler()]
+            token = cancellation.current_token()
+            if token is not None:
+                callbacks.append(cancellation.callback_handler(token))
+            handler = tracing.callback_handler()
+            if handler is not None:
+                callbacks.append(handler)
+            with tracing.span("agent.invoke"):
+                result = state.executor.invoke(agent_input, config={"callbacks": callbacks})
+            output = result.get('output', 'No response found.')
+
+            state.conversation_manager.add_message("assistant", output)
+            save_memory_to_store(state.memory, self.session_store, session_id)
+        return output
+
+    def stream_chat(self, session_id, message):
+        """Queue one agent turn and return an iterator of (event, data) pairs"""
+        events = queue.Queue()
+        # A client that goes away mid-stream cancels its turn
+        key = f"stream:{next(self._stream_ids)}"
+        future = self.submit_turn(session_id, message, callbacks=[StreamingCallbackHandler(events)], key=key)
+
+        def finish(done_future):
+            if done_future.cancelled() or isinstance(done_future.exception(), cancellation.OperationCancelled):
+                events.put(("error", {"error": "Request cancelled"}))
+            elif done_future.exception() is not None:
+                events.put(("error", {"error": str(done_future.exception())[:100]}))
+            else:
+                events.put(("done", {"output": done_future.result()}))
+            events.put(None)
+
+        future.add_done_callback(finish)
+        return _drain_events(events, on_abandon=lambda: self.scheduler.cancel(key))
+
+    # --- Documents ---
+
+    def ingest(self, text, source="api"):
+        """Split text into chunks and add them to the vector database"""
+        if self.vector_db is None:
+            raise RuntimeError("Vector database is not available")
+        return self.scheduler.submit(self._ingest, text, source, priority=PRIORITY_INGESTION).result()
+
+    def _ingest(self, text, source):
+        started = time.perf_counter()
+        documents = [Document(page_content=text, metadata={"source": source})]
+        chunked_documents = get_text_splitter().split_documents(documents)
+        if chunked_documents:
+            self.vector_db.add_documents(chunked_documents)
+        metrics.record_ingestion(len(chunked_documents), len(text), time.perf_counter() - started)
+        return len(chunked_documents)
+
+    def search(self, query, k=4):
+        """Search the local vector database"""
+        if self.vector_db is None:
+            raise RuntimeError("Vector database is not available")
+        # Embedding the query goes to Ollama, so it waits its turn like a chat turn
+        docs = self.scheduler.submit(
+            self.vector_db.similarity_search, query, k=k, priority=PRIORITY_INTERACTIVE
+        ).result()
+        return [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+    def web_search(self, query, engine="google"):
+        """Search the internet with the same engine parsers as the agent tools"""
+        return self.internet_search.search_web(query, engine)
+
+
+class RonaRequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the RonaService attached to the server"""
+
+    server_version = "RonaServer/5.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Helpers ---
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self):
+        body = metrics.REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", metrics.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("Request body too large")
+        if length == 0:
+            return {}
+        payload = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def _send_event_stream(self, events):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for event, data in events:
+                chunk = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            if hasattr(events, "close"):
+                events.close()
+        self.close_connection = True
+
+    # --- Routes ---
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        try:
+            if parts == ["health"]:
+                self._send_json(200, self.service.health())
+            elif parts == ["metrics"]:
+                self._send_metrics()
+            elif parts == ["sessions"]:
+                self._send_json(200, {"sessions": self.service.list_sessions(params.get("user_id"))})
+            elif len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages":
+                limit = int(params["limit"]) if "limit" in params else None
+                before_id = int(params["before_id"]) if "before_id" in params else None
+                messages = self.service.get_messages(parts[1], limit=limit, before_id=before_id)
+                self._send_json(200, {"session_id": parts[1], "messages": messages})
+            elif parts == ["search"]:
+                query = params.get("q", "").strip()
+                if not query:
+                    self._send_error(400, "Missing query parameter 'q'")
+                elif params.get("source", "local") == "web":
+                    results = self.service.web_search(query, params.get("engine", "google"))
+                    self._send_json(200, {"query": query, "results": results})
+                else:
+                    results = self.service.search(query, k=int(params.get("k", 4)))
+                    self._send_json(200, {"query": query, "results": results})
+            else:
+                self._send_error(404, "Not found")
+        except KeyError:
+            self._send_error(404, "Session not found")
+        except ValueError as e:
+            self._send_error(400, str(e)[:100])
+        except SchedulerFullError as e:
+            self._send_json(503, {"error": str(e)[:100]},
+                            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)})
+        except Exception as e:
+            self._send_error(500, str(e)[:100])
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+
+        try:
+            payload = self._read_json()
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send_error(400, f"Invalid JSON body: {str(e)[:80]}")
+            return
+
+        try:
+            if parts == ["sessions"]:
+                session_id = self.service.create_session(payload.get("title"), payload.get("user_id"))
+                self._send_json(201, {"session_id": session_id})
+            elif parts == ["chat"]:
+                self._handle_chat(payload)
+            elif parts == ["ingest"]:
+                text = payload.get("text", "")
+                if not text.strip():
+                    self._send_error(400, "Missing 'text'")
+                    return
+                chunks = self.service.ingest(text, payload.get("source", "api"))
+                self._send_json(200, {"chunks": chunks})
+            else:
+                self._send_error(404, "Not found")
+        except KeyError:
+            self._send_error(404, "Session not found")
+        except SchedulerFullError as e:
+            self._send_json(503, {"error": str(e)[:100]},
+                            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)})
+        except Exception as e:
+            self._send_error(500, str(e)[:100])
+
+    def _handle_chat(self, payload):
+        message = (payload.get("message") or "").strip()
+        if not message:
+            self._send_error(400, "Missing 'message'")
+            return
+
+        session_id = payload.get("session_id")
+        if not session_id:
+            session_id = self.service.create_session(user_id=payload.get("user_id"))
+
+        wants_stream = payload.get("stream") or "text/event-stream" in self.headers.get("Accept", "")
+        if wants_stream:
+            # Queueing errors surface here, before committing to a 200 event stream
+            events = self.service.stream_chat(session_id, message)
+            self._send_event_stream(_with_session_event(session_id, events))
+        else:
+            output = self.service.chat(session_id, message)
+            self._send_json(200, {"session_id": session_id, "output": output})
+
+
+def _drain_events(events, on_abandon=None):
+    """Yield queued events until the end-of-turn marker
+
+    on_abandon is called if the consumer closes the stream before the end.
+    """
+    finished = False
+    try:
+        while True:
+            event = events.get()
+            if event is None:
+                finished = True
+                break
+            yield event
+    finally:
+        if not finished and on_abandon is not None:
+            on_abandon()
+
+
+def _with_session_event(session_id, events):
+    """Prefix an event stream with the session it belongs to"""
+    yield "session", {"session_id": session_id}
+    yield from events
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """Create a threaded HTTP server bound to a RonaService"""
+    server = ThreadingHTTPServer((host, port), RonaRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main():
+    """Run the headless Rona server"""
+    parser = argparse.ArgumentParser(description="Rona_v5 headless HTTP server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=SESSION_DB_FILE, help="Session store database file")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--trace", metavar="FILE", nargs="?", const=tracing.DEFAULT_TRACE_FILE,
+                        help="Write per-turn latency spans to a JSONL file")
+    args = parser.parse_args()
+
+    if args.trace:
+        tracing.configure(args.trace)
+    # /metrics is always served here; RONA_METRICS_PORT / RONA_METRICS_FILE add the other exporters
+    metrics.start_exporters()
+
+    print("🚀 Starting Rona_v5 headless server...")
+    # Start loading the models before the agent is built
+    warmup = ModelWarmupManager.for_models(MODEL_NAME, EMBEDDING_MODEL_NAME).start()
+    try:
+        service = RonaService(SessionStore(args.db), warmup=warmup)
+    except Exception as e:
+        print(f"❌ Failed to initialize Rona service: {str(e)[:100]}")
+        sys.exit(1)
+
+    server = create_server(service, args.host, args.port, args.verbose)
+    print(f"✅ Rona_v5 server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping Rona_v5 server...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,51 +2,72 @@
 import datetime
 import json
 import os
-import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 import customtkinter as ctk
-from functools import partial
 import re
+import threading
 import uuid
 import subprocess
 import platform
 
 # Import internet search functionality
-from internet_search import create_web_search_tool, create_web_content_tool
-
-# Import the necessary components from LangChain and Ollama
-from langchain_ollama import ChatOllama
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain.tools import tool
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import messages_to_dict, messages_from_dict, SystemMessage, HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-try:
-    from langchain_chroma import Chroma
-except ImportError:
-    from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import TextLoader
-from langchain_ollama import OllamaEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from internet_search import InternetSearch, create_web_search_tool, create_web_content_tool
+from session_store import SessionStore, SESSION_DB_FILE
+from llm_scheduler import (
+    get_default_scheduler, SchedulerFullError, PRIORITY_INGESTION
+)
+from lazy_components import ComponentLoader, STATE_LOADING, STATE_READY, STATE_FAILED
+from chat_renderer import ChatRenderer, VirtualChatView
+from ui_queue import UIEventQueue
+from turn_queue import TurnQueue
+import cancellation
+import diagnostics
+import large_input
+import model_warmup
+import hardware_tuner
+import tracing
+import metrics
+
+# LangChain, Ollama and Chroma take seconds to import, so they are imported
+# inside the functions that need them and the window can appear first.
 
 # --- Global Configurations ---
 MODEL_NAME = "mistral:7b"
+EMBEDDING_MODEL_NAME = "nomic-embed-text"
 VECTOR_DB_DIR = "./chroma_db"
 MEMORY_FILE = "agent_memory.json"
 CONVERSATION_HISTORY_FILE = "conversation_history.json"
+# Set to 1 to also search the web ahead of time for messages waiting in the turn queue
+PREFETCH_WEB_ENV = "RONA_PREFETCH_WEB"
 
 class ConversationManager:
-    """Manages conversation history and memory"""
+    """Manages conversation history and memory
+    
+    Without a store the history is kept in CONVERSATION_HISTORY_FILE. With a
+    SessionStore only the given session is loaded and each message is appended
+    to it individually. Turns add messages on scheduler workers while the UI
+    reads the history, so every access goes through the lock; readers on other
+    threads should use messages() rather than conversation_history.
+    """
     
-    def __init__(self, max_history=10):
+    def __init__(self, max_history=10, on_evict=None, store=None, session_id=None):
         self.max_history = max_history
+        self.on_evict = on_evict
+        self.store = store
+        self.session_id = session_id
+        self._lock = threading.RLock()
         self.conversation_history = []
         self.load_conversation_history()
     
+    def messages(self):
+        """Return a snapshot of the conversation history"""
+        with self._lock:
+            return list(self.conversation_history)
+    
     def add_message(self, role, content, timestamp=None):
-        """Add a message to conversation history"""
+        """Add a message to conversation history and return it"""
         if timestamp is None:
             timestamp = datetime.datetime.now().isoformat()
         
@@ -56,17 +77,32 @@ class ConversationManager:
             "timestamp": timestamp
         }
         
-        self.conversation_history.append(message)
-        
-        # Keep only the last max_history messages
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
-        
-        self.save_conversation_history()
+        with self._lock:
+            if self.store is not None:
+                try:
+                    with tracing.span("persist.append_message"):
+                        message["id"] = self.store.append_message(self.session_id, role, content, timestamp)
+                except Exception as e:
+                    print(f"Error saving message to session store: {str(e)[:100]}")
+            
+            self.conversation_history.append(message)
+            
+            # Keep only the last max_history messages
+            if len(self.conversation_history) > self.max_history:
+                evicted = self.conversation_history[:-self.max_history]
+                self.conversation_history = self.conversation_history[-self.max_history:]
+                # Still under the lock, so evictions reach long-term memory in order
+                if self.on_evict is not None:
+                    self.on_evict(evicted)
+            
+            if self.store is None:
+                self.save_conversation_history()
+        return message
     
     def get_recent_context(self, num_messages=2):
         """Get recent conversation context"""
-        recent_messages = self.conversation_history[-num_messages:] if len(self.conversation_history) >= num_messages else self.conversation_history
+        with self._lock:
+            recent_messages = self.conversation_history[-num_messages:]
         context = []
         
         for msg in recent_messages:
@@ -79,40 +115,61 @@ class ConversationManager:
         
         return "\n".join(context)
     
+    @tracing.traced("persist.conversation_history")
     def save_conversation_history(self):
         """Save conversation history to file"""
         try:
-            with open(CONVERSATION_HISTORY_FILE, 'w', encoding='utf-8') as f:
+            with self._lock, open(CONVERSATION_HISTORY_FILE, 'w', encoding='utf-8') as f:
                 json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"Error saving conversation history: {str(e)[:100]}")
     
     def load_conversation_history(self):
-        """Load conversation history from file"""
+        """Load conversation history from the session store or file"""
         try:
-            if os.path.exists(CONVERSATION_HISTORY_FILE):
+            if self.store is not None:
+                history = self.store.get_messages(self.session_id, limit=self.max_history)
+            elif os.path.exists(CONVERSATION_HISTORY_FILE):
                 with open(CONVERSATION_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    self.conversation_history = json.load(f)
+                    history = json.load(f)
             else:
-                self.conversation_history = []
+                history = []
         except Exception as e:
             print(f"Error loading conversation history: {str(e)[:100]}")
-            self.conversation_history = []
+            history = []
+        with self._lock:
+            self.conversation_history = history
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
-        self.save_conversation_history()
+        with self._lock:
+            self.conversation_history = []
+            if self.store is not None:
+                self.store.clear_messages(self.session_id)
+            else:
+                self.save_conversation_history()
 
 def get_agent_llm(model_name=MODEL_NAME, temperature=0.3):
-    """Initialize ChatOllama model"""
+    """Initialize ChatOllama model
+    
+    When RONA_OLLAMA_HOSTS lists several servers, requests are spread over them.
+    """
+    from langchain_ollama import ChatOllama
+    from ollama_pool import configured_hosts, get_pool, PooledChatOllama
+    
     try:
-        llm = ChatOllama(
-            model=model_name,
-            temperature=temperature,
-            num_gpu_layers=35,
-            num_thread=8
-        )
+        # Thread, context and GPU settings come from the profile tuned for this machine
+        llm_kwargs = {
+            "temperature": temperature,
+            **hardware_tuner.get_llm_options(model_name),
+            "keep_alive": model_warmup.configured_keep_alive()
+        }
+        hosts = configured_hosts("chat")
+        if hosts:
+            llm = PooledChatOllama(pool=get_pool(hosts), model=model_name, llm_kwargs=llm_kwargs)
+            print(f"✅ Initialized ChatOllama with model: {model_name} across {len(hosts)} hosts")
+            return llm
+        llm = ChatOllama(model=model_name, **llm_kwargs)
         print(f"✅ Initialized ChatOllama with model: {model_name}")
         return llm
     except Exception as e:
@@ -121,8 +178,18 @@ def get_agent_llm(model_name=MODEL_NAME, temperature=0.3):
 
 def get_embeddings_model():
     """Initialize Ollama embeddings model"""
+    from langchain_ollama import OllamaEmbeddings
+    from ollama_pool import configured_hosts, get_pool, PooledOllamaEmbeddings
+    
     try:
-        embeddings = OllamaEmbeddings(model="nomic-embed-text")
+        hosts = configured_hosts("embeddings")
+        if hosts:
+            embeddings = PooledOllamaEmbeddings(
+                get_pool(hosts), EMBEDDING_MODEL_NAME, keep_alive=model_warmup.configured_keep_alive()
+            )
+            print(f"✅ Initialized Ollama embeddings model across {len(hosts)} hosts")
+            return embeddings
+        embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL_NAME, keep_alive=model_warmup.configured_keep_alive())
         print("✅ Initialized Ollama embeddings model")
         return embeddings
     except Exception as e:
@@ -131,6 +198,11 @@ def get_embeddings_model():
 
 def get_vector_db():
     """Initialize Chroma vector database"""
+    try:
+        from langchain_chroma import Chroma
+    except ImportError:
+        from langchain_community.vectorstores import Chroma
+    
     embeddings = get_embeddings_model()
     
     if embeddings is None:
@@ -143,13 +215,124 @@ def get_vector_db():
             embedding_function=embeddings
         )
         print("✅ Initialized Chroma vector database")
+        metrics.track_vector_db(vector_db)
         return vector_db
     except Exception as e:
         print(f"❌ Error initializing vector database: {str(e)[:100]}")
         return None
 
+def get_episodic_memory(embeddings=None):
+    """Initialize long-term episodic memory in its own Chroma collection"""
+    from episodic_memory import EpisodicMemory
+    
+    if embeddings is None:
+        embeddings = get_embeddings_model()
+    
+    if embeddings is None:
+        print("❌ Failed to initialize embeddings model for episodic memory")
+        return None
+    
+    try:
+        episodic_memory = EpisodicMemory(
+            embeddings,
+            persist_directory=VECTOR_DB_DIR,
+            scheduler=get_default_scheduler()
+        )
+        print("✅ Initialized episodic memory")
+        return episodic_memory
+    except Exception as e:
+        print(f"❌ Error initializing episodic memory: {str(e)[:100]}")
+        return None
+
+def retrieve_context(vector_db, query, episodic_memory=None, session_id=None, user_id=None):
+    """Build the prompt context from the vector database and episodic memory
+
+    session_id / user_id limit the recalled episodes to that session or user.
+    """
+    if vector_db is None:
+        context = "قاعدة البيانات المتجهة غير متاحة. سيتم الاعتماد على المعرفة العامة والإنترنت."
+    else:
+        try:
+            with tracing.span("retrieval.similarity_search", k=2):
+                retrieved_docs = vector_db.similarity_search(query, k=2)
+            if retrieved_docs:
+                context = "\n".join([doc.page_content for doc in retrieved_docs])
+            else:
+                context = "لا يوجد سياق ذو صلة متاح لهذا السؤال في قاعدة البيانات المحلية."
+        except Exception as e:
+            print(f"⚠️ Vector search failed: {str(e)[:50]}")
+            context = "حدث خطأ في البحث في قاعدة البيانات المحلية."
+    
+    if episodic_memory is not None:
+        with tracing.span("retrieval.episodic_recall"):
+            recalled = episodic_memory.recall(query, session_id=session_id, user_id=user_id)
+        if recalled:
+            context += f"\n\nمن محادثات سابقة ذات صلة:\n{recalled}"
+    
+    return context
+
+def prepare_agent_input(user_message, vector_db, conversation_manager, episodic_memory=None, context=None,
+                        session_id=None, user_id=None):
+    """Assemble the agent input for one conversation turn
+
+    A context retrieved ahead of time, while the message was queued, is used
+    as is; the conversation context is always taken now.
+    """
+    if context is None:
+        context = retrieve_context(vector_db, user_message, episodic_memory, session_id, user_id)
+    return {
+        "input": user_message,
+        "context": context,
+        "conversation_context": conversation_manager.get_recent_context(2)
+    }
+
+def create_agent_tools():
+    """Create the date/time and internet search tools available to the agent"""
+    from langchain.tools import tool
+    
+    @tool
+    def get_current_date():
+        """Returns the current date in YYYY-MM-DD format."""
+        return datetime.date.today().strftime("%Y-%m-%d")
+
+    @tool
+    def get_current_time():
+        """Returns the current time in HH:MM:SS format."""
+        return datetime.datetime.now().strftime("%H:%M:%S")
+
+    # Create internet search tools
+    web_search_tool = create_web_search_tool()
+    web_content_tool = create_web_content_tool()
+    
+    return [get_current_date, get_current_time, web_search_tool, web_content_tool]
+
+def create_agent_memory(llm):
+    """Create the windowed chat memory used by the agent executor"""
+    from langchain.memory import ConversationBufferWindowMemory
+    
+    return ConversationBufferWindowMemory(
+        llm=llm,
+        memory_key="chat_history",
+        input_key="input",
+        return_messages=True,
+        k=4
+    )
+
+def get_text_splitter():
+    """Create the text splitter used when ingesting documents"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    
+    return RecursiveCharacterTextSplitter(
+        chunk_size=600,
+        chunk_overlap=30,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""]
+    )
+
 def get_agent_prompt():
     """Create agent prompt template with internet search capability"""
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    
     system_prompt = (
         "أنت Rona_v5، مساعد ذكي ومتخصص في البرمجة والتقنية مع إمكانية البحث في الإنترنت. "
         "مهمتك الأساسية هي الإجابة على الأسئلة بدقة بناءً على السياق المقدم والمعلومات من الإنترنت.\n\n"
@@ -180,12 +363,16 @@ def get_agent_prompt():
 
 def build_agent(llm, tools, prompt):
     """Build the runnable agent"""
+    from langchain.agents import create_tool_calling_agent
+    
     agent = create_tool_calling_agent(llm, tools, prompt)
     print("Agent runnable created.")
     return agent
 
 def create_agent_executor(agent, tools, memory):
     """Create AgentExecutor with memory"""
+    from langchain.agents import AgentExecutor
+    
     agent_executor = AgentExecutor(
         agent=agent,
         tools=tools,
@@ -199,8 +386,11 @@ def create_agent_executor(agent, tools, memory):
     print("✅ Agent executor created.")
     return agent_executor
 
+@tracing.traced("persist.agent_memory_file")
 def save_memory_to_file(memory):
     """Save chat history to JSON file"""
+    from langchain_core.messages import messages_to_dict
+    
     try:
         serialized_messages = messages_to_dict(memory.chat_memory.messages)
         with open(MEMORY_FILE, 'w', encoding='utf-8') as f:
@@ -211,6 +401,8 @@ def save_memory_to_file(memory):
 
 def load_memory_from_file(memory):
     """Load chat history from JSON file"""
+    from langchain_core.messages import messages_from_dict
+    
     if os.path.exists(MEMORY_FILE):
         print(f"Loading memory state from {MEMORY_FILE}")
         try:
@@ -227,12 +419,69 @@ def load_memory_from_file(memory):
     else:
         print("No existing memory file found.")
 
+@tracing.traced("persist.agent_memory_store")
+def save_memory_to_store(memory, store, session_id):
+    """Save chat history of one session to the session store"""
+    from langchain_core.messages import messages_to_dict
+    
+    try:
+        store.save_agent_memory(session_id, messages_to_dict(memory.chat_memory.messages))
+    except Exception as e:
+        print(f"Error saving session memory: {str(e)[:100]}")
+
+def load_memory_from_store(memory, store, session_id):
+    """Load chat history of one session from the session store"""
+    from langchain_core.messages import messages_from_dict
+    
+    try:
+        serialized_messages = store.load_agent_memory(session_id)
+        memory.chat_memory.messages = messages_from_dict(serialized_messages)
+    except Exception as e:
+        print(f"Error loading session memory: {str(e)[:100]}")
+
+def open_session_store(db_path=SESSION_DB_FILE):
+    """Open the session store and return it with the session to resume"""
+    store = SessionStore(db_path)
+    session_id = store.latest_session()
+    if session_id is None:
+        session_id = store.create_session()
+        # Carry over the history kept by older versions in a single global file
+        imported = store.import_history_file(CONVERSATION_HISTORY_FILE, session_id)
+        if imported:
+            print(f"Imported {imported} messages from {CONVERSATION_HISTORY_FILE}")
+    return store, session_id
+
 class RonaApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, fast_start=True):
         super().__init__()
         
-        # Initialize conversation manager
-        self.conversation_manager = ConversationManager()
+        # With fast_start the window is drawn first and heavy components load in the background
+        self.fast_start = fast_start
+        self.vector_db = None
+        self.episodic_memory = None
+        self.agent_llm = None
+        self.agent_memory = None
+        self.agent_executor = None
+        self.web_search = InternetSearch()
+        
+        # All Ollama-bound work of this window shares one bounded scheduler
+        self.llm_scheduler = get_default_scheduler()
+        
+        # Worker threads post UI updates here; one pump applies them on the UI thread
+        self.ui_queue = UIEventQueue(self)
+        # Messages sent while a reply is being generated wait here and run in order
+        self.turn_queue = TurnQueue(
+            self.llm_scheduler, self.run_agent_in_thread,
+            prefetch=self.prefetch_turn,
+            on_change=lambda queue: self.ui_queue.post(self.update_turn_state, key="turn_state"),
+            on_dropped=lambda turn: self.post_notice(f"⚠️ الخادم مشغول حالياً، لم تتم الإجابة على: {turn.message[:60]}")
+        )
+        # Self-tests run in the background with a deadline instead of on the UI thread
+        self.diagnostics = diagnostics.DiagnosticsRunner()
+        
+        # Initialize session-scoped conversation manager
+        self.session_store, self.session_id = open_session_store()
+        self.conversation_manager = ConversationManager(store=self.session_store, session_id=self.session_id)
         
         # Configure window
         self.title("Rona_v5 - مساعدك الذكي مع البحث في الإنترنت")
@@ -270,6 +519,14 @@ class RonaApp(ctk.CTk):
             activate_scrollbars=True
         )
         self.chat_history_text.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        # Messages are appended as they arrive instead of redrawing the transcript, and
+        # only a window of them stays in the textbox; older ones are paged in on scroll
+        self.chat_renderer = ChatRenderer(self.chat_history_text, scroll=self.request_scroll_to_end)
+        self.chat_view = VirtualChatView(
+            self.chat_renderer, self.session_store, self.session_id,
+            schedule=lambda page: self.ui_queue.post(page, key="chat_page")
+        )
+        self.chat_history_text.configure(yscrollcommand=self.on_chat_scrolled)
 
         # Clipboard frame
         self.clipboard_frame = ctk.CTkFrame(self.main_frame)
@@ -310,13 +567,53 @@ class RonaApp(ctk.CTk):
         self.user_input.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="ew")
         self.user_input.bind("<Return>", self.send_message)
         self.user_input.bind("<Button-3>", self.paste_to_input)
+        self.user_input.bind("<<Paste>>", self.paste_to_input)
+        
+        # Multiline input for code and logs: Enter starts a new line and Ctrl+Enter sends
+        self.multiline_mode = False
+        self.multiline_input = ctk.CTkTextbox(self.input_frame, height=120, font=("Arial", 16), wrap="word")
+        self.multiline_input.bind("<Control-Return>", self.send_message)
+        self.multiline_input.bind("<Button-3>", self.paste_to_input)
+        self.multiline_input.bind("<<Paste>>", self.paste_to_input)
+        # Large pastes are kept here instead of in the input widget until the message is sent
+        self.pasted_text = None
         
         self.send_button = ctk.CTkButton(
             self.input_frame,
             text="إرسال",
             command=self.send_message
         )
-        self.send_button.grid(row=0, column=1, padx=(5, 10), pady=10, sticky="e")
+        self.send_button.grid(row=0, column=1, padx=5, pady=10, sticky="e")
+        
+        self.stop_button = ctk.CTkButton(
+            self.input_frame,
+            text="إيقاف",
+            width=80,
+            fg_color="#c0392b",
+            state="disabled",
+            command=self.stop_generating
+        )
+        self.stop_button.grid(row=0, column=2, padx=(5, 10), pady=10, sticky="e")
+        
+        self.input_options_frame = ctk.CTkFrame(self.input_frame, fg_color="transparent")
+        self.input_options_frame.grid(row=1, column=0, columnspan=3, padx=10, pady=(0, 5), sticky="ew")
+        
+        self.multiline_switch = ctk.CTkSwitch(
+            self.input_options_frame,
+            text="إدخال متعدد الأسطر",
+            command=self.toggle_multiline_input
+        )
+        self.multiline_switch.grid(row=0, column=0, padx=5, sticky="w")
+        
+        self.attachment_label = ctk.CTkLabel(self.input_options_frame, text="", font=("Arial", 12))
+        self.attachment_label.grid(row=0, column=1, padx=5, sticky="w")
+        
+        self.remove_attachment_button = ctk.CTkButton(
+            self.input_options_frame,
+            text="إزالة النص الملصق",
+            width=120,
+            command=self.clear_attachment
+        )
         
         # Control frame
         self.control_frame = ctk.CTkFrame(self.main_frame)
@@ -352,51 +649,124 @@ class RonaApp(ctk.CTk):
         )
         self.test_web_search_button.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
         
+        self.session_menu = ctk.CTkOptionMenu(
+            self.control_frame,
+            values=[],
+            command=self.on_session_selected
+        )
+        self.session_menu.grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky="ew")
+        
+        self.new_session_button = ctk.CTkButton(
+            self.control_frame,
+            text="محادثة جديدة",
+            command=self.new_session
+        )
+        self.new_session_button.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+        self.refresh_session_menu()
+        
+        self.status_label = ctk.CTkLabel(self.control_frame, text="", font=("Arial", 12))
+        self.status_label.grid(row=2, column=0, columnspan=4, padx=5, pady=(0, 5), sticky="ew")
+        
+        self.ui_queue.start()
         self.initialize_agent()
 
-    def initialize_agent(self):
-        """Initialize the agent with internet search tools"""
-        @tool
-        def get_current_date():
-            """Returns the current date in YYYY-MM-DD format."""
-            return datetime.date.today().strftime("%Y-%m-%d")
-
-        @tool
-        def get_current_time():
-            """Returns the current time in HH:MM:SS format."""
-            return datetime.datetime.now().strftime("%H:%M:%S")
+    def create_components(self):
+        """Register the heavy components and how they depend on each other"""
+        components = ComponentLoader(on_state_change=self.on_component_state_change)
+        components.add("vector_db", self.load_vector_db)
+        components.add("episodic_memory", self.load_episodic_memory, depends_on=["vector_db"])
+        components.add("llm", self.load_agent_llm)
+        components.add("agent", self.load_agent_executor, depends_on=["llm"])
+        return components
 
-        # Create internet search tools
-        web_search_tool = create_web_search_tool()
-        web_content_tool = create_web_content_tool()
-        
-        self.tools = [get_current_date, get_current_time, web_search_tool, web_content_tool]
-        
-        # Initialize vector database
+    def load_vector_db(self):
+        """Initialize the vector database"""
         self.vector_db = get_vector_db()
+        if self.vector_db is None:
+            raise RuntimeError("Vector database is not available")
         print("Vector database initialized.")
+        return self.vector_db
 
+    def load_episodic_memory(self, vector_db):
+        """Index turns evicted from the conversation window into long-term memory"""
+        self.episodic_memory = get_episodic_memory(vector_db.embeddings)
+        if self.episodic_memory is None:
+            raise RuntimeError("Episodic memory is not available")
+        self.conversation_manager.on_evict = self.remember_evicted_messages
+        return self.episodic_memory
+
+    def load_agent_llm(self):
+        """Initialize the chat model"""
         self.agent_llm = get_agent_llm()
         if self.agent_llm is None:
-            self.display_agent_response("خطأ: لا يمكن الاتصال بخادم Ollama. يرجى التأكد من أنه يعمل وأن نموذج 'mistral:7b' مثبت.")
-            return
+            self.post_notice("خطأ: لا يمكن الاتصال بخادم Ollama. يرجى التأكد من أنه يعمل وأن نموذج 'mistral:7b' مثبت.")
+            raise RuntimeError(f"Cannot initialize ChatOllama with model {MODEL_NAME}")
+        return self.agent_llm
 
-        # Initialize agent memory
-        self.agent_memory = ConversationBufferWindowMemory(
-            llm=self.agent_llm,
-            memory_key="chat_history",
-            input_key="input",
-            return_messages=True,
-            k=4
-        )
-        
-        load_memory_from_file(self.agent_memory)
+    def load_agent_executor(self, llm):
+        """Build the agent with its tools, memory and prompt"""
+        self.tools = create_agent_tools()
+        self.agent_memory = create_agent_memory(llm)
+        load_memory_from_store(self.agent_memory, self.session_store, self.session_id)
         self.agent_prompt = get_agent_prompt()
-        self.agent_runnable = build_agent(self.agent_llm, self.tools, self.agent_prompt)
+        self.agent_runnable = build_agent(llm, self.tools, self.agent_prompt)
         self.agent_executor = create_agent_executor(self.agent_runnable, self.tools, self.agent_memory)
+        return self.agent_executor
+
+    def on_component_state_change(self, name, state):
+        """Called from loader threads whenever a component changes state"""
+        self.ui_queue.post(self.update_status_label, key="status")
+
+    def update_status_label(self):
+        """Show which components are still loading or failed"""
+        names = {
+            "vector_db": "قاعدة البيانات",
+            "episodic_memory": "الذاكرة طويلة المدى",
+            "llm": "النموذج",
+            "agent": "الوكيل"
+        }
+        states = self.components.states()
+        loading = [names.get(name, name) for name, state in states.items() if state == STATE_LOADING]
+        failed = [names.get(name, name) for name, state in states.items() if state == STATE_FAILED]
         
-        self.update_chat_history()
-        self.chat_history_text.tag_config("warning", foreground="#ff3b30")
+        if loading:
+            text = f"⏳ جاري التحميل: {'، '.join(loading)}"
+        elif all(state == STATE_READY for state in states.values()):
+            text = "✅ جاهز"
+        else:
+            text = ""
+        if failed:
+            text = f"{text}  ❌ غير متاح: {'، '.join(failed)}".strip()
+        
+        model_state = self.warmup.state_of("chat")
+        if model_state == model_warmup.STATE_READY:
+            text = f"{text}  🔥 النموذج محمّل في الذاكرة".strip()
+        elif model_state == model_warmup.STATE_WARMING:
+            text = f"{text}  ⏳ جاري تحميل النموذج في الذاكرة".strip()
+        else:
+            text = f"{text}  ❄️ النموذج غير محمّل (أول إجابة ستكون أبطأ)".strip()
+        self.status_label.configure(text=text)
+
+    def initialize_agent(self):
+        """Initialize the agent with internet search tools"""
+        # Load the models into Ollama while the rest of the app starts
+        self.warmup = model_warmup.ModelWarmupManager.for_models(
+            MODEL_NAME, EMBEDDING_MODEL_NAME,
+            on_status_change=lambda model, state: self.ui_queue.post(self.update_status_label, key="status")
+        )
+        self.warmup.start()
+        
+        self.components = self.create_components()
+        if self.fast_start:
+            self.components.start_all()
+        else:
+            for name in self.components.states():
+                try:
+                    self.components.get(name)
+                except Exception:
+                    pass
+        
+        self.update_chat_history(full=True)
         
         # Display welcome message
         welcome_message = (
@@ -408,163 +778,271 @@ class RonaApp(ctk.CTk):
         )
         self.display_agent_response(welcome_message)
 
-    def update_chat_history(self):
-        """Update the chat interface"""
-        self.chat_history_text.delete("1.0", "end")
-        
-        self.chat_history_text.tag_config("user", justify="right", foreground="#FFFFFF")
-        self.chat_history_text.tag_config("ai", justify="left", foreground="#FF8C00")
-        self.chat_history_text.tag_config("code_block", justify="left", background="#333333", foreground="#87CEEB")
-        self.chat_history_text.tag_config("system", justify="center", foreground="#808080")
-        self.chat_history_text.tag_config("highlight", foreground="#4a90e2")
-        
-        keywords_to_highlight = ["Python", "JavaScript", "HTML", "CSS", "PHP", "SQL", "API", "Git"]
-        
-        for msg in self.conversation_manager.conversation_history:
-            if msg["role"] == "user":
-                self.chat_history_text.insert("end", f"أنت: {msg['content']}\n\n", "user")
-            elif msg["role"] == "assistant":
-                content = msg["content"]
-                code_parts = content.split('```')
-                if len(code_parts) > 1:
-                    self.chat_history_text.insert("end", "Rona_v5:\n", "ai")
-                    for i, part in enumerate(code_parts):
-                        if i % 2 == 1:
-                            self.chat_history_text.insert("end", f"{part}\n", "code_block")
-                        else:
-                            self.insert_text_with_highlights(part, keywords_to_highlight)
-                else:
-                    self.chat_history_text.insert("end", "Rona_v5:\n", "ai")
-                    self.insert_text_with_highlights(content, keywords_to_highlight)
-
-                self.chat_history_text.insert("end", "\n")
-
-        self.chat_history_text.see("end")
-
-    def insert_text_with_highlights(self, text, keywords):
-        """Add text with keyword highlighting"""
-        start_index = 0
-        for keyword in keywords:
-            while True:
-                pos = text.find(keyword, start_index)
-                if pos == -1:
-                    break
-                self.chat_history_text.insert("end", text[start_index:pos], "ai")
-                self.chat_history_text.insert("end", text[pos:pos+len(keyword)], "highlight")
-                start_index = pos + len(keyword)
-        self.chat_history_text.insert("end", text[start_index:], "ai")
+    @tracing.traced("ui.update_chat_history")
+    def update_chat_history(self, full=False):
+        """Show messages added since the last update, or reload the latest page with full=True"""
+        if full:
+            self.chat_view.load(self.session_id)
+        else:
+            self.chat_view.sync(self.conversation_manager.messages())
+    
+    def on_chat_scrolled(self, first, last):
+        """Keep the scrollbar in step with the chat and page messages in near its edges"""
+        # CTkTextbox wires its own scrollbar to this callback, so it is forwarded here
+        self.chat_history_text._y_scrollbar.set(first, last)
+        self.chat_view.on_yview(first, last)
         
     def send_message(self, event=None):
-        """Send user message to agent"""
-        user_message = self.user_input.get().strip()
-        if user_message:
-            self.user_input.delete(0, "end")
-            self.user_input.configure(state="disabled")
-            self.send_button.configure(state="disabled")
+        """Send user message to agent, or queue it while another reply is being generated"""
+        user_message = self.get_input_text().strip()
+        attachment = self.pasted_text
+        if attachment is None and large_input.is_large(user_message):
+            # Text this long that reached the input box anyway is handled like a paste
+            user_message, attachment = "", user_message
+        
+        if user_message or attachment is not None:
+            self.clear_input()
+            self.clear_attachment()
+            shown = user_message if attachment is None else large_input.describe(user_message, attachment)
+            
+            # Name a fresh session after its first message
+            if not self.conversation_manager.messages() and not self.turn_queue.busy:
+                self.session_store.rename_session(self.session_id, shown[:40])
+                self.refresh_session_menu()
             
-            # Add user message to conversation manager
-            self.conversation_manager.add_message("user", user_message)
-            self.after(0, self.update_chat_history)
+            try:
+                turn = self.turn_queue.submit(user_message, key=f"turn:{self.session_id}", attachment=attachment)
+            except SchedulerFullError:
+                self.display_agent_response("⚠️ الخادم مشغول حالياً. يرجى المحاولة بعد قليل.")
+                return "break"
             
-            self.loading_bar.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
-            self.loading_bar.start()
-            threading.Thread(target=partial(self.run_agent_in_thread, user_message)).start()
+            # The message joins the conversation when its turn starts
+            if turn.future is None:
+                waiting = len(self.turn_queue.pending())
+                self.display_agent_response(f"🕒 في الانتظار ({waiting}): {shown}")
+        # Keep Tk from also inserting a newline for Ctrl+Enter
+        return "break"
+
+    def stop_generating(self):
+        """Cancel the turn in progress and drop the messages waiting behind it"""
+        if not self.turn_queue.busy:
+            return
+        dropped = self.turn_queue.cancel_all()
+        message = "⏹️ تم إيقاف الإجابة."
+        if dropped:
+            message += f" تم إلغاء {dropped} رسائل في الانتظار."
+        self.display_agent_response(message)
         
-    def run_agent_in_thread(self, user_message):
-        """Run agent in separate thread"""
-        try:
-            # Add user message to memory
-            self.agent_memory.chat_memory.add_user_message(user_message)
+    def prefetch_turn(self, turn):
+        """Prepare the context, and optionally start a web search, for a message waiting behind the running turn"""
+        # Off by default: it sends every queued message to the search engine,
+        # whether or not the agent ends up searching for it
+        if turn.message and os.environ.get(PREFETCH_WEB_ENV) == "1":
+            self.web_search.prefetch(turn.message)
+        self.components.wait("episodic_memory")
+        return self.prepare_turn(turn.message, turn.attachment)
 
-            # Get context from vector database
-            if self.vector_db is None:
-                context = "قاعدة البيانات المتجهة غير متاحة. سيتم الاعتماد على المعرفة العامة والإنترنت."
-            else:
-                try:
-                    retrieved_docs = self.vector_db.similarity_search(user_message, k=2)
-                    if retrieved_docs:
-                        context = "\n".join([doc.page_content for doc in retrieved_docs])
-                    else:
-                        context = "لا يوجد سياق ذو صلة متاح لهذا السؤال في قاعدة البيانات المحلية."
-                except Exception as e:
-                    print(f"⚠️ Vector search failed: {str(e)[:50]}")
-                    context = "حدث خطأ في البحث في قاعدة البيانات المحلية."
+    def prepare_turn(self, user_message, attachment=None):
+        """Return the message for the agent and the retrieved context
+
+        Pasted text is reduced to the excerpts most relevant to the message,
+        found through a temporary index of its chunks.
+        """
+        if attachment is None:
+            return user_message, retrieve_context(self.vector_db, user_message, self.episodic_memory)
+        
+        query = large_input.search_query(user_message, attachment)
+        embeddings = getattr(self.vector_db, "embeddings", None)
+        with tracing.span("input.select_excerpts", characters=len(attachment)):
+            excerpts, total_chunks = large_input.select_excerpts(attachment, user_message, embeddings)
+        agent_message = large_input.compose_message(user_message, attachment, excerpts, total_chunks)
+        return agent_message, retrieve_context(self.vector_db, query, self.episodic_memory)
 
-            # Get conversation context
-            conversation_context = self.conversation_manager.get_recent_context(2)
+    def run_agent_in_thread(self, turn):
+        """Run agent in separate thread"""
+        with tracing.trace("turn", session_id=self.session_id):
+            self.run_agent_turn(turn.message, turn.prefetch_result(), turn.attachment)
 
-            # Prepare input for agent
-            full_prompt_input = {
-                "input": user_message,
-                "context": context,
-                "conversation_context": conversation_context
-            }
+    def run_agent_turn(self, user_message, prepared=None, attachment=None):
+        """Answer one user message, prepared ahead of time if it was queued, and show the reply"""
+        try:
+            # Add user message to conversation manager now that the previous turn is complete
+            shown = user_message if attachment is None else large_input.describe(user_message, attachment)
+            self.conversation_manager.add_message("user", shown)
+            self.ui_queue.post(self.update_chat_history, key="chat_history")
+            
+            # The first turn may arrive before background initialization has finished
+            self.components.get("agent")
+            self.components.wait("episodic_memory")
 
-            # Run agent
-            agent_result = self.agent_executor.invoke(full_prompt_input)
+            # Prepare input with context from the vector database and past conversations
+            if prepared is None:
+                prepared = self.prepare_turn(user_message, attachment)
+            agent_message, context = prepared
+            full_prompt_input = prepare_agent_input(
+                agent_message, self.vector_db, self.conversation_manager, self.episodic_memory, context=context
+            )
+
+            # Run agent; with tracing on, each LLM call and tool call becomes a span
+            callbacks = [metrics.callback_handler()]
+            token = cancellation.current_token()
+            if token is not None:
+                callbacks.append(cancellation.callback_handler(token))
+            handler = tracing.callback_handler()
+            if handler is not None:
+                callbacks.append(handler)
+            with tracing.span("agent.invoke"):
+                agent_result = self.agent_executor.invoke(full_prompt_input, config={"callbacks": callbacks})
             agent_output = agent_result.get('output', 'No response found.')
 
-            # Add agent response to conversation manager
-            self.conversation_manager.add_message("assistant", agent_output)
-            self.after(0, self.display_agent_response, agent_output)
+            # Add agent response to conversation manager and parse it here rather than on the UI thread
+            message = self.conversation_manager.add_message("assistant", agent_output)
+            self.chat_renderer.prepare(message)
+            self.ui_queue.post(self.update_chat_history, key="chat_history")
             
-            # Add response to memory
-            self.agent_memory.chat_memory.add_ai_message(agent_output)
-            save_memory_to_file(self.agent_memory)
+            # The executor has recorded the turn in its memory; persisting it happens on the UI thread
+            self.ui_queue.post(self.save_agent_memory, self.session_id, key="agent_memory")
+            metrics.TURNS.labels("ok").inc()
 
+        except cancellation.OperationCancelled:
+            # stop_generating has already told the user
+            metrics.TURNS.labels("cancelled").inc()
         except Exception as e:
-            error_message = f"حدث خطأ أثناء معالجة الرسالة: {str(e)[:100]}"
-            self.after(0, self.display_agent_response, error_message)
-        finally:
-            self.after(0, self.enable_input)
-            self.after(0, self.loading_bar.stop)
-            self.after(0, self.loading_bar.grid_forget)
+            metrics.TURNS.labels("error").inc()
+            self.post_notice(f"حدث خطأ أثناء معالجة الرسالة: {str(e)[:100]}")
+
+    def update_turn_state(self):
+        """Show the progress bar and the Stop button while turns are running or waiting"""
+        active = self.turn_queue.active
+        stoppable = (active is not None and not active.cancelled) or bool(self.turn_queue.pending())
+        self.stop_button.configure(state="normal" if stoppable else "disabled")
+        if self.turn_queue.busy:
+            if not self.loading_bar.winfo_ismapped():
+                self.loading_bar.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+                self.loading_bar.start()
+        else:
+            self.loading_bar.stop()
+            self.loading_bar.grid_forget()
+
+    def save_agent_memory(self, session_id):
+        """Persist the agent memory of the current session"""
+        if session_id == self.session_id and self.agent_memory is not None:
+            save_memory_to_store(self.agent_memory, self.session_store, session_id)
+
+    def remember_evicted_messages(self, messages):
+        """Hand messages evicted from the conversation window to episodic memory"""
+        if self.episodic_memory is not None:
+            self.episodic_memory.remember(messages, self.session_id)
+
+    def refresh_session_menu(self):
+        """Reload the session list into the session menu"""
+        self.session_labels = {}
+        for session in self.session_store.list_sessions():
+            label = f"{session['title']} ({session['updated_at'][:16].replace('T', ' ')})"
+            self.session_labels[label] = session["session_id"]
+        
+        labels = list(self.session_labels) or [""]
+        self.session_menu.configure(values=labels)
+        for label, session_id in self.session_labels.items():
+            if session_id == self.session_id:
+                self.session_menu.set(label)
+                break
+
+    def on_session_selected(self, label):
+        """Switch to the session chosen in the session menu"""
+        session_id = self.session_labels.get(label)
+        if session_id and session_id != self.session_id:
+            self.switch_session(session_id)
+
+    def new_session(self):
+        """Start a new empty session"""
+        self.switch_session(self.session_store.create_session())
+
+    def switch_session(self, session_id):
+        """Load another session's history and agent memory"""
+        if self.turn_queue.busy:
+            self.display_agent_response("يرجى الانتظار حتى تكتمل الإجابة الحالية قبل تبديل المحادثة.")
+            return
+        
+        # Drop a turn of the previous session that has not started yet
+        self.llm_scheduler.cancel(f"turn:{self.session_id}")
+        self.session_id = session_id
+        self.conversation_manager = ConversationManager(
+            store=self.session_store,
+            session_id=session_id,
+            on_evict=self.remember_evicted_messages
+        )
+        if getattr(self, 'agent_memory', None) is not None:
+            self.agent_memory.clear()
+            load_memory_from_store(self.agent_memory, self.session_store, session_id)
+        
+        self.refresh_session_menu()
+        self.update_chat_history(full=True)
 
     def test_web_search(self):
-        """Test internet search functionality"""
-        test_query = "أحدث إصدار من Python"
-        self.display_agent_response(f"🔍 اختبار البحث في الإنترنت: {test_query}")
+        """Test internet search functionality on every engine in parallel"""
+        if self.diagnostics.running("web_search"):
+            self.display_agent_response("⏳ اختبار البحث في الإنترنت قيد التنفيذ بالفعل.")
+            return
         
-        try:
-            from internet_search import InternetSearch
-            search = InternetSearch()
-            results = search.search_web(test_query)
-            
-            if results:
-                test_message = f"✅ نجح البحث في الإنترنت!\n\nنتائج البحث عن '{test_query}':\n\n"
-                for i, result in enumerate(results[:2], 1):
-                    test_message += f"{i}. {result['title']}\n"
-                    test_message += f"   {result['snippet']}\n\n"
-                self.display_agent_response(test_message)
-            else:
-                self.display_agent_response("❌ لم يتم العثور على نتائج بحث في الإنترنت.")
-                
-        except Exception as e:
-            self.display_agent_response(f"❌ فشل اختبار البحث في الإنترنت: {str(e)[:100]}")
+        search = InternetSearch()
+        self.display_agent_response(
+            f"🔍 اختبار البحث في الإنترنت: {diagnostics.WEB_TEST_QUERY}\n"
+            f"جاري فحص {len(search.search_engines)} محركات بحث بالتوازي..."
+        )
+        self.diagnostics.run(
+            "web_search",
+            diagnostics.web_search_check(search),
+            timeout=search.timeout + 5,
+            on_progress=lambda task, check: self.post_notice(self.format_engine_check(check)),
+            on_done=lambda task: self.ui_queue.post(self.show_web_search_result, task)
+        )
 
-    def display_agent_response(self, message):
-        """Display agent response with formatting"""
-        self.chat_history_text.insert("end", "Rona_v5:\n", "ai")
-        keywords_to_highlight = ["Python", "JavaScript", "HTML", "CSS", "PHP", "SQL", "API", "Git"]
-        code_parts = message.split('```')
-        
-        if len(code_parts) > 1:
-            for i, part in enumerate(code_parts):
-                if i % 2 == 1:
-                    self.chat_history_text.insert("end", f"{part}\n", "code_block")
-                else:
-                    self.insert_text_with_highlights(part, keywords_to_highlight)
-        else:
-            self.insert_text_with_highlights(message, keywords_to_highlight)
+    def format_engine_check(self, check):
+        latency = f"{check['latency'] * 1000:.0f} ميلي ثانية"
+        if check['ok']:
+            return f"✅ {check['engine']}: {len(check['results'])} نتائج في {latency}"
+        return f"❌ {check['engine']}: {check['error']} ({latency})"
+
+    def show_web_search_result(self, task):
+        """Summarize a finished web-search test"""
+        if task.state == diagnostics.STATE_TIMED_OUT:
+            self.display_agent_response(f"⏱️ انتهت مهلة اختبار البحث في الإنترنت بعد {task.timeout:.0f} ثانية.")
+            return
+        if task.state == diagnostics.STATE_FAILED:
+            self.display_agent_response(f"❌ فشل اختبار البحث في الإنترنت: {task.error}")
+            return
+        
+        working = [check for check in task.result if check['ok']]
+        if not working:
+            self.display_agent_response("❌ لم يتم العثور على نتائج بحث في الإنترنت.")
+            return
         
-        self.chat_history_text.insert("end", "\n")
-        self.chat_history_text.see("end")
+        fastest = min(working, key=lambda check: check['latency'])
+        test_message = (
+            f"✅ نجح البحث في الإنترنت عبر {len(working)}/{len(task.result)} محركات "
+            f"(الأسرع: {fastest['engine']}).\n\nنتائج البحث عن '{diagnostics.WEB_TEST_QUERY}':\n\n"
+        )
+        for i, result in enumerate(fastest['results'][:2], 1):
+            test_message += f"{i}. {result['title']}\n"
+            test_message += f"   {result['snippet']}\n\n"
+        self.display_agent_response(test_message)
+
+    @tracing.traced("ui.display_agent_response")
+    def display_agent_response(self, message):
+        """Display a notice from Rona that is not part of the conversation history"""
+        self.chat_renderer.append({"role": "assistant", "content": message})
+
+    def post_notice(self, message):
+        """Show a notice from any thread; notices posted in the same frame are inserted together"""
+        self.ui_queue.post_batch(self.display_notices, message, key="notices")
 
-    def enable_input(self):
-        """Enable input fields after agent response"""
-        self.user_input.configure(state="normal")
-        self.user_input.focus()
-        self.send_button.configure(state="normal")
+    def display_notices(self, messages):
+        self.chat_renderer.extend([{"role": "assistant", "content": message} for message in messages])
+
+    def request_scroll_to_end(self):
+        """Scroll the chat to the end once at the end of the frame"""
+        self.ui_queue.at_frame_end(lambda: self.chat_history_text.see("end"), key="scroll")
 
     def copy_selected_text(self):
         """Copy selected text to clipboard"""
@@ -616,13 +1094,65 @@ class RonaApp(ctk.CTk):
             self.display_agent_response("حدث خطأ أثناء الوصول إلى الحافظة.")
 
     def paste_to_input(self, event=None):
-        """Paste text from clipboard to input box"""
+        """Paste text from clipboard to input box; large pastes are attached to the next message"""
         try:
             clipboard_text = self.clipboard_get()
-            self.user_input.delete(0, tk.END)
-            self.user_input.insert(0, clipboard_text)
         except tk.TclError:
             self.display_agent_response("لا يوجد نص في الحافظة للّصق.")
+            return "break"
+        
+        if large_input.is_large(clipboard_text):
+            # Inserting megabytes into a Tk widget freezes the window
+            self.set_attachment(clipboard_text)
+        else:
+            if "\n" in clipboard_text and not self.multiline_mode:
+                self.multiline_switch.select()
+                self.toggle_multiline_input()
+            self.insert_input(clipboard_text)
+        # Keep Tk from pasting the clipboard a second time
+        return "break"
+
+    def toggle_multiline_input(self):
+        """Switch between the single-line entry and the multiline box, keeping the text typed so far"""
+        text = self.get_input_text()
+        self.clear_input()
+        self.multiline_mode = bool(self.multiline_switch.get())
+        if self.multiline_mode:
+            self.user_input.grid_forget()
+            self.multiline_input.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="ew")
+        else:
+            self.multiline_input.grid_forget()
+            self.user_input.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="ew")
+        self.insert_input(text)
+        self.current_input().focus()
+
+    def current_input(self):
+        return self.multiline_input if self.multiline_mode else self.user_input
+
+    def get_input_text(self):
+        if self.multiline_mode:
+            return self.multiline_input.get("1.0", "end-1c")
+        return self.user_input.get()
+
+    def insert_input(self, text):
+        self.current_input().insert("insert", text)
+
+    def clear_input(self):
+        if self.multiline_mode:
+            self.multiline_input.delete("1.0", "end")
+        else:
+            self.user_input.delete(0, "end")
+
+    def set_attachment(self, text):
+        """Attach pasted text to the next message and show its size"""
+        self.pasted_text = text
+        self.attachment_label.configure(text=large_input.describe("", text))
+        self.remove_attachment_button.grid(row=0, column=2, padx=5, sticky="w")
+
+    def clear_attachment(self):
+        self.pasted_text = None
+        self.attachment_label.configure(text="")
+        self.remove_attachment_button.grid_forget()
         
     def load_file_dialog(self):
         """Open file dialog to choose text file"""
@@ -631,60 +1161,86 @@ class RonaApp(ctk.CTk):
             filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
         )
         if file_path:
-            self.process_and_add_text_file(file_path)
+            try:
+                self.llm_scheduler.submit(
+                    self.process_and_add_text_file, file_path,
+                    priority=PRIORITY_INGESTION
+                )
+            except SchedulerFullError:
+                self.display_agent_response("⚠️ الخادم مشغول حالياً. يرجى المحاولة بعد قليل.")
 
     def process_and_add_text_file(self, file_path):
-        """Load and process text file"""
+        """Load and process text file (may run on a scheduler worker thread)"""
         if not os.path.exists(file_path):
-            self.display_agent_response(f"خطأ: الملف غير موجود في '{file_path}'")
+            self.post_notice(f"خطأ: الملف غير موجود في '{file_path}'")
             return
         
-        self.display_agent_response(f"تحليل الملف: {os.path.basename(file_path)}")
+        self.post_notice(f"تحليل الملف: {os.path.basename(file_path)}")
+        self.components.wait("vector_db")
         try:
+            from langchain_community.document_loaders import TextLoader
+            
             loader = TextLoader(file_path, encoding='utf-8')
             documents = loader.load()
 
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=600,
-                chunk_overlap=30,
-                length_function=len,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            chunked_documents = text_splitter.split_documents(documents)
+            started = time.perf_counter()
+            chunked_documents = get_text_splitter().split_documents(documents)
             
             if self.vector_db is not None:
                 self.vector_db.add_documents(chunked_documents)
-                self.display_agent_response(
+                metrics.record_ingestion(
+                    len(chunked_documents),
+                    sum(len(doc.page_content) for doc in documents),
+                    time.perf_counter() - started
+                )
+                self.post_notice(
                     f"✅ تم تحميل الملف بنجاح!\n"
                     f"📊 عدد الأجزاء المضافة: {len(chunked_documents)}\n"
                     f"يمكنك الآن طرح الأسئلة حول هذا الملف."
                 )
             else:
-                self.display_agent_response("❌ قاعدة البيانات المتجهة غير متاحة.")
+                self.post_notice("❌ قاعدة البيانات المتجهة غير متاحة.")
             
         except Exception as e:
-            self.display_agent_response(f"حدث خطأ أثناء قراءة الملف: {str(e)[:100]}")
+            self.post_notice(f"حدث خطأ أثناء قراءة الملف: {str(e)[:100]}")
 
     def check_database_status(self):
-        """Check vector database status"""
-        try:
-            if self.vector_db is None:
-                self.display_agent_response("❌ قاعدة البيانات المتجهة غير متاحة.")
-                return
-                
-            total_docs = self.vector_db._collection.count()
-            
-            status_message = f"📊 حالة قاعدة البيانات:\n"
-            status_message += f"إجمالي الوثائق المخزنة: {total_docs}\n"
-            status_message += f"مجلد قاعدة البيانات: {VECTOR_DB_DIR}\n"
-            
-            if total_docs == 0:
-                status_message += "\n💡 نصيحة: قم بتحميل ملف نصي أولاً لاختبار قاعدة البيانات"
-            
-            self.display_agent_response(status_message)
-            
-        except Exception as e:
-            self.display_agent_response(f"❌ خطأ في التحقق من حالة قاعدة البيانات: {str(e)[:80]}")
+        """Check vector database status in the background"""
+        if not self.components.component("vector_db").finished:
+            self.display_agent_response("⏳ قاعدة البيانات المتجهة قيد التهيئة، يرجى المحاولة بعد قليل.")
+            return
+        if self.vector_db is None:
+            self.display_agent_response("❌ قاعدة البيانات المتجهة غير متاحة.")
+            return
+        if self.diagnostics.running("database_status"):
+            return
+        
+        self.diagnostics.run(
+            "database_status",
+            diagnostics.database_status_check(self.vector_db),
+            timeout=diagnostics.DEFAULT_TIMEOUT,
+            on_done=lambda task: self.ui_queue.post(self.show_database_status, task)
+        )
+
+    def show_database_status(self, task):
+        """Show the result of a database status check"""
+        if task.state == diagnostics.STATE_TIMED_OUT:
+            self.display_agent_response(f"⏱️ لم تستجب قاعدة البيانات خلال {task.timeout:.0f} ثانية.")
+            return
+        if task.state == diagnostics.STATE_FAILED:
+            self.display_agent_response(f"❌ خطأ في التحقق من حالة قاعدة البيانات: {task.error[:80]}")
+            return
+        
+        total_docs = task.result["documents"]
+        status_message = f"📊 حالة قاعدة البيانات:\n"
+        status_message += f"إجمالي الوثائق المخزنة: {total_docs}\n"
+        status_message += f"مجلد قاعدة البيانات: {VECTOR_DB_DIR}\n"
+        status_message += f"زمن الاستعلام: {task.result['latency'] * 1000:.0f} ميلي ثانية\n"
+        
+        if total_docs == 0:
+            status_message += "\n💡 نصيحة: قم بتحميل ملف نصي أولاً لاختبار قاعدة البيانات"
+        
+        self.display_agent_response(status_message)
 
     def show_clear_chat_dialog(self):
         """Show dialog to confirm clearing chat"""
@@ -694,15 +1250,40 @@ class RonaApp(ctk.CTk):
         )
         response = dialog.get_input()
         if response is not None and response.lower() == "yes":
+            # The running turn still uses the agent memory
+            if self.turn_queue.busy:
+                self.display_agent_response("يرجى الانتظار حتى تكتمل الإجابة الحالية قبل مسح المحادثة.")
+                return
             self.conversation_manager.clear_history()
             if hasattr(self, 'agent_memory') and self.agent_memory is not None:
                 self.agent_memory.clear()
+            self.update_chat_history(full=True)
             self.display_agent_response("تم مسح المحادثة بنجاح.")
-            self.update_chat_history()
         else:
             self.display_agent_response("لم يتم مسح المحادثة.")
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Start the Rona_v5 desktop app"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Rona_v5 desktop assistant")
+    parser.add_argument("--eager", action="store_true",
+                        help="initialize the model and database before showing the window")
+    parser.add_argument("--trace", metavar="FILE", nargs="?", const=tracing.DEFAULT_TRACE_FILE,
+                        help="write per-turn latency spans to a JSONL file")
+    parser.add_argument("--metrics-port", type=int,
+                        help=f"serve Prometheus metrics on this local port (or set {metrics.METRICS_PORT_ENV})")
+    parser.add_argument("--metrics-file",
+                        help=f"write Prometheus metrics to this file periodically (or set {metrics.METRICS_FILE_ENV})")
+    args = parser.parse_args(argv)
+    
+    if args.trace:
+        tracing.configure(args.trace)
+    metrics.start_exporters(args.metrics_port, args.metrics_file)
+    
     print("🚀 Starting Rona_v5 with internet search capability...")
-    app = RonaApp()
-    app.mainloop()
\ No newline at end of file
+    app = RonaApp(fast_start=not args.eager)
+    app.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
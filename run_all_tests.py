@@ -3,50 +3,175 @@
 """
 Comprehensive Test Runner for Rona_v5
 تشغيل شامل لجميع الاختبارات
+
+Test scripts run on a pool of workers. Each script gets its own scratch
+working directory, so chroma_db, conversation_history.json and the session
+database of one script never collide with another's. Output is streamed with
+the script name as prefix, and a timing report shows the critical path.
 """
 
+import argparse
+import json
+import shutil
 import sys
 import os
 import subprocess
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def run_test_script(script_name, description):
-    """Run a test script and return results"""
-    print(f"\n{'='*60}")
-    print(f"🧪 {description}")
-    print(f"{'='*60}")
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TIMEOUT = 300
+DEFAULT_JOBS = max(4, os.cpu_count() or 1)
+# Durations of the previous run, used to start the longest scripts first
+TIMINGS_FILE = os.path.join(tempfile.gettempdir(), "rona_test_timings.json")
+# Timing-sensitive scripts run alone after the parallel batch
+EXCLUSIVE_TESTS = {"test_performance.py", "test_startup.py"}
+
+_print_lock = threading.Lock()
+
+def emit(prefix, line):
+    """Print one line of output without interleaving it with other workers"""
+    with _print_lock:
+        print(f"[{prefix}] {line}", flush=True)
+
+def run_test_script(script_name, description, timeout=DEFAULT_TIMEOUT):
+    """Run a test script in its own scratch directory and return its result"""
+    prefix = os.path.splitext(script_name)[0]
+    result = {
+        "script": script_name,
+        "description": description,
+        "worker": threading.current_thread().name,
+        "start": time.time(),
+        "duration": 0.0,
+        "success": False,
+    }
+    if not os.path.exists(os.path.join(REPO_DIR, script_name)):
+        emit(prefix, f"❌ {description}: ملف الاختبار غير موجود")
+        return result
+    
+    scratch_dir = tempfile.mkdtemp(prefix=f"rona_{prefix}_")
+    env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")]))
+    timed_out = threading.Event()
     
     try:
-        # Run the test script
-        result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, text=True, timeout=300)
+        emit(prefix, f"🧪 {description}")
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_DIR, script_name)],
+            cwd=scratch_dir, env=env, text=True, encoding="utf-8", errors="replace",
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
         
-        # Print output
-        if result.stdout:
-            print(result.stdout)
+        def kill():
+            timed_out.set()
+            process.kill()
         
-        if result.stderr:
-            print("⚠️ تحذيرات:")
-            print(result.stderr)
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            for line in process.stdout:
+                emit(prefix, line.rstrip("\n"))
+            process.wait()
+        finally:
+            timer.cancel()
         
-        # Check exit code
-        if result.returncode == 0:
-            print(f"✅ {description}: نجح")
-            return True
+        result["returncode"] = process.returncode
+        if timed_out.is_set():
+            emit(prefix, f"⏰ {description}: انتهت مهلة الاختبار")
+        elif process.returncode == 0:
+            result["success"] = True
+            emit(prefix, f"✅ {description}: نجح")
         else:
-            print(f"❌ {description}: فشل (رمز الخروج: {result.returncode})")
-            return False
+            emit(prefix, f"❌ {description}: فشل (رمز الخروج: {process.returncode})")
             
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {description}: انتهت مهلة الاختبار")
-        return False
-    except FileNotFoundError:
-        print(f"❌ {description}: ملف الاختبار غير موجود")
-        return False
     except Exception as e:
-        print(f"❌ {description}: خطأ غير متوقع - {e}")
-        return False
+        emit(prefix, f"❌ {description}: خطأ غير متوقع - {e}")
+    finally:
+        result["duration"] = time.time() - result["start"]
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    
+    return result
+
+def load_timings():
+    try:
+        with open(TIMINGS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def save_timings(results):
+    timings = load_timings()
+    timings.update({result["script"]: round(result["duration"], 2) for result in results})
+    try:
+        with open(TIMINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(timings, f)
+    except IOError:
+        pass
+
+def run_scripts(tests, jobs=DEFAULT_JOBS, timeout=DEFAULT_TIMEOUT):
+    """Run (script, description) pairs on a worker pool and return their results in order"""
+    timings = load_timings()
+    # Longest first keeps a slow script from starting last and stretching the run
+    ordered = sorted(tests, key=lambda test: timings.get(test[0], float("inf")), reverse=True)
+    parallel = [test for test in ordered if test[0] not in EXCLUSIVE_TESTS]
+    exclusive = [test for test in ordered if test[0] in EXCLUSIVE_TESTS]
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="worker") as executor:
+        futures = {test: executor.submit(run_test_script, test[0], test[1], timeout) for test in parallel}
+        for test, future in futures.items():
+            results[test] = future.result()
+    for test in exclusive:
+        results[test] = run_test_script(test[0], test[1], timeout)
+    
+    save_timings(results.values())
+    return [results[test] for test in tests]
+
+def critical_path(results, slack=0.05):
+    """The chain of scripts that determined the total run time
+
+    Starting from the script that finished last, repeatedly step back to the
+    script whose end let it start (the previous one on its worker, or the end
+    of the parallel batch for exclusive scripts).
+    """
+    def end(result):
+        return result["start"] + result["duration"]
+    
+    if not results:
+        return []
+    path = [max(results, key=end)]
+    while True:
+        blockers = [result for result in results
+                    if result["start"] < path[0]["start"] and end(result) <= path[0]["start"] + slack]
+        if not blockers:
+            return path
+        path.insert(0, max(blockers, key=end))
+
+def print_timing_report(results, width=40):
+    """Print when each script ran, the critical path and the parallel speedup"""
+    if not results:
+        return
+    run_start = min(result["start"] for result in results)
+    wall = max(result["start"] + result["duration"] for result in results) - run_start
+    total = sum(result["duration"] for result in results)
+    scale = width / wall if wall > 0 else 0
+    path = critical_path(results)
+    
+    print("\n⏱️ تقرير التوقيت:")
+    print("-" * 30)
+    for result in sorted(results, key=lambda result: result["start"]):
+        offset = result["start"] - run_start
+        bar = " " * int(offset * scale) + "█" * max(1, int(result["duration"] * scale))
+        marker = "*" if any(result is step for step in path) else " "
+        print(f" {marker} {result['script']:<26} {result['worker']:<10} {offset:>7.1f}s {result['duration']:>7.1f}s |{bar:<{width}}|")
+    
+    print(f"\n   الزمن الكلي: {wall:.1f}s، مجموع أزمنة الاختبارات: {total:.1f}s (تسريع {total / wall if wall else 1:.1f}x)")
+    print(f"   المسار الحرج (*): {' → '.join(result['script'] for result in path)}")
+    slowest = max(results, key=lambda result: result["duration"])
+    print(f"   أبطأ اختبار: {slowest['script']} ({slowest['duration']:.1f}s) - أقل زمن ممكن مهما زاد عدد العمال")
 
 def check_system_info():
     """Display system information"""
@@ -65,7 +190,7 @@ def check_system_info():
     
     return True
 
-def run_quick_tests():
+def run_quick_tests(jobs=DEFAULT_JOBS, timeout=DEFAULT_TIMEOUT):
     """Run quick component tests"""
     print("\n🔍 اختبارات سريعة للمكونات...")
     
@@ -79,23 +204,37 @@ def run_quick_tests():
         ("test_performance.py", "اختبار الأداء"),
         ("test_integration.py", "اختبار التكامل"),
         ("test_security.py", "اختبار الأمان"),
-        ("test_compatibility.py", "اختبار التوافق")
+        ("test_compatibility.py", "اختبار التوافق"),
+        ("test_episodic_memory.py", "اختبار الذاكرة طويلة المدى"),
+        ("test_session_store.py", "اختبار تخزين الجلسات"),
+        ("test_rona_server.py", "اختبار خادم HTTP"),
+        ("test_llm_scheduler.py", "اختبار مُجدول الطلبات"),
+        ("test_ollama_pool.py", "اختبار توزيع الطلبات على خوادم Ollama"),
+        ("test_startup.py", "اختبار سرعة بدء التشغيل"),
+        ("test_preflight.py", "اختبار فحوصات ما قبل التشغيل"),
+        ("test_model_warmup.py", "اختبار تسخين النماذج"),
+        ("test_hardware_tuner.py", "اختبار ضبط الإعدادات حسب الجهاز"),
+        ("test_tracing.py", "اختبار تتبع الأزمنة"),
+        ("test_metrics.py", "اختبار مقاييس التشغيل"),
+        ("test_run_all_tests.py", "اختبار مشغل الاختبارات المتوازي"),
+        ("test_ollama_stub.py", "اختبار خادم Ollama الوهمي"),
+        ("test_load_test.py", "اختبار مولد الحمل"),
+        ("test_chat_renderer.py", "اختبار العرض التدريجي للمحادثة"),
+        ("test_ui_queue.py", "اختبار طابور تحديثات الواجهة"),
+        ("test_diagnostics.py", "اختبار الفحوصات في الخلفية"),
+        ("test_cancellation.py", "اختبار إلغاء الطلبات"),
+        ("test_turn_queue.py", "اختبار طابور الرسائل"),
+        ("test_large_input.py", "اختبار النصوص الملصقة الكبيرة"),
+        ("test_gui_benchmark.py", "اختبار قياس أداء الواجهة")
     ]
     
-    results = {}
+    script_results = run_scripts(tests, jobs, timeout)
+    print_timing_report(script_results)
     
-    for script, description in tests:
-        if os.path.exists(script):
-            success = run_test_script(script, description)
-            results[description] = success
-        else:
-            print(f"⚠️ {description}: ملف الاختبار غير موجود")
-            results[description] = False
-    
-    return results
+    return {result["description"]: result["success"] for result in script_results}
 
-def run_performance_tests():
-    """Run performance tests"""
+def run_performance_tests(timeout=DEFAULT_TIMEOUT):
+    """Run performance tests one at a time so their durations are comparable"""
     print("\n⚡ اختبارات الأداء...")
     
     performance_tests = [
@@ -110,23 +249,13 @@ def run_performance_tests():
     results = {}
     
     for script, description in performance_tests:
-        if os.path.exists(script):
-            print(f"\n⏱️ قياس أداء {description}...")
-            start_time = time.time()
-            
-            success = run_test_script(script, description)
-            
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            results[description] = {
-                'success': success,
-                'duration': duration
-            }
-            
-            print(f"⏱️ وقت الاختبار: {duration:.2f} ثانية")
-        else:
-            results[description] = {'success': False, 'duration': 0}
+        print(f"\n⏱️ قياس أداء {description}...")
+        result = run_test_script(script, description, timeout)
+        results[description] = {
+            'success': result["success"],
+            'duration': result["duration"]
+        }
+        print(f"⏱️ وقت الاختبار: {result['duration']:.2f} ثانية")
     
     return results
 
@@ -222,18 +351,24 @@ def save_report(component_results, performance_results, overall_success):
     except Exception as e:
         print(f"❌ خطأ في حفظ التقرير: {e}")
 
-def main():
+def main(argv=None):
     """Main test runner"""
+    parser = argparse.ArgumentParser(description="Run all Rona_v5 test scripts")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS, help="scripts to run at the same time")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="seconds before a script is killed")
+    parser.add_argument("--skip-performance", action="store_true", help="only run the component tests")
+    args = parser.parse_args(argv)
+    
     # Check system info
     if not check_system_info():
         print("❌ فشل في فحص معلومات النظام")
         sys.exit(1)
     
     # Run component tests
-    component_results = run_quick_tests()
+    component_results = run_quick_tests(args.jobs, args.timeout)
     
     # Run performance tests
-    performance_results = run_performance_tests()
+    performance_results = {} if args.skip_performance else run_performance_tests(args.timeout)
     
     # Generate and display report
     overall_success = generate_report(component_results, performance_results)
@@ -6,132 +6,47 @@ Rona_v5 Runner Script
 """
 
 import sys
-import os
-import subprocess
+import argparse
 
-def check_dependencies():
-    """Check if required dependencies are installed"""
-    required_packages = [
-        'customtkinter',
-        'langchain_ollama',
-        'requests',
-        'beautifulsoup4',
-        'chromadb'
-    ]
-    
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
-    
-    if missing_packages:
-        print("❌ المكتبات التالية مفقودة:")
-        for package in missing_packages:
-            print(f"   - {package}")
-        print("\n💡 لتثبيت المكتبات المطلوبة، قم بتشغيل:")
-        print("   pip install -r requirements.txt")
-        return False
-    
-    return True
+from preflight import run_preflight
 
-def check_ollama():
-    """Check if Ollama is installed and running"""
-    try:
-        result = subprocess.run(['ollama', '--version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ Ollama مثبت: {result.stdout.strip()}")
-            return True
-        else:
-            print("❌ Ollama غير مثبت أو لا يعمل")
-            return False
-    except FileNotFoundError:
-        print("❌ Ollama غير مثبت")
-        print("💡 لتثبيت Ollama:")
-        print("   Windows: winget install Ollama.Ollama")
-        print("   macOS: brew install ollama")
-        print("   Linux: curl -fsSL https://ollama.ai/install.sh | sh")
-        return False
-
-def check_model():
-    """Check if required model is available"""
-    try:
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
-        if result.returncode == 0:
-            if 'mistral:7b' in result.stdout:
-                print("✅ نموذج mistral:7b متاح")
-                return True
-            else:
-                print("⚠️ نموذج mistral:7b غير متاح")
-                print("💡 لتحميل النموذج:")
-                print("   ollama pull mistral:7b")
-                return False
-        else:
-            print("❌ لا يمكن التحقق من النماذج المتاحة")
-            return False
-    except Exception as e:
-        print(f"❌ خطأ في التحقق من النماذج: {e}")
-        return False
-
-def start_ollama():
-    """Start Ollama if not running"""
-    try:
-        # Check if Ollama is already running
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ Ollama يعمل بالفعل")
-            return True
-        
-        # Try to start Ollama
-        print("🚀 بدء تشغيل Ollama...")
-        subprocess.Popen(['ollama', 'serve'], 
-                        stdout=subprocess.DEVNULL, 
-                        stderr=subprocess.DEVNULL)
-        
-        # Wait a moment for Ollama to start
-        import time
-        time.sleep(3)
-        
-        # Check if it's running now
-        result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ تم بدء تشغيل Ollama بنجاح")
-            return True
-        else:
-            print("❌ فشل في بدء تشغيل Ollama")
-            return False
-            
-    except Exception as e:
-        print(f"❌ خطأ في بدء تشغيل Ollama: {e}")
-        return False
+def print_hints(report):
+    """Explain how to fix failed preflight checks and warnings"""
+    for result in report.failures():
+        if result.details.get("missing"):
+            print("\n💡 لتثبيت المكتبات المطلوبة، قم بتشغيل:")
+            print("   pip install -r requirements.txt")
+        elif result.details.get("installed") is False:
+            print("\n💡 لتثبيت Ollama:")
+            print("   Windows: winget install Ollama.Ollama")
+            print("   macOS: brew install ollama")
+            print("   Linux: curl -fsSL https://ollama.ai/install.sh | sh")
+        elif result.details.get("reachable") is False:
+            print("\n💡 تأكد من تشغيل Ollama:")
+            print("   ollama serve")
+        for model in result.details.get("missing_models", []):
+            print("\n💡 لتحميل النموذج:")
+            print(f"   ollama pull {model}")
+    for result in report.warnings():
+        for model in result.details["missing_recommended"]:
+            print("\n💡 لتفعيل البحث في الذاكرة، قم بتحميل النموذج:")
+            print(f"   ollama pull {model}")
 
 def main():
     """Main function to run Rona"""
+    parser = argparse.ArgumentParser(description="Run Rona_v5 after checking its requirements")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the cached result of recent checks")
+    args = parser.parse_args()
+    
     print("🚀 بدء تشغيل Rona_v5 مع ميزة البحث في الإنترنت...")
     print("=" * 50)
     
-    # Check dependencies
-    print("📦 فحص المكتبات المطلوبة...")
-    if not check_dependencies():
-        sys.exit(1)
-    
-    # Check Ollama
-    print("\n🔧 فحص Ollama...")
-    if not check_ollama():
-        print("\n❌ يرجى تثبيت Ollama أولاً")
-        sys.exit(1)
-    
-    # Start Ollama if needed
-    if not start_ollama():
-        print("\n❌ لا يمكن بدء تشغيل Ollama")
-        sys.exit(1)
-    
-    # Check model
-    print("\n🤖 فحص النموذج المطلوب...")
-    if not check_model():
-        print("\n❌ يرجى تحميل النموذج أولاً")
+    # Check dependencies, Ollama and models in parallel
+    print("🔧 فحص المكتبات وOllama والنماذج...")
+    report = run_preflight(start_server=True, use_cache=not args.no_cache)
+    report.print_summary()
+    print_hints(report)
+    if not report.ok:
         sys.exit(1)
     
     print("\n✅ كل شيء جاهز! بدء تشغيل Rona_v5...")
@@ -140,7 +55,6 @@ def main():
     # Import and run Rona
     try:
         from rona_v5_updated import RonaApp
-        import customtkinter as ctk
         
         app = RonaApp()
         app.mainloop()
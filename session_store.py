@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Session Store for Rona_v5
+تخزين المحادثات حسب الجلسة لرونا
+
+Every conversation lives in its own session, indexed by session ID and timestamp
+in a single SQLite database, so loading one session never reads the others.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+# --- Session Store Configurations ---
+SESSION_DB_FILE = "rona_sessions.db"
+DEFAULT_SESSION_TITLE = "محادثة جديدة"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_updated ON sessions (user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_session_time ON messages (session_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS agent_memory (
+    session_id TEXT PRIMARY KEY,
+    messages TEXT NOT NULL
+);
+"""
+
+
+class SessionStore:
+    """SQLite-backed conversation store scoped by session"""
+
+    def __init__(self, db_path=SESSION_DB_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    # --- Sessions ---
+
+    def create_session(self, title=None, user_id=None, session_id=None):
+        """Create a new session and return its ID"""
+        session_id = session_id or uuid.uuid4().hex
+        now = datetime.datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, user_id, title, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, title or DEFAULT_SESSION_TITLE, now, now)
+            )
+            self._conn.commit()
+        return session_id
+
+    def get_session(self, session_id):
+        """Return session metadata or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, user_id, title, created_at, updated_at FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_sessions(self, user_id=None, limit=50):
+        """List sessions, most recently updated first"""
+        query = "SELECT session_id, user_id, title, created_at, updated_at FROM sessions"
+        params = []
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_session(self, user_id=None):
+        """Return the ID of the most recently updated session, if any"""
+        sessions = self.list_sessions(user_id=user_id, limit=1)
+        return sessions[0]["session_id"] if sessions else None
+
+    def rename_session(self, session_id, title):
+        """Change the title of a session"""
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET title = ? WHERE session_id = ?", (title, session_id))
+            self._conn.commit()
+
+    def delete_session(self, session_id):
+        """Delete a session with its messages and agent memory"""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM agent_memory WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    # --- Messages ---
+
+    def append_message(self, session_id, role, content, timestamp=None):
+        """Append one message to a session and return its row ID"""
+        timestamp = timestamp or datetime.datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, user_id, title, created_at, updated_at) "
+                "VALUES (?, NULL, ?, ?, ?)",
+                (session_id, DEFAULT_SESSION_TITLE, timestamp, timestamp)
+            )
+            cursor = self._conn.execute(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, timestamp)
+            )
+            self._conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE session_id = ?",
+                (timestamp, session_id)
+            )
+            self._conn.commit()
+        return cursor.lastrowid
+
+    def append_messages(self, session_id, messages):
+        """Append (role, content, timestamp) tuples to a session in one transaction"""
+        now = datetime.datetime.now().isoformat()
+        rows = [(session_id, role, content, timestamp or now) for role, content, timestamp in messages]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, user_id, title, created_at, updated_at) "
+                "VALUES (?, NULL, ?, ?, ?)",
+                (session_id, DEFAULT_SESSION_TITLE, now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE session_id = ?",
+                (rows[-1][3], session_id)
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def get_messages(self, session_id, limit=None, before_id=None, after_id=None):
+        """Return messages of a session in chronological order
+
+        By default the `limit` most recent ones; with `before_id` the most recent
+        ones older than it, and with `after_id` the oldest ones newer than it.
+        """
+        query = "SELECT id, role, content, timestamp FROM messages WHERE session_id = ?"
+        params = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+        query += " ORDER BY id ASC" if after_id is not None else " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        if after_id is None:
+            rows.reverse()
+        return [dict(row) for row in rows]
+
+    def count_messages(self, session_id):
+        """Return the number of stored messages in a session"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+
+    def clear_messages(self, session_id):
+        """Remove all messages and agent memory of a session, keeping the session itself"""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM agent_memory WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    # --- Agent memory ---
+
+    def save_agent_memory(self, session_id, serialized_messages):
+        """Persist serialized LangChain messages for a session"""
+        payload = json.dumps(serialized_messages, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO agent_memory (session_id, messages) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET messages = excluded.messages",
+                (session_id, payload)
+            )
+            self._conn.commit()
+
+    def load_agent_memory(self, session_id):
+        """Return serialized LangChain messages for a session, or an empty list"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages FROM agent_memory WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return []
+        try:
+            return json.loads(row[0])
+        except (TypeError, json.JSONDecodeError):
+            return []
+
+    # --- Migration ---
+
+    def import_history_file(self, file_path, session_id, title=None):
+        """Import a legacy conversation_history.json file into a session"""
+        if not os.path.exists(file_path):
+            return 0
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error importing conversation history: {str(e)[:100]}")
+            return 0
+
+        self.create_session(title=title, session_id=session_id)
+        return self.append_messages(session_id, [
+            (msg["role"], msg["content"], msg.get("timestamp"))
+            for msg in (history if isinstance(history, list) else [])
+            if isinstance(msg, dict) and "role" in msg and "content" in msg
+        ])
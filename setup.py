@@ -19,6 +19,28 @@ setup(
     py_modules=[
         'rona_v5_updated',
         'internet_search',
+        'episodic_memory',
+        'session_store',
+        'rona_server',
+        'llm_scheduler',
+        'ollama_pool',
+        'ollama_stub',
+        'lazy_components',
+        'startup_benchmark',
+        'preflight',
+        'model_warmup',
+        'hardware_tuner',
+        'tracing',
+        'metrics',
+        'benchmark_suite',
+        'load_test',
+        'chat_renderer',
+        'ui_queue',
+        'diagnostics',
+        'cancellation',
+        'turn_queue',
+        'large_input',
+        'gui_benchmark',
         'run_rona',
         'quick_test',
         'test_ollama',
@@ -30,6 +52,27 @@ setup(
         'test_integration',
         'test_security',
         'test_compatibility',
+        'test_episodic_memory',
+        'test_session_store',
+        'test_rona_server',
+        'test_llm_scheduler',
+        'test_ollama_pool',
+        'test_startup',
+        'test_preflight',
+        'test_model_warmup',
+        'test_hardware_tuner',
+        'test_tracing',
+        'test_metrics',
+        'test_run_all_tests',
+        'test_ollama_stub',
+        'test_load_test',
+        'test_chat_renderer',
+        'test_ui_queue',
+        'test_diagnostics',
+        'test_cancellation',
+        'test_turn_queue',
+        'test_large_input',
+        'test_gui_benchmark',
         'run_all_tests'
     ],
     classifiers=[
@@ -50,6 +93,7 @@ setup(
     entry_points={
         "console_scripts": [
             "rona=rona_v5_updated:main",
+            "rona-server=rona_server:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup Benchmark for Rona_v5
+قياس زمن بدء تشغيل رونا
+
+Runs `python -X importtime` in fresh interpreters to measure how long importing
+a module takes and which imports dominate, and compares against a saved baseline.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULE = "rona_v5_updated"
+DEFAULT_RUNS = 3
+DEFAULT_TOP = 15
+# Packages that should only be imported once a heavy component is actually needed
+HEAVY_PACKAGES = ["langchain", "langchain_core", "langchain_ollama", "langchain_chroma",
+                  "langchain_community", "chromadb"]
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) tuples"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def run_import(module, python=sys.executable, cwd=None):
+    """Import a module in a fresh interpreter and return (wall seconds, importtime entries, loaded heavy packages)"""
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps(sorted(p for p in {HEAVY_PACKAGES!r} if p in sys.modules)))"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=cwd, env=env, timeout=300
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1][:100]}")
+
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return wall, parse_importtime(result.stderr), loaded
+
+
+def measure_startup(module=DEFAULT_MODULE, runs=DEFAULT_RUNS, top=DEFAULT_TOP, cwd=None):
+    """Measure import cost of a module over several runs"""
+    walls = []
+    import_totals = []
+    entries = []
+    loaded = []
+    for _ in range(runs):
+        wall, entries, loaded = run_import(module, cwd=cwd)
+        walls.append(wall)
+        own = [entry for entry in entries if entry[0] == module]
+        import_totals.append(own[-1][2] / 1000 if own else sum(entry[1] for entry in entries) / 1000)
+
+    # Aggregate self time per top-level package from the last run
+    by_package = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    slowest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": round(statistics.median(import_totals), 1),
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "modules_imported": len(entries),
+        "heavy_packages_loaded": loaded,
+        "slowest_packages_ms": {package: round(us / 1000, 1) for package, us in slowest},
+    }
+
+
+def compare_to_baseline(result, baseline, tolerance=0.2):
+    """Return a list of regressions compared to a baseline result"""
+    regressions = []
+    for key in ("import_ms", "wall_ms"):
+        before = baseline.get(key)
+        after = result.get(key)
+        if before and after and after > before * (1 + tolerance):
+            regressions.append(f"{key}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    new_heavy = sorted(set(result["heavy_packages_loaded"]) - set(baseline.get("heavy_packages_loaded", [])))
+    if new_heavy:
+        regressions.append(f"heavy packages now imported at startup: {', '.join(new_heavy)}")
+    return regressions
+
+
+def print_report(result):
+    """Print a benchmark result"""
+    print(f"📦 الوحدة: {result['module']} ({result['runs']} مرات)")
+    print(f"⏱️ زمن الاستيراد: {result['import_ms']} ms")
+    print(f"⏱️ زمن بدء المفسر مع الاستيراد: {result['wall_ms']} ms")
+    print(f"📚 عدد الوحدات المستوردة: {result['modules_imported']}")
+    if result["heavy_packages_loaded"]:
+        print(f"⚠️ حزم ثقيلة محملة عند البدء: {', '.join(result['heavy_packages_loaded'])}")
+    else:
+        print("✅ لا توجد حزم ثقيلة محملة عند البدء")
+    print("\n🐢 أبطأ الحزم (الزمن الذاتي):")
+    for package, ms in result["slowest_packages_ms"].items():
+        print(f"   {package:<30} {ms:>10.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Rona_v5 startup import time")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="number of fresh interpreters")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="number of slowest packages to show")
+    parser.add_argument("--save", metavar="FILE", help="save the result as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    print("🚀 قياس زمن بدء التشغيل...")
+    result = measure_startup(args.module, args.runs, args.top)
+    print_report(result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 تم حفظ خط الأساس في {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ تراجع في الأداء:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print("\n✅ لا يوجد تراجع مقارنة بخط الأساس")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
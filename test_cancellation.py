@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Request Cancellation
+اختبار إلغاء الطلبات الجارية
+"""
+
+import sys
+import os
+import time
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+
+def test_token_callbacks():
+    """Test that a token runs its callbacks once and can be made current"""
+    print("🎫 اختبار رموز الإلغاء...")
+
+    try:
+        import cancellation
+
+        token = cancellation.CancellationToken()
+        calls = []
+        token.on_cancel(lambda: calls.append("a"))
+        unregister = token.on_cancel(lambda: calls.append("removed"))
+        unregister()
+        with cancellation.use_token(token):
+            inside = cancellation.current_token() is token
+        first, second = token.cancel(), token.cancel()
+        token.on_cancel(lambda: calls.append("late"))
+
+        try:
+            token.raise_if_cancelled()
+            raised = False
+        except cancellation.OperationCancelled:
+            raised = True
+
+        if calls == ["a", "late"] and inside and cancellation.current_token() is None \
+                and (first, second) == (True, False) and raised:
+            print("✅ تم تنفيذ دوال الإلغاء مرة واحدة وإطلاق الاستثناء")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {calls} {inside} {(first, second)} {raised}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الرموز: {e}")
+        return False
+
+def test_scheduler_cancels_running_request():
+    """Test that cancelling a running request reaches its token"""
+    print("\n🛑 اختبار إلغاء طلب قيد التنفيذ...")
+
+    try:
+        import cancellation
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_workers=1)
+        started = threading.Event()
+
+        def work():
+            started.set()
+            token = cancellation.current_token()
+            while True:
+                token.raise_if_cancelled()
+                time.sleep(0.01)
+
+        future = scheduler.submit(work, key="turn:a")
+        started.wait(2)
+        scheduler.cancel("turn:a")
+        try:
+            future.result(timeout=2)
+            outcome = "finished"
+        except cancellation.OperationCancelled:
+            outcome = "cancelled"
+        time.sleep(0.05)
+        stats = scheduler.metrics()
+        scheduler.shutdown()
+
+        if outcome == "cancelled" and stats["cancelled"] == 1 and stats["failed"] == 0:
+            print("✅ توقف الطلب الجاري وتم احتسابه كملغى")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {outcome} {stats}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المجدول: {e}")
+        return False
+
+def test_agent_turn_stops_streaming():
+    """Test that a cancelled agent turn stops mid-stream and closes the Ollama stream"""
+    print("\n🤖 اختبار إيقاف دورة الوكيل أثناء التوليد...")
+
+    try:
+        import cancellation
+        from llm_scheduler import LLMScheduler
+        from load_test import LoadTestPipeline
+        from ollama_stub import OllamaStubServer
+        from rona_v5_updated import prepare_agent_input
+
+        with OllamaStubServer(token_rate=20, reply_tokens=200) as stub, LoadTestPipeline(stub.url) as pipeline:
+            user = pipeline.new_user("cancel")
+            scheduler = LLMScheduler(max_workers=1)
+
+            def turn():
+                token = cancellation.current_token()
+                agent_input = prepare_agent_input("ما هي لغة Python؟", None, user.conversation_manager)
+                return user.executor.invoke(agent_input, config={"callbacks": [cancellation.callback_handler(token)]})
+
+            started = time.perf_counter()
+            future = scheduler.submit(turn, key="turn")
+            time.sleep(1.0)
+            scheduler.cancel("turn")
+            try:
+                future.result(timeout=5)
+                outcome = "finished"
+            except cancellation.OperationCancelled:
+                outcome = "cancelled"
+            elapsed = time.perf_counter() - started
+            time.sleep(0.3)
+            aborted = stub.stats()["streams_aborted"]
+            memory = len(user.executor.memory.chat_memory.messages)
+            scheduler.shutdown()
+
+        if outcome == "cancelled" and elapsed < 3 and aborted == 1 and memory == 0:
+            print(f"✅ توقفت الدورة بعد {elapsed:.1f} ثانية بدلاً من 10 وأُغلق الاتصال بالنموذج")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {outcome} {elapsed:.1f}s aborted={aborted} memory={memory}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار دورة الوكيل: {e}")
+        return False
+
+def test_pool_releases_cancelled_streams():
+    """Test that a cancelled or closed stream gives its Ollama host back to the pool"""
+    print("\n🔀 اختبار تحرير المضيف بعد إيقاف البث...")
+
+    try:
+        import cancellation
+        from ollama_pool import OllamaPool, PooledChatOllama
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(token_rate=50, reply_tokens=200) as stub:
+            pool = OllamaPool([stub.url])
+            llm = PooledChatOllama(pool=pool, model="mistral:7b")
+
+            token = cancellation.CancellationToken()
+            handler = cancellation.callback_handler(token)
+            try:
+                for _ in llm.stream("مرحبا", config={"callbacks": [handler]}):
+                    token.cancel()
+                outcome = "finished"
+            except cancellation.OperationCancelled:
+                outcome = "cancelled"
+            after_cancel = pool.status()[0]
+
+            stream = llm.stream("مرحبا")
+            next(stream)
+            stream.close()
+            after_close = pool.status()[0]
+
+        if outcome == "cancelled" and after_cancel["in_flight"] == 0 and after_close["in_flight"] == 0 \
+                and after_close["total_requests"] == 2 and after_close["total_failures"] == 0:
+            print("✅ عاد عدد الطلبات الجارية إلى 0 دون احتساب فشل")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {outcome} {after_cancel} {after_close}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تحرير المضيف: {e}")
+        return False
+
+class TrickleHandler(BaseHTTPRequestHandler):
+    """Send a page one byte every 100 ms"""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", "100")
+        self.end_headers()
+        try:
+            for _ in range(100):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+                time.sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def test_web_request_aborted():
+    """Test that cancelling aborts a web page download in progress"""
+    print("\n🌐 اختبار إيقاف تحميل صفحة ويب...")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TrickleHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        import cancellation
+        from internet_search import InternetSearch
+
+        search = InternetSearch()
+        url = "http://%s:%d/" % server.server_address[:2]
+        token = cancellation.CancellationToken()
+        threading.Timer(0.3, token.cancel).start()
+        started = time.perf_counter()
+        try:
+            with cancellation.use_token(token):
+                search.get_web_content(url)
+            outcome = "finished"
+        except cancellation.OperationCancelled:
+            outcome = "cancelled"
+        elapsed = time.perf_counter() - started
+
+        if outcome == "cancelled" and elapsed < 1.5:
+            print(f"✅ توقف التحميل بعد {elapsed:.2f} ثانية بدلاً من 10")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {outcome} بعد {elapsed:.2f} ثانية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تحميل الصفحة: {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_web_page_read_with_token():
+    """Test that a page read under a live token gives the same results as a plain read"""
+    print("\n📄 اختبار قراءة صفحة ويب مع رمز إلغاء...")
+
+    handler = partial(SimpleHTTPRequestHandler, directory=FIXTURES_DIR)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        import cancellation
+        import requests
+        from internet_search import InternetSearch
+
+        search = InternetSearch()
+        base_url = "http://%s:%d/" % server.server_address[:2]
+        search.search_engines['google'] = base_url + "google.html?q={}"
+
+        plain_results = search.search_web("python")
+        plain_page = search.get_web_content(base_url + "page.html")
+        with cancellation.use_token(cancellation.CancellationToken()):
+            token_results = search.search_web("python")
+            token_page = search.get_web_content(base_url + "page.html")
+            try:
+                search._get_text(base_url + "missing.html", search.timeout)
+                missing = "read"
+            except requests.HTTPError:
+                missing = "raised"
+
+        if plain_results and token_results == plain_results and token_page == plain_page \
+                and missing == "raised":
+            print("✅ نفس النتائج مع رمز الإلغاء وبدونه")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {len(plain_results)} {len(token_results)} {missing}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار قراءة الصفحة: {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_abandoned_stream_cancels_turn():
+    """Test that closing a server event stream early cancels its turn"""
+    print("\n📡 اختبار إلغاء الدورة عند انقطاع العميل...")
+
+    try:
+        import queue
+        from rona_server import _drain_events
+
+        abandoned = []
+        events = queue.Queue()
+        events.put(("token", {"text": "a"}))
+        stream = _drain_events(events, on_abandon=lambda: abandoned.append(True))
+        next(stream)
+        stream.close()
+
+        finished = queue.Queue()
+        finished.put(("done", {}))
+        finished.put(None)
+        list(_drain_events(finished, on_abandon=lambda: abandoned.append(False)))
+
+        if abandoned == [True]:
+            print("✅ إغلاق البث قبل نهايته يلغي الدورة فقط")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {abandoned}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار انقطاع العميل: {e}")
+        return False
+
+def main():
+    """Run all cancellation tests"""
+    print("🚀 بدء اختبارات إلغاء الطلبات...")
+
+    tests = [
+        ("رموز الإلغاء", test_token_callbacks),
+        ("إلغاء طلب قيد التنفيذ", test_scheduler_cancels_running_request),
+        ("إيقاف دورة الوكيل", test_agent_turn_stops_streaming),
+        ("تحرير المضيف بعد الإيقاف", test_pool_releases_cancelled_streams),
+        ("إيقاف تحميل صفحة ويب", test_web_request_aborted),
+        ("قراءة صفحة مع رمز إلغاء", test_web_page_read_with_token),
+        ("انقطاع العميل", test_abandoned_stream_cancels_turn)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
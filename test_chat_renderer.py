@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Incremental Chat Rendering
+اختبار العرض التدريجي للمحادثة
+"""
+
+import sys
+import os
+import tempfile
+import time
+import tkinter as tk
+
+class CountingText(tk.Text):
+    """Text widget that counts insert and delete calls"""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.inserts = 0
+        self.deletes = 0
+
+    def insert(self, *args, **kwargs):
+        self.inserts += 1
+        return super().insert(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.deletes += 1
+        return super().delete(*args, **kwargs)
+
+def make_textbox():
+    root = tk.Tk()
+    root.withdraw()
+    return root, CountingText(root)
+
+def make_history(count, start=1):
+    return [
+        {"id": i, "role": "user" if i % 2 else "assistant",
+         "content": f"سؤال {i} عن Python" if i % 2 else f"إجابة {i}\n```print({i})```\nتم"}
+        for i in range(start, start + count)
+    ]
+
+def test_append_only_new_messages():
+    """Test that sync renders each message once and keeps notices"""
+    print("➕ اختبار إضافة الرسائل الجديدة فقط...")
+
+    try:
+        from chat_renderer import ChatRenderer
+
+        root, textbox = make_textbox()
+        try:
+            renderer = ChatRenderer(textbox)
+            history = make_history(4)
+            first = renderer.sync(history)
+            renderer.append({"role": "assistant", "content": "مرحباً!"})
+            second = renderer.sync(history)
+            history += make_history(2, start=5)
+            third = renderer.sync(history)
+            text = textbox.get("1.0", "end-1c")
+        finally:
+            root.destroy()
+
+        if (first, second, third) != (4, 0, 2) or len(renderer) != 7:
+            print(f"❌ عدد رسائل غير متوقع: {(first, second, third)}")
+            return False
+        if text.count("سؤال 1 ") != 1 or "مرحباً!" not in text or not text.rstrip().endswith("تم"):
+            print(f"❌ نص غير متوقع:\n{text}")
+            return False
+        print("✅ تم عرض كل رسالة مرة واحدة مع بقاء التنبيهات")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الإضافة: {e}")
+        return False
+
+def test_constant_cost_per_turn():
+    """Test that a turn costs the same number of widget calls at any history length"""
+    print("\n📏 اختبار ثبات تكلفة الدورة...")
+
+    try:
+        from chat_renderer import ChatRenderer
+
+        costs = []
+        for length in (10, 1000):
+            root, textbox = make_textbox()
+            try:
+                renderer = ChatRenderer(textbox)
+                history = make_history(length)
+                renderer.sync(history)
+                textbox.inserts = textbox.deletes = 0
+                history += make_history(2, start=length + 1)
+                renderer.sync(history)
+                costs.append((textbox.inserts, textbox.deletes))
+            finally:
+                root.destroy()
+
+        if costs[0] == costs[1] and costs[0][1] == 0:
+            print(f"✅ {costs[0][0]} عمليات إدراج لكل دورة بغض النظر عن طول المحادثة")
+            return True
+        print(f"❌ تكلفة متغيرة: {costs}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التكلفة: {e}")
+        return False
+
+def test_targeted_updates():
+    """Test updating and removing one message in place"""
+    print("\n🎯 اختبار التحديث الموضعي...")
+
+    try:
+        from chat_renderer import ChatRenderer, message_key
+
+        root, textbox = make_textbox()
+        try:
+            renderer = ChatRenderer(textbox)
+            history = make_history(3)
+            renderer.sync(history)
+            key = message_key(history[1])
+            start = renderer.index_of(key)
+            renderer.update(key, {"role": "assistant", "content": "إجابة مختصرة عن SQL"})
+            updated = textbox.get("1.0", "end-1c")
+            tags = textbox.tag_names(f"{renderer.index_of(key)} + 26c")
+            renderer.remove(message_key(history[0]))
+            after_remove = textbox.get("1.0", "end-1c")
+            moved = renderer.index_of(key)
+        finally:
+            root.destroy()
+
+        if "print(2)" in updated or "إجابة مختصرة" not in updated or "سؤال 3" not in updated:
+            print(f"❌ تحديث غير صحيح:\n{updated}")
+            return False
+        if "highlight" not in tags:
+            print(f"❌ لم يتم تمييز الكلمة المفتاحية: {tags}")
+            return False
+        if "سؤال 1 " in after_remove or moved != "1.0" or start == moved:
+            print(f"❌ حذف غير صحيح: {moved}")
+            return False
+        print("✅ تم تحديث وحذف رسالة واحدة دون إعادة رسم البقية")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التحديث: {e}")
+        return False
+
+def test_single_pass_highlighting():
+    """Test keyword order, overlapping keywords and merged runs"""
+    print("\n🔍 اختبار تمييز الكلمات المفتاحية في مرور واحد...")
+
+    try:
+        from chat_renderer import HIGHLIGHT_KEYWORDS_ENV, configured_keywords, highlight_segments, message_segments
+
+        segments = highlight_segments("SQL ثم Python ثم SQL و JavaScript", ["Python", "Java", "JavaScript", "SQL"])
+        highlighted = [text for text, tag in segments if tag == "highlight"]
+        if highlighted != ["SQL", "Python", "SQL", "JavaScript"]:
+            print(f"❌ كلمات مميزة غير صحيحة: {highlighted}")
+            return False
+        print("✅ تم تمييز كل الكلمات بترتيب ظهورها مع تفضيل الأطول")
+
+        segments = message_segments({"role": "assistant", "content": "نص```a``````b```نص"}, [])
+        if any(a[1] == b[1] for a, b in zip(segments, segments[1:])) or any(not text for text, _ in segments):
+            print(f"❌ لم يتم دمج المقاطع المتجاورة: {segments}")
+            return False
+        print(f"✅ {len(segments)} مقاطع بعد دمج المقاطع المتشابهة")
+
+        previous = os.environ.get(HIGHLIGHT_KEYWORDS_ENV)
+        os.environ[HIGHLIGHT_KEYWORDS_ENV] = "Rust, Go ,"
+        try:
+            keywords = configured_keywords()
+        finally:
+            if previous is None:
+                os.environ.pop(HIGHLIGHT_KEYWORDS_ENV)
+            else:
+                os.environ[HIGHLIGHT_KEYWORDS_ENV] = previous
+        if keywords != ["Rust", "Go"]:
+            print(f"❌ لم تتم قراءة الكلمات المخصصة: {keywords}")
+            return False
+        print("✅ تمت قراءة الكلمات المفتاحية من متغير البيئة")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التمييز: {e}")
+        return False
+
+def test_batched_insert():
+    """Test that a message with many keywords is inserted in one widget call"""
+    print("\n📦 اختبار تجميع عمليات الإدراج...")
+
+    try:
+        from chat_renderer import ChatRenderer
+
+        root, textbox = make_textbox()
+        try:
+            renderer = ChatRenderer(textbox, keywords=["Python", "SQL"])
+            renderer.append({"role": "assistant", "content": "Python و SQL " * 50 + "```x = 1```"})
+            inserts = textbox.inserts
+            highlighted = len(textbox.tag_ranges("highlight")) // 2
+            code = textbox.get(*textbox.tag_ranges("code_block"))
+        finally:
+            root.destroy()
+
+        if inserts == 1 and highlighted == 100 and code == "x = 1\n":
+            print("✅ تم إدراج الرسالة بعملية واحدة مع 100 كلمة مميزة")
+            return True
+        print(f"❌ {inserts} عمليات إدراج و {highlighted} كلمة مميزة")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تجميع الإدراج: {e}")
+        return False
+
+def test_large_response_highlighting():
+    """Test highlighting a 1 MB response"""
+    print("\n📄 اختبار تمييز رد بحجم 1 ميغابايت...")
+
+    try:
+        from chat_renderer import highlight_segments
+
+        text = ("شرح عن Python و SQL مع API. " * 40000)[:1024 * 1024]
+        started = time.perf_counter()
+        segments = highlight_segments(text)
+        elapsed = time.perf_counter() - started
+
+        if "".join(part for part, _ in segments) == text and elapsed < 1.0:
+            print(f"✅ تم تمييز 1 ميغابايت في {elapsed * 1000:.0f} ميلي ثانية ({len(segments)} مقطع)")
+            return True
+        print(f"❌ تمييز بطيء أو غير صحيح: {elapsed:.2f} ثانية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الرد الكبير: {e}")
+        return False
+
+def test_markdown_segments():
+    """Test parsing of fences with a language, inline code, headings and lists"""
+    print("\n📝 اختبار تحليل Markdown...")
+
+    try:
+        from chat_renderer import message_segments
+
+        content = "# المقدمة\n- عنصر عن Python\n2. استخدم `pip install`\n```python\nprint(1)\n```\nتم"
+        segments = message_segments({"role": "assistant", "content": content}, ["Python"])
+        expected = [
+            ("المقدمة\n", "heading"), ("• ", "list_marker"), ("Python", "highlight"), ("2. ", "list_marker"),
+            ("pip install", "inline_code"), ("python\n", "code_lang"), ("print(1)\n", "code_block")
+        ]
+        missing = [segment for segment in expected if segment not in segments]
+        if missing:
+            print(f"❌ مقاطع مفقودة: {missing}")
+            return False
+        if "".join(text for text, _ in segments) != "Rona_v5:\nالمقدمة\n• عنصر عن Python\n2. استخدم pip install\npython\nprint(1)\n\nتم\n":
+            print(f"❌ نص غير متوقع: {segments}")
+            return False
+        print("✅ تم تحليل الكتل البرمجية والعناوين والقوائم والكود المضمن")
+
+        legacy = message_segments({"role": "assistant", "content": "أ```print(1)```ب"}, [])
+        if ("print(1)\n", "code_block") not in legacy:
+            print(f"❌ كتلة كود بدون لغة غير صحيحة: {legacy}")
+            return False
+        print("✅ الكتل البرمجية في سطر واحد ما زالت مدعومة")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تحليل Markdown: {e}")
+        return False
+
+def test_cached_segments():
+    """Test that redraws reuse parsed segments and edits are parsed again"""
+    print("\n🗃️ اختبار التخزين المؤقت للمقاطع...")
+
+    try:
+        import chat_renderer
+        from chat_renderer import ChatRenderer, message_key
+
+        parsed = []
+        original = chat_renderer.message_segments
+
+        def counting_segments(message, keywords):
+            parsed.append(message["content"])
+            return original(message, keywords)
+
+        chat_renderer.message_segments = counting_segments
+        root, textbox = make_textbox()
+        try:
+            renderer = ChatRenderer(textbox)
+            history = make_history(4)
+            for message in history:
+                renderer.prepare(message)
+            renderer.sync(history)
+            key = message_key(history[1])
+            renderer.remove(key)
+            renderer.prepend(history[1])
+            after_redraw = len(parsed)
+            renderer.update(key, dict(history[1], content="إجابة معدلة"))
+            after_edit = len(parsed)
+        finally:
+            chat_renderer.message_segments = original
+            root.destroy()
+
+        if after_redraw == 4 and after_edit == 5:
+            print("✅ تم تحليل كل رسالة مرة واحدة وإعادة التحليل بعد التعديل فقط")
+            return True
+        print(f"❌ عدد مرات التحليل: {after_redraw} ثم {after_edit}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التخزين المؤقت: {e}")
+        return False
+
+def make_session(count):
+    """Create a session store holding one session with `count` messages"""
+    from session_store import SessionStore
+
+    store = SessionStore(os.path.join(tempfile.mkdtemp(), "sessions.db"))
+    session_id = store.create_session()
+    store.append_messages(session_id, [
+        ("user" if i % 2 else "assistant", f"رسالة {i} عن Python", None) for i in range(1, count + 1)
+    ])
+    return store, session_id
+
+def test_windowed_paging():
+    """Test that scrolling pages messages in and keeps the window bounded"""
+    print("\n🪟 اختبار النافذة المتحركة...")
+
+    try:
+        from chat_renderer import ChatRenderer, VirtualChatView
+
+        store, session_id = make_session(100_000)
+        root, textbox = make_textbox()
+        try:
+            scheduled = []
+            view = VirtualChatView(ChatRenderer(textbox), store, session_id, page_size=40, max_messages=120,
+                                   schedule=scheduled.append)
+            view.load()
+            view.on_yview(0.05, 0.4)
+            view.on_yview(0.02, 0.3)
+            if len(scheduled) != 1:
+                print(f"❌ تمت جدولة {len(scheduled)} عمليات تحميل")
+                return False
+            scheduled.pop()()
+            for _ in range(9):
+                view.page_older()
+            window = len(view.renderer)
+            text = textbox.get("1.0", "end-1c")
+            oldest_shown = "رسالة 99561 " in text and "رسالة 99560 " not in text
+            newest_dropped = "رسالة 100000 " not in text and view.has_newer
+
+            while view.has_newer:
+                view.page_newer()
+            back_at_end = "رسالة 100000 " in textbox.get("1.0", "end-1c") and len(view.renderer) <= 120
+        finally:
+            root.destroy()
+            store.close()
+
+        if window == 120 and oldest_shown and newest_dropped and back_at_end:
+            print("✅ تم تحميل الصفحات عند التمرير مع بقاء 120 رسالة فقط في النافذة")
+            return True
+        print(f"❌ نافذة غير صحيحة: {window} {oldest_shown} {newest_dropped} {back_at_end}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار النافذة المتحركة: {e}")
+        return False
+
+def test_flat_scroll_cost():
+    """Test that paging costs the same in a 100k-message session as in a short one"""
+    print("\n⚡ اختبار ثبات زمن التمرير...")
+
+    try:
+        from chat_renderer import ChatRenderer, VirtualChatView
+
+        timings = {}
+        for count in (1_000, 100_000):
+            store, session_id = make_session(count)
+            root, textbox = make_textbox()
+            try:
+                view = VirtualChatView(ChatRenderer(textbox), store, session_id, page_size=40, max_messages=120)
+                view.load()
+                started = time.perf_counter()
+                for _ in range(10):
+                    view.page_older()
+                timings[count] = (time.perf_counter() - started) / 10
+            finally:
+                root.destroy()
+                store.close()
+
+        short, long = timings[1_000], timings[100_000]
+        if long < max(short * 3, 0.005):
+            print(f"✅ زمن تحميل الصفحة {short * 1000:.1f} مقابل {long * 1000:.1f} ميلي ثانية")
+            return True
+        print(f"❌ زمن التمرير يزداد مع طول المحادثة: {short * 1000:.1f} → {long * 1000:.1f} ميلي ثانية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار زمن التمرير: {e}")
+        return False
+
+def test_new_message_returns_to_latest():
+    """Test that a new message while scrolled back jumps to the latest page"""
+    print("\n⬇️ اختبار العودة إلى آخر الرسائل...")
+
+    try:
+        from chat_renderer import ChatRenderer, VirtualChatView
+
+        store, session_id = make_session(500)
+        root, textbox = make_textbox()
+        try:
+            view = VirtualChatView(ChatRenderer(textbox), store, session_id, page_size=40, max_messages=80)
+            view.load()
+            for _ in range(3):
+                view.page_older()
+            message_id = store.append_message(session_id, "user", "سؤال جديد")
+            view.sync([{"id": message_id, "role": "user", "content": "سؤال جديد", "timestamp": "t"}])
+            text = textbox.get("1.0", "end-1c")
+        finally:
+            root.destroy()
+            store.close()
+
+        if "سؤال جديد" in text and not view.has_newer and len(view.renderer) == 40:
+            print("✅ تم عرض الرسالة الجديدة مع آخر صفحة")
+            return True
+        print(f"❌ لم يتم الرجوع إلى آخر الرسائل ({len(view.renderer)} رسالة)")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار العودة: {e}")
+        return False
+
+def main():
+    """Run all chat renderer tests"""
+    print("🚀 بدء اختبارات عرض المحادثة...")
+
+    tests = [
+        ("إضافة الرسائل الجديدة فقط", test_append_only_new_messages),
+        ("ثبات تكلفة الدورة", test_constant_cost_per_turn),
+        ("التحديث الموضعي", test_targeted_updates),
+        ("التمييز في مرور واحد", test_single_pass_highlighting),
+        ("تجميع الإدراج", test_batched_insert),
+        ("تمييز رد كبير", test_large_response_highlighting),
+        ("تحليل Markdown", test_markdown_segments),
+        ("التخزين المؤقت للمقاطع", test_cached_segments),
+        ("النافذة المتحركة", test_windowed_paging),
+        ("ثبات زمن التمرير", test_flat_scroll_cost),
+        ("العودة إلى آخر الرسائل", test_new_message_returns_to_latest)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
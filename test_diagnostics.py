@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Background Diagnostics
+اختبار الفحوصات في الخلفية
+"""
+
+import sys
+import os
+import time
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+RESPONSE_DELAY = 0.3
+
+class SlowFixtureHandler(SimpleHTTPRequestHandler):
+    """Serve the recorded search pages after a fixed delay"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def do_GET(self):
+        time.sleep(RESPONSE_DELAY)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowFixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+def test_parallel_engine_checks():
+    """Test that engines are checked in parallel with a latency for each"""
+    print("🌐 اختبار فحص محركات البحث بالتوازي...")
+
+    server, url = start_fixture_server()
+    try:
+        from internet_search import InternetSearch
+
+        search = InternetSearch()
+        search.search_engines = {
+            'google': url + "/google.html?q={}",
+            'bing': url + "/bing.html?q={}",
+            'duckduckgo': url + "/missing.html?q={}"
+        }
+        reported = []
+        started = time.perf_counter()
+        checks = search.check_engines("python", on_result=lambda check: reported.append(check['engine']))
+        elapsed = time.perf_counter() - started
+
+        by_engine = {check['engine']: check for check in checks}
+        if [check['engine'] for check in checks] != ['google', 'bing', 'duckduckgo'] or sorted(reported) != sorted(by_engine):
+            print(f"❌ ترتيب النتائج غير صحيح: {checks}")
+            return False
+        if not (by_engine['google']['ok'] and by_engine['bing']['ok'] and not by_engine['duckduckgo']['ok']):
+            print(f"❌ حالة المحركات غير صحيحة: {[(c['engine'], c['ok'], c['error']) for c in checks]}")
+            return False
+        if elapsed > RESPONSE_DELAY * 2 or any(check['latency'] < RESPONSE_DELAY for check in checks):
+            print(f"❌ لم يتم الفحص بالتوازي: {elapsed:.2f} ثانية")
+            return False
+        print(f"✅ تم فحص 3 محركات في {elapsed:.2f} ثانية بدلاً من {RESPONSE_DELAY * 3:.1f} مع زمن كل محرك")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المحركات: {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_task_timeout():
+    """Test that a slow diagnostic is reported as timed out without waiting for it"""
+    print("\n⏱️ اختبار مهلة الفحص...")
+
+    try:
+        import diagnostics
+
+        runner = diagnostics.DiagnosticsRunner()
+        done = []
+        started = time.perf_counter()
+        task = runner.run("slow", lambda task: time.sleep(1.0) or "late", timeout=0.2, on_done=done.append)
+        task.wait(2)
+        waited = time.perf_counter() - started
+        time.sleep(1.0)
+        runner.shutdown()
+
+        if task.state == diagnostics.STATE_TIMED_OUT and task.result is None and done == [task] and waited < 0.6:
+            print(f"✅ تم الإبلاغ عن انتهاء المهلة بعد {waited:.2f} ثانية وتجاهل النتيجة المتأخرة")
+            return True
+        print(f"❌ حالة غير متوقعة: {task.state} {task.result} {len(done)} {waited:.2f}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المهلة: {e}")
+        return False
+
+def test_progress_failure_and_dedup():
+    """Test progress reports, failures and one running task per name"""
+    print("\n📶 اختبار التقدم والأخطاء...")
+
+    try:
+        import diagnostics
+
+        runner = diagnostics.DiagnosticsRunner()
+        release = threading.Event()
+        progress = []
+
+        def check(task):
+            task.report("نصف الطريق")
+            release.wait(2)
+            return 42
+
+        first = runner.run("check", check, on_progress=lambda task, message: progress.append(message))
+        second = runner.run("check", check)
+        same_task = first is second and runner.running("check") is first
+        release.set()
+        first.wait(2)
+
+        failed = runner.run("broken", lambda task: 1 / 0)
+        failed.wait(2)
+        runner.shutdown()
+
+        if not same_task:
+            print("❌ تم تشغيل الفحص نفسه مرتين")
+            return False
+        if first.state != diagnostics.STATE_DONE or first.result != 42 or progress != ["نصف الطريق"]:
+            print(f"❌ نتيجة غير متوقعة: {first.state} {first.result} {progress}")
+            return False
+        if failed.state != diagnostics.STATE_FAILED or "division" not in failed.error:
+            print(f"❌ لم يتم تسجيل الخطأ: {failed.state} {failed.error}")
+            return False
+        print("✅ تم الإبلاغ عن التقدم والأخطاء مع تشغيل فحص واحد لكل اسم")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التقدم: {e}")
+        return False
+
+def test_database_status_check():
+    """Test counting documents in the background"""
+    print("\n📊 اختبار فحص حالة قاعدة البيانات...")
+
+    try:
+        import diagnostics
+
+        class FakeCollection:
+            def count(self):
+                return 7
+
+        class FakeVectorDB:
+            _collection = FakeCollection()
+
+        runner = diagnostics.DiagnosticsRunner()
+        task = runner.run("database_status", diagnostics.database_status_check(FakeVectorDB()))
+        task.wait(2)
+        runner.shutdown()
+
+        if task.state == diagnostics.STATE_DONE and task.result["documents"] == 7 and task.result["latency"] >= 0:
+            print("✅ تم حساب الوثائق في الخلفية")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {task.state} {task.result}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار حالة قاعدة البيانات: {e}")
+        return False
+
+def main():
+    """Run all diagnostics tests"""
+    print("🚀 بدء اختبارات الفحوصات في الخلفية...")
+
+    tests = [
+        ("فحص المحركات بالتوازي", test_parallel_engine_checks),
+        ("مهلة الفحص", test_task_timeout),
+        ("التقدم والأخطاء", test_progress_failure_and_dedup),
+        ("حالة قاعدة البيانات", test_database_status_check)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Long-term Episodic Memory
+اختبار ذاكرة المحادثات طويلة المدى
+"""
+
+import sys
+import os
+import tempfile
+import shutil
+import datetime
+
+def create_test_memory(temp_dir, **kwargs):
+    """Create an episodic memory backed by deterministic fake embeddings"""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from episodic_memory import EpisodicMemory
+
+    return EpisodicMemory(DeterministicFakeEmbedding(size=64), persist_directory=temp_dir, **kwargs)
+
+def test_background_indexing():
+    """Test that evicted messages are indexed as episodes"""
+    print("🧠 اختبار فهرسة الذاكرة في الخلفية...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        memory = create_test_memory(temp_dir)
+        memory.remember([
+            {"role": "user", "content": "ما هو Python؟", "timestamp": datetime.datetime.now().isoformat()},
+            {"role": "assistant", "content": "Python لغة برمجة", "timestamp": datetime.datetime.now().isoformat()},
+            {"role": "user", "content": "ما هو Git؟", "timestamp": datetime.datetime.now().isoformat()},
+        ])
+
+        if not memory.flush(timeout=30):
+            print("❌ لم تكتمل الفهرسة في الوقت المحدد")
+            return False
+
+        # The trailing user message waits for its reply before being indexed
+        count = memory.count()
+        if count == 1:
+            print(f"✅ تمت فهرسة {count} حلقة")
+        else:
+            print(f"❌ عدد الحلقات غير متوقع: {count}")
+            return False
+
+        memory.remember([{"role": "assistant", "content": "Git نظام تحكم بالإصدارات",
+                          "timestamp": datetime.datetime.now().isoformat()}])
+        memory.flush(timeout=30)
+
+        if memory.count() == 2:
+            print("✅ تم ربط الرد المتأخر بسؤاله")
+            return True
+        print(f"❌ عدد الحلقات بعد الرد: {memory.count()}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الفهرسة: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_sessions_paired_separately():
+    """Test that a reply is never paired with a user message from another session"""
+    print("\n🔀 اختبار فصل الجلسات عند التبديل أثناء الإجابة...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        memory = create_test_memory(temp_dir)
+        now = datetime.datetime.now().isoformat()
+        memory.remember([{"role": "user", "content": "سؤال الجلسة الأولى", "timestamp": now}], "first")
+        memory.remember([{"role": "user", "content": "سؤال الجلسة الثانية", "timestamp": now}], "second")
+        memory.remember([{"role": "assistant", "content": "رد الجلسة الثانية", "timestamp": now}], "second")
+        memory.remember([{"role": "assistant", "content": "رد الجلسة الأولى", "timestamp": now}], "first")
+        memory.flush(timeout=30)
+
+        stored = memory.vector_db.get()
+        episodes = {meta["session_id"]: text for text, meta in zip(stored["documents"], stored["metadatas"])}
+        expected = {
+            "first": "User: سؤال الجلسة الأولى\nAssistant: رد الجلسة الأولى",
+            "second": "User: سؤال الجلسة الثانية\nAssistant: رد الجلسة الثانية",
+        }
+        if len(stored["documents"]) == 2 and episodes == expected:
+            print("✅ تم ربط كل رد بسؤال جلسته")
+            return True
+        print(f"❌ حلقات غير متوقعة: {stored['documents']}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار فصل الجلسات: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_recall_scoped_to_user_and_session():
+    """Test that one user's or session's episodes are never recalled for another"""
+    print("\n🔒 اختبار عزل الذاكرة بين المستخدمين والجلسات...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        from rona_v5_updated import retrieve_context
+
+        # Accept any relevance, so only the scope decides what is recalled
+        memory = create_test_memory(temp_dir, min_relevance=-1.0)
+        now = datetime.datetime.now().isoformat()
+        for session_id, user_id, secret in (("alice-1", "alice", "سر أليس"), ("bob-1", "bob", "سر بوب"),
+                                            ("anon-1", None, "سر مجهول")):
+            memory.remember([
+                {"role": "user", "content": secret, "timestamp": now},
+                {"role": "assistant", "content": "حسناً", "timestamp": now},
+            ], session_id, user_id)
+        memory.flush(timeout=30)
+
+        alice = retrieve_context(None, "سر", memory, session_id="alice-2", user_id="alice")
+        bob = retrieve_context(None, "سر", memory, session_id="bob-1", user_id="bob")
+        anonymous = retrieve_context(None, "سر", memory, session_id="anon-1")
+
+        leaks = [("alice", alice, ["سر بوب", "سر مجهول"]), ("bob", bob, ["سر أليس", "سر مجهول"]),
+                 ("anonymous", anonymous, ["سر أليس", "سر بوب"])]
+        if "سر أليس" in alice and "سر بوب" in bob and "سر مجهول" in anonymous \
+                and not any(other in recalled for _, recalled, others in leaks for other in others):
+            print("✅ تم استرجاع حلقات المستخدم أو الجلسة فقط")
+            return True
+        print(f"❌ تسرب بين النطاقات: {leaks}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار عزل الذاكرة: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_recall_bounds():
+    """Test that recall respects relevance, age and size limits"""
+    print("\n🔎 اختبار حدود الاسترجاع...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        memory = create_test_memory(temp_dir, max_age_days=30, min_relevance=0.9, max_chars=40)
+        old_timestamp = (datetime.datetime.now() - datetime.timedelta(days=60)).isoformat()
+        new_timestamp = datetime.datetime.now().isoformat()
+
+        memory.remember([
+            {"role": "user", "content": "old question", "timestamp": old_timestamp},
+            {"role": "assistant", "content": "old answer", "timestamp": old_timestamp},
+            {"role": "user", "content": "new question", "timestamp": new_timestamp},
+            {"role": "assistant", "content": "new answer", "timestamp": new_timestamp},
+        ])
+        memory.flush(timeout=30)
+
+        old_recall = memory.recall("User: old question\nAssistant: old answer")
+        if old_recall:
+            print("❌ تم استرجاع حلقة أقدم من الحد المسموح")
+            return False
+        print("✅ تم تجاهل الحلقات القديمة")
+
+        new_recall = memory.recall("User: new question\nAssistant: new answer")
+        if "new question" in new_recall and len(new_recall) <= 40:
+            print("✅ تم استرجاع الحلقة ذات الصلة ضمن الحد")
+        else:
+            print(f"❌ نتيجة استرجاع غير متوقعة: {new_recall!r}")
+            return False
+
+        unrelated = memory.recall("something completely different")
+        if not unrelated:
+            print("✅ تم تجاهل النتائج ضعيفة الصلة")
+            return True
+        print("❌ تم استرجاع نتائج ضعيفة الصلة")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاسترجاع: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_conversation_eviction():
+    """Test that ConversationManager hands evicted messages to the callback"""
+    print("\n💬 اختبار تمرير الرسائل المحذوفة من المحادثة...")
+
+    original_dir = os.getcwd()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        sys.path.insert(0, original_dir)
+        os.chdir(temp_dir)
+        from rona_v5_updated import ConversationManager
+
+        evicted = []
+        manager = ConversationManager(max_history=2, on_evict=evicted.extend)
+        for i in range(3):
+            manager.add_message("user", f"سؤال {i}")
+
+        if len(manager.conversation_history) == 2 and [m["content"] for m in evicted] == ["سؤال 0"]:
+            print("✅ تم تمرير الرسالة المحذوفة إلى الذاكرة طويلة المدى")
+            return True
+        print(f"❌ رسائل محذوفة غير متوقعة: {evicted}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تمرير الرسائل: {e}")
+        return False
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_concurrent_messages():
+    """Test that messages added from several threads are neither lost nor reordered"""
+    print("\n🧵 اختبار إضافة الرسائل من عدة خيوط...")
+
+    import threading
+
+    original_dir = os.getcwd()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        sys.path.insert(0, original_dir)
+        os.chdir(temp_dir)
+        from rona_v5_updated import ConversationManager
+
+        evicted = []
+        manager = ConversationManager(max_history=20, on_evict=evicted.extend)
+        writers_done = threading.Event()
+        read_errors = []
+
+        def write(worker):
+            for i in range(100):
+                manager.add_message("user", f"{worker}:{i}")
+
+        def read():
+            while not writers_done.is_set():
+                try:
+                    manager.messages()
+                    manager.get_recent_context(4)
+                except Exception as e:
+                    read_errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        writers = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        writers_done.set()
+        reader.join()
+
+        contents = [m["content"] for m in evicted + manager.messages()]
+        in_order = all([c for c in contents if c.startswith(f"{worker}:")] == [f"{worker}:{i}" for i in range(100)]
+                       for worker in range(4))
+        if len(contents) == 400 and in_order and not read_errors and len(manager.messages()) == 20:
+            print("✅ لم تُفقد أي رسالة وبقي ترتيبها")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {len(contents)} رسالة، مرتبة: {in_order}، أخطاء: {read_errors[:1]}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الخيوط: {e}")
+        return False
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def main():
+    """Run all episodic memory tests"""
+    print("🚀 بدء اختبارات الذاكرة طويلة المدى...")
+
+    tests = [
+        ("فهرسة الذاكرة", test_background_indexing),
+        ("فصل الجلسات", test_sessions_paired_separately),
+        ("عزل الذاكرة", test_recall_scoped_to_user_and_session),
+        ("حدود الاسترجاع", test_recall_bounds),
+        ("تمرير الرسائل المحذوفة", test_conversation_eviction),
+        ("الإضافة من عدة خيوط", test_concurrent_messages)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
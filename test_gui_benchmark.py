@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test GUI Benchmark
+اختبار قياس أداء الواجهة
+"""
+
+import sys
+import os
+import shutil
+
+def test_recorded_conversation():
+    """Test that the recorded conversation exercises Markdown, code and keywords"""
+    print("📼 اختبار المحادثة المسجلة...")
+
+    try:
+        import gui_benchmark
+        from chat_renderer import message_segments, configured_keywords
+
+        conversation = gui_benchmark.load_conversation()
+        agent = gui_benchmark.ReplayAgent(conversation["turns"])
+        replies = [agent.invoke({"input": turn["user"]})["output"] for turn in conversation["turns"]]
+        tags = set()
+        for reply in replies:
+            message = {"role": "assistant", "content": reply}
+            tags.update(tag for _, tag in message_segments(message, configured_keywords()))
+
+        expected = [turn["assistant"] for turn in conversation["turns"]]
+        if replies == expected and {"code_block", "heading", "highlight"} <= tags and conversation["notices"]:
+            print(f"✅ {len(replies)} ردود مسجلة تحتوي على {len(tags)} أنواع تنسيق")
+            return True
+        print(f"❌ محادثة غير مكتملة: {sorted(tags, key=str)}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المحادثة المسجلة: {e}")
+        return False
+
+def test_timers_and_memory_report():
+    """Test the method timer and the memory growth summary"""
+    print("\n⏱️ اختبار المؤقتات وتقرير الذاكرة...")
+
+    try:
+        import gui_benchmark
+
+        class Pump:
+            def pump(self, ran):
+                return ran
+
+        pump = Pump()
+        timer = gui_benchmark.MethodTimer(pump, "pump", keep=lambda ran: ran > 0)
+        results = [pump.pump(ran) for ran in (0, 2, 0, 1)]
+        report = gui_benchmark.memory_report([(0, 100.0), (500, 101.0), (1000, 102.5)])
+        empty = gui_benchmark.summarize_samples([])
+
+        if results != [0, 2, 0, 1] or len(timer.samples) != 2:
+            print(f"❌ المؤقت سجل {len(timer.samples)} استدعاءات بدلاً من 2")
+            return False
+        if report["growth_mb"] != 2.5 or report["growth_mb_per_1000_turns"] != 2.5 or "error" not in empty:
+            print(f"❌ تقرير غير متوقع: {report} {empty}")
+            return False
+        print("✅ تم تسجيل الإطارات الفعلية فقط وحساب نمو الذاكرة")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المؤقتات: {e}")
+        return False
+
+def test_missing_xvfb():
+    """Test that a missing Xvfb is reported without touching DISPLAY"""
+    print("\n🖥️ اختبار غياب Xvfb...")
+
+    try:
+        import gui_benchmark
+
+        before = os.environ.get("DISPLAY")
+        try:
+            gui_benchmark.VirtualDisplay(xvfb="rona-missing-xvfb").start()
+            print("❌ لم يتم الإبلاغ عن غياب Xvfb")
+            return False
+        except RuntimeError as e:
+            message = str(e)
+
+        if "rona-missing-xvfb" in message and os.environ.get("DISPLAY") == before:
+            print(f"✅ تم الإبلاغ عن الخطأ: {message}")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {message}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار Xvfb: {e}")
+        return False
+
+def test_short_gui_run():
+    """Test a short replay on the real window"""
+    print("\n🪟 اختبار تشغيل قصير للواجهة...")
+
+    if not os.environ.get("DISPLAY") and shutil.which("Xvfb") is None:
+        print("⚠️ لا توجد شاشة ولا Xvfb، تم تخطي التشغيل")
+        return True
+
+    try:
+        import gui_benchmark
+
+        current = gui_benchmark.run_gui_benchmark(turns=30, warmup=3)
+        results = current["results"]
+        errors = [name for name, result in results.items() if "error" in result]
+        latency = results["gui.input_to_paint"]
+
+        if not errors and latency["runs"] == 30 and current["memory"]["samples"]:
+            print(f"✅ زمن الإدخال حتى الرسم: {latency['median_ms']:.1f} ms (p95 {latency['p95_ms']:.1f} ms)")
+            return True
+        print(f"❌ قياسات ناقصة: {errors}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في تشغيل الواجهة: {e}")
+        return False
+
+def main():
+    """Run all GUI benchmark tests"""
+    print("🚀 بدء اختبارات قياس أداء الواجهة...")
+
+    tests = [
+        ("المحادثة المسجلة", test_recorded_conversation),
+        ("المؤقتات وتقرير الذاكرة", test_timers_and_memory_report),
+        ("غياب Xvfb", test_missing_xvfb),
+        ("تشغيل قصير للواجهة", test_short_gui_run)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Hardware Auto-Tuner
+اختبار ضبط إعدادات النموذج حسب الجهاز
+"""
+
+import sys
+import os
+import tempfile
+
+SMALL_MACHINE = {"physical_cores": 4, "logical_cores": 8, "total_ram_gb": 16.0,
+                 "available_ram_gb": 9.0, "gpu": None}
+GPU_MACHINE = {"physical_cores": 8, "logical_cores": 16, "total_ram_gb": 64.0,
+               "available_ram_gb": 40.0, "gpu": {"name": "Test GPU", "memory_gb": 24.0}}
+
+def test_hardware_detection():
+    """Test hardware detection and the settings derived from it"""
+    print("🖥️ اختبار اكتشاف الجهاز...")
+
+    try:
+        from hardware_tuner import detect_hardware, heuristic_options, candidate_options
+
+        hardware = detect_hardware()
+        if hardware["physical_cores"] < 1 or hardware["total_ram_gb"] <= 0:
+            print(f"❌ معلومات جهاز غير صحيحة: {hardware}")
+            return False
+        print(f"✅ الجهاز: {hardware['physical_cores']} أنوية، {hardware['total_ram_gb']} GB")
+
+        options = heuristic_options(SMALL_MACHINE)
+        if options != {"num_thread": 4, "num_ctx": 2048}:
+            print(f"❌ إعدادات تقديرية غير متوقعة: {options}")
+            return False
+        if heuristic_options({**SMALL_MACHINE, "available_ram_gb": 1.0}) != options:
+            print("❌ تتغير الإعدادات مع الذاكرة المتاحة")
+            return False
+        if "num_gpu" in heuristic_options(GPU_MACHINE):
+            print("❌ تم فرض num_gpu بدلاً من تركه لـ Ollama")
+            return False
+        print("✅ الإعدادات التقديرية تناسب الجهاز")
+
+        small = candidate_options(SMALL_MACHINE)
+        large = candidate_options(GPU_MACHINE)
+        threads = {options["num_thread"] for options in small}
+        large_settings = {(options["num_thread"], options.get("num_gpu")) for options in large}
+        contexts = {options["num_ctx"] for options in small + large}
+        if threads == {4, 3, 2} and len(large_settings) == len(large) == 6 \
+                and {thread for thread, _ in large_settings} == {8, 7, 4} and contexts == {2048, 4096}:
+            print(f"✅ تم توليد {len(small)} إعدادات مرشحة")
+            return True
+        print(f"❌ إعدادات مرشحة غير متوقعة: {small}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار اكتشاف الجهاز: {e}")
+        return False
+
+def test_benchmark_against_stub():
+    """Test measuring one candidate against the Ollama stub"""
+    print("\n⏱️ اختبار القياس على خادم وهمي...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from hardware_tuner import benchmark_options
+
+        with OllamaStubServer(reply="واحد اثنان ثلاثة أربعة") as stub:
+            result = benchmark_options({"num_thread": 2, "num_ctx": 2048}, "mistral:7b", stub.url)
+            sent = stub.last_payload["options"]
+            if sent["num_thread"] == 2 and sent["num_ctx"] == 2048 and result["tokens"] == 4 \
+                    and result["tokens_per_second"] > 0:
+                print(f"✅ تم القياس: {result['tokens_per_second']:.0f} tokens/s")
+                return True
+            print(f"❌ نتيجة غير متوقعة: {result} {sent}")
+            return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار القياس: {e}")
+        return False
+
+def test_tune_and_persist():
+    """Test picking the fastest profile, storing it and applying it"""
+    print("\n💾 اختبار اختيار الإعدادات وحفظها...")
+
+    try:
+        from hardware_tuner import tune, save_profile, get_llm_options
+
+        speeds = {4: 10.0, 3: 14.0, 2: 9.0}
+        profile = tune(
+            "mistral:7b", hardware=SMALL_MACHINE,
+            measure=lambda options: {"tokens_per_second": speeds[options["num_thread"]],
+                                     "wall_seconds": 1.0, "tokens": 10}
+        )
+        if profile["options"]["num_thread"] != 3:
+            print(f"❌ لم يتم اختيار الأسرع: {profile['options']}")
+            return False
+        print(f"✅ تم اختيار أسرع إعدادات: {profile['options']}")
+
+        path = os.path.join(tempfile.mkdtemp(), "tuning.json")
+        save_profile(profile, path)
+        tuned = get_llm_options("mistral:7b", path, hardware=SMALL_MACHINE)
+        other_machine = get_llm_options("mistral:7b", path, hardware=GPU_MACHINE)
+        other_model = get_llm_options("llama3", path, hardware=SMALL_MACHINE)
+
+        if tuned == profile["options"] and other_machine == {"num_thread": 8, "num_ctx": 4096} \
+                and other_model["num_thread"] == 4:
+            print("✅ تُطبق الإعدادات المحفوظة على نفس الجهاز والنموذج فقط")
+            return True
+        print(f"❌ إعدادات مطبقة غير متوقعة: {tuned} {other_machine} {other_model}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الحفظ: {e}")
+        return False
+
+def main():
+    """Run all tuner tests"""
+    print("🚀 بدء اختبارات ضبط الإعدادات حسب الجهاز...")
+
+    tests = [
+        ("اكتشاف الجهاز", test_hardware_detection),
+        ("القياس على خادم وهمي", test_benchmark_against_stub),
+        ("الاختيار والحفظ", test_tune_and_persist)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Large Input Handling
+اختبار معالجة النصوص الملصقة الكبيرة
+"""
+
+import sys
+import time
+
+NEEDLE = "ERROR disk quota exceeded while writing /var/lib/rona/index.db"
+
+def make_log(lines):
+    """A log of routine lines with one error in the middle"""
+    rows = [f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO request {i} served in {i % 97} ms" for i in range(lines)]
+    rows[lines // 2] = NEEDLE
+    return "\n".join(rows)
+
+class KeywordEmbeddings:
+    """Embeddings that count a few words, so similarity follows shared words"""
+
+    VOCABULARY = ["error", "disk", "quota", "info", "request", "served"]
+
+    def _embed(self, text):
+        words = text.lower().split()
+        return [float(sum(word.startswith(term) for word in words)) + 0.01 for term in self.VOCABULARY]
+
+    def embed_documents(self, texts):
+        self.indexed = len(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class FailingEmbeddings:
+    def embed_documents(self, texts):
+        raise ConnectionError("embedding server is down")
+
+    def embed_query(self, text):
+        raise ConnectionError("embedding server is down")
+
+def test_describe_large_paste():
+    """Test that a large paste is detected and shown in short form"""
+    print("📎 اختبار اكتشاف النص الملصق الكبير...")
+
+    try:
+        import large_input
+
+        log = make_log(2000)
+        shown = large_input.describe("ما سبب الخطأ؟", log)
+        if large_input.is_large(log) and not large_input.is_large("سؤال قصير") \
+                and shown.startswith("ما سبب الخطأ؟") and "2,000 سطر" in shown and len(shown) < 100:
+            print(f"✅ تم اكتشاف النص الكبير وعرضه باختصار: {shown.splitlines()[-1]}")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {shown}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاكتشاف: {e}")
+        return False
+
+def test_select_relevant_excerpts():
+    """Test that the temporary index selects the part of the paste the question is about"""
+    print("\n🔎 اختبار اختيار الأجزاء ذات الصلة...")
+
+    try:
+        import large_input
+
+        log = make_log(20000)
+        embeddings = KeywordEmbeddings()
+        excerpts, total_chunks = large_input.select_excerpts(log, "why did the disk quota error happen?", embeddings)
+        message = large_input.compose_message("why did the disk quota error happen?", log, excerpts, total_chunks)
+
+        if not any(NEEDLE in chunk for _, chunk in excerpts):
+            print(f"❌ لم يتم اختيار جزء الخطأ: {[i for i, _ in excerpts]}")
+            return False
+        if embeddings.indexed > large_input.MAX_INDEXED_CHUNKS or len(message) > large_input.EXCERPT_CHARS + 500:
+            print(f"❌ تجاوز الحدود: {embeddings.indexed} أجزاء مفهرسة، رسالة بطول {len(message)}")
+            return False
+        if [i for i, _ in excerpts] != sorted(i for i, _ in excerpts):
+            print("❌ الأجزاء ليست بترتيب النص")
+            return False
+        print(f"✅ تم اختيار {len(excerpts)} من {total_chunks} جزء ورسالة بطول {len(message)} بدلاً من {len(log):,}")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاختيار: {e}")
+        return False
+
+def test_keyword_fallback():
+    """Test that excerpts are still selected when embedding fails"""
+    print("\n🧩 اختبار الاختيار بالكلمات عند تعذر التضمين...")
+
+    try:
+        import large_input
+
+        log = make_log(5000)
+        excerpts, _ = large_input.select_excerpts(log, "disk quota exceeded", FailingEmbeddings())
+        without, _ = large_input.select_excerpts(log, "disk quota exceeded")
+
+        if any(NEEDLE in chunk for _, chunk in excerpts) and excerpts == without:
+            print("✅ تم اختيار جزء الخطأ بالكلمات المشتركة")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {[i for i, _ in excerpts]} {[i for i, _ in without]}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاختيار بالكلمات: {e}")
+        return False
+
+def test_megabyte_paste_with_ollama_embeddings():
+    """Test processing a 1 MB paste against the stub Ollama server"""
+    print("\n📄 اختبار معالجة لصق بحجم 1 ميجابايت...")
+
+    try:
+        import large_input
+        from langchain_ollama import OllamaEmbeddings
+        from ollama_stub import OllamaStubServer
+
+        log = make_log(19000)
+        with OllamaStubServer() as stub:
+            embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=stub.url)
+            started = time.perf_counter()
+            excerpts, total_chunks = large_input.select_excerpts(log, "disk quota exceeded", embeddings)
+            elapsed = time.perf_counter() - started
+
+        message = large_input.compose_message("disk quota exceeded", log, excerpts, total_chunks)
+        if len(log) >= 1_000_000 and excerpts and len(message) < large_input.EXCERPT_CHARS + 500 and elapsed < 10:
+            print(f"✅ تمت معالجة {len(log):,} حرف في {elapsed:.2f} ثانية")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {len(log)} {len(excerpts)} {len(message)} {elapsed:.2f}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار اللصق الكبير: {e}")
+        return False
+
+def main():
+    """Run all large input tests"""
+    print("🚀 بدء اختبارات النصوص الملصقة الكبيرة...")
+
+    tests = [
+        ("اكتشاف النص الكبير", test_describe_large_paste),
+        ("اختيار الأجزاء ذات الصلة", test_select_relevant_excerpts),
+        ("الاختيار بالكلمات", test_keyword_fallback),
+        ("لصق 1 ميجابايت", test_megabyte_paste_with_ollama_embeddings)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
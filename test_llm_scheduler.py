@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test LLM Request Scheduler
+اختبار مُجدول طلبات نموذج اللغة
+"""
+
+import sys
+import time
+import threading
+
+def test_priority_order():
+    """Test that interactive requests run before queued background work"""
+    print("🔢 اختبار ترتيب الأولويات...")
+
+    try:
+        from llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_INGESTION
+
+        scheduler = LLMScheduler(max_workers=1, max_queue_depth=10)
+        gate = threading.Event()
+        order = []
+
+        # Occupy the only worker so the rest queue up
+        blocker = scheduler.submit(gate.wait, 5)
+        futures = [
+            scheduler.submit(order.append, "ingestion-1", priority=PRIORITY_INGESTION),
+            scheduler.submit(order.append, "ingestion-2", priority=PRIORITY_INGESTION),
+            scheduler.submit(order.append, "interactive", priority=PRIORITY_INTERACTIVE),
+        ]
+        gate.set()
+        blocker.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        if order == ["interactive", "ingestion-1", "ingestion-2"]:
+            print("✅ الطلبات التفاعلية تُنفذ أولاً")
+            return True
+        print(f"❌ ترتيب غير متوقع: {order}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الأولويات: {e}")
+        return False
+
+def test_backpressure():
+    """Test queue limits, rejection and blocking submission"""
+    print("\n🚦 اختبار الضغط العكسي...")
+
+    try:
+        from llm_scheduler import LLMScheduler, SchedulerFullError
+
+        scheduler = LLMScheduler(max_workers=1, max_queue_depth=2)
+        gate = threading.Event()
+        scheduler.submit(gate.wait, 5)
+        time.sleep(0.05)
+        scheduler.submit(time.sleep, 0)
+        scheduler.submit(time.sleep, 0)
+
+        try:
+            scheduler.submit(time.sleep, 0)
+            print("❌ لم يتم رفض الطلب رغم امتلاء الطابور")
+            return False
+        except SchedulerFullError:
+            print("✅ تم رفض الطلب عند امتلاء الطابور")
+
+        start = time.monotonic()
+        try:
+            scheduler.submit(time.sleep, 0, block=True, timeout=0.2)
+            print("❌ الإرسال المحجوب لم ينتظر")
+            return False
+        except SchedulerFullError:
+            waited = time.monotonic() - start
+            print(f"✅ الإرسال المحجوب انتظر {waited:.2f} ثانية ثم توقف")
+
+        metrics = scheduler.metrics()
+        gate.set()
+        scheduler.shutdown()
+
+        if metrics["queue_depth"] == 2 and metrics["rejected"] == 2 and metrics["in_flight"] == 1:
+            print(f"✅ مقاييس الطابور صحيحة: {metrics['queue_depth']} في الانتظار")
+            return True
+        print(f"❌ مقاييس غير متوقعة: {metrics}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الضغط العكسي: {e}")
+        return False
+
+def test_superseded_requests():
+    """Test that a newer request with the same key cancels the older one"""
+    print("\n♻️ اختبار إلغاء الطلبات المستبدلة...")
+
+    try:
+        from llm_scheduler import LLMScheduler, is_current_request_cancelled
+
+        scheduler = LLMScheduler(max_workers=1, max_queue_depth=10)
+        started = threading.Event()
+
+        def long_running():
+            started.set()
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if is_current_request_cancelled():
+                    return "stopped"
+                time.sleep(0.01)
+            return "finished"
+
+        running = scheduler.submit(long_running, key="turn")
+        started.wait(5)
+        queued = scheduler.submit(time.sleep, 0, key="other")
+        replacement_1 = scheduler.submit(lambda: "first", key="queued")
+        replacement_2 = scheduler.submit(lambda: "second", key="queued")
+        scheduler.submit(lambda: "new turn", key="turn")
+
+        if running.result(timeout=5) != "stopped":
+            print("❌ الطلب الجاري لم يتوقف عند استبداله")
+            return False
+        print("✅ الطلب الجاري توقف عند استبداله")
+
+        queued.result(timeout=5)
+        if replacement_1.cancelled() and replacement_2.result(timeout=5) == "second":
+            print("✅ تم إلغاء الطلب المنتظر المستبدل")
+        else:
+            print("❌ الطلب المنتظر لم يُلغَ")
+            return False
+
+        metrics = scheduler.metrics()
+        scheduler.shutdown()
+        if metrics["superseded"] == 2:
+            print("✅ تم تسجيل الطلبات المستبدلة في المقاييس")
+            return True
+        print(f"❌ عدد الطلبات المستبدلة: {metrics['superseded']}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاستبدال: {e}")
+        return False
+
+def test_concurrency_limit():
+    """Test that no more than max_workers requests run at once"""
+    print("\n👷 اختبار حد التزامن...")
+
+    try:
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_workers=2, max_queue_depth=50)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work():
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        futures = [scheduler.submit(work) for _ in range(10)]
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        if state["peak"] <= 2:
+            print(f"✅ أقصى عدد متزامن: {state['peak']}")
+            return True
+        print(f"❌ تجاوز حد التزامن: {state['peak']}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التزامن: {e}")
+        return False
+
+def test_groups_run_one_at_a_time():
+    """Test that requests of one group run in order without holding the other workers"""
+    print("\n👥 اختبار تنفيذ طلبات الجلسة الواحدة بالتتابع...")
+
+    try:
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_workers=2, max_queue_depth=10)
+        events = []
+        lock = threading.Lock()
+
+        def job(name, seconds):
+            with lock:
+                events.append(("start", name))
+            time.sleep(seconds)
+            with lock:
+                events.append(("end", name))
+
+        session_a = [scheduler.submit(job, f"a{i}", 0.15, group="session:a") for i in range(3)]
+        time.sleep(0.05)
+        depth = scheduler.queue_depth()
+        other = scheduler.submit(job, "b", 0.0, group="session:b")
+        other.result(timeout=5)
+        b_done_while_a_waits = ("start", "a1") not in events
+        for future in session_a:
+            future.result(timeout=5)
+        scheduler.shutdown()
+
+        a_events = [event for event in events if event[1].startswith("a")]
+        sequential = a_events == [(step, f"a{i}") for i in range(3) for step in ("start", "end")]
+        if sequential and b_done_while_a_waits and depth == 2:
+            print("✅ نُفذت طلبات الجلسة بالترتيب ولم تحجز العامل الآخر")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {events} depth={depth}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المجموعات: {e}")
+        return False
+
+def main():
+    """Run all scheduler tests"""
+    print("🚀 بدء اختبارات مُجدول الطلبات...")
+
+    tests = [
+        ("ترتيب الأولويات", test_priority_order),
+        ("الضغط العكسي", test_backpressure),
+        ("الطلبات المستبدلة", test_superseded_requests),
+        ("حد التزامن", test_concurrency_limit),
+        ("طلبات الجلسة الواحدة", test_groups_run_one_at_a_time)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
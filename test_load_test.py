@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Load Generator
+اختبار مولد الحمل
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+def test_concurrent_users():
+    """Test that every simulated user completes its turns against the stub"""
+    print("👥 اختبار المستخدمين المتزامنين...")
+
+    try:
+        from load_test import LoadTestPipeline, run_load
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(token_rate=200, reply_tokens=10) as stub, \
+                LoadTestPipeline(stub.url, workers=3) as pipeline:
+            report = run_load(pipeline, users=3, turns=2, think_time=0, seed=1)
+            chats = stub.stats()["requests_by_path"].get("/api/chat", 0)
+            embeds = stub.stats()["requests_by_path"].get("/api/embed", 0)
+
+        if report["ok"] == 6 and not report["errors"] and report["throughput"] > 0 \
+                and chats == 6 and embeds >= 6 and report["latency"]["p95"] >= report["latency"]["p50"] > 0:
+            print(f"✅ 6 دورات بمعدل {report['throughput']:.1f} دورة/ثانية مع استرجاع لكل دورة")
+            return True
+        print(f"❌ تقرير غير متوقع: {report} (chat={chats}, embed={embeds})")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المستخدمين المتزامنين: {e}")
+        return False
+
+def test_queue_wait_and_rejections():
+    """Test that a saturated worker pool shows queue wait, then rejections"""
+    print("\n⏳ اختبار انتظار الطابور والرفض...")
+
+    try:
+        from load_test import LoadTestPipeline, run_load
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(latency=0.2, reply_tokens=5) as stub:
+            with LoadTestPipeline(stub.url, workers=1) as pipeline:
+                queued = run_load(pipeline, users=3, turns=1, think_time=0)
+            with LoadTestPipeline(stub.url, workers=1, max_queue_depth=1) as pipeline:
+                full = run_load(pipeline, users=4, turns=1, think_time=0)
+
+        if queued["ok"] != 3 or queued["queue_wait"]["max"] < 0.3:
+            print(f"❌ لم يظهر انتظار الطابور: {queued['queue_wait']}")
+            return False
+        print(f"✅ أقصى انتظار في الطابور {queued['queue_wait']['max']:.2f} ثانية مع عامل واحد")
+
+        if full["rejected"] >= 1 and full["ok"] >= 1:
+            print(f"✅ تم رفض {full['rejected']} دورات عند امتلاء الطابور")
+            return True
+        print(f"❌ لم يتم الرفض: {full}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الطابور: {e}")
+        return False
+
+def test_failures_and_sustainable_users():
+    """Test that injected failures are counted and excluded from the sustainable level"""
+    print("\n💥 اختبار الأعطال وحد التحمل...")
+
+    try:
+        from load_test import LoadTestPipeline, run_load, sustainable_users
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(reply_tokens=5) as stub, LoadTestPipeline(stub.url) as pipeline:
+            healthy = run_load(pipeline, users=1, turns=2, think_time=0)
+            stub.failure_rate = 1.0
+            failing = run_load(pipeline, users=2, turns=2, think_time=0)
+
+        if failing["errors"] != 4 or not failing["sample_errors"]:
+            print(f"❌ لم تُحسب الأعطال: {failing}")
+            return False
+        if sustainable_users([healthy, failing]) == 1 and sustainable_users([healthy], slo_seconds=0) == 0:
+            print("✅ تم عد الأعطال واستبعادها من حد التحمل")
+            return True
+        print("❌ حد التحمل غير صحيح")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الأعطال: {e}")
+        return False
+
+def test_command_line():
+    """Test a stub run from the command line with a JSON report"""
+    print("\n🖥️ اختبار سطر الأوامر...")
+
+    try:
+        import load_test
+
+        path = os.path.join(tempfile.mkdtemp(), "load.json")
+        code = load_test.main([
+            "--stub", "--users", "1,2", "--turns", "1", "--think-time", "0",
+            "--stub-token-rate", "0", "--seed", "3", "--json", path
+        ])
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if code == 0 and [report["users"] for report in data["reports"]] == [1, 2]:
+            print("✅ تم حفظ تقرير JSON لكل مستوى")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {code} {data}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار سطر الأوامر: {e}")
+        return False
+
+def main():
+    """Run all load generator tests"""
+    print("🚀 بدء اختبارات مولد الحمل...")
+
+    tests = [
+        ("المستخدمون المتزامنون", test_concurrent_users),
+        ("انتظار الطابور والرفض", test_queue_wait_and_rejections),
+        ("الأعطال وحد التحمل", test_failures_and_sustainable_users),
+        ("سطر الأوامر", test_command_line)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
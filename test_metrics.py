@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Operational Metrics
+اختبار مقاييس التشغيل
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+def test_metric_types():
+    """Test counters, gauges and histograms in the text format"""
+    print("🔢 اختبار أنواع المقاييس...")
+
+    try:
+        from metrics import Registry, Counter, Gauge, Histogram
+
+        registry = Registry()
+        turns = Counter("test_turns_total", "Turns", ["status"], registry)
+        size = Gauge("test_documents", "Documents", registry=registry)
+        latency = Histogram("test_latency_seconds", "Latency", ["model"], registry, buckets=(0.1, 1))
+
+        turns.labels("ok").inc()
+        turns.labels("ok").inc(2)
+        turns.labels("error").inc()
+        size.set_function(lambda: 42)
+        for value in (0.05, 0.5, 5):
+            latency.labels("mistral:7b").observe(value)
+
+        text = registry.render()
+        expected = [
+            '# TYPE test_turns_total counter',
+            'test_turns_total{status="ok"} 3',
+            'test_turns_total{status="error"} 1',
+            'test_documents 42',
+            'test_latency_seconds_bucket{model="mistral:7b",le="0.1"} 1',
+            'test_latency_seconds_bucket{model="mistral:7b",le="1"} 2',
+            'test_latency_seconds_bucket{model="mistral:7b",le="+Inf"} 3',
+            'test_latency_seconds_count{model="mistral:7b"} 3',
+        ]
+        missing = [line for line in expected if line not in text]
+        if missing:
+            print(f"❌ أسطر مفقودة: {missing}\n{text}")
+            return False
+        print("✅ صيغة Prometheus صحيحة")
+
+        try:
+            turns.inc()
+            print("❌ قُبل عداد بدون تسميات")
+            return False
+        except ValueError:
+            pass
+
+        size.set_function(lambda: 1 / 0)
+        if "\ntest_documents " in registry.render():
+            print("❌ تم عرض قيمة لمصدر غير متاح")
+            return False
+        print("✅ تم تجاهل مصدر غير متاح")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار أنواع المقاييس: {e}")
+        return False
+
+def test_exporters():
+    """Test the HTTP endpoint and the periodic file dump"""
+    print("\n🌐 اختبار نشر المقاييس...")
+
+    try:
+        import requests
+        import metrics
+
+        metrics.record_cache("test", True)
+        server = metrics.start_http_server(0)
+        try:
+            port = server.server_address[1]
+            response = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5)
+            if response.status_code != 200 or \
+                    'rona_cache_requests_total{cache="test",result="hit"}' not in response.text:
+                print(f"❌ استجابة غير متوقعة: {response.status_code}")
+                return False
+            print("✅ نقطة /metrics تعمل")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        path = os.path.join(tempfile.mkdtemp(), "metrics.prom")
+        dumper = metrics.MetricsFileDumper(path, interval=0.1).start()
+        time.sleep(0.3)
+        dumper.stop()
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if "rona_turns_total" in content:
+            print("✅ تم حفظ المقاييس في ملف")
+            return True
+        print("❌ ملف المقاييس فارغ")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار النشر: {e}")
+        return False
+
+def test_agent_callbacks():
+    """Test token, LLM latency and tool-call metrics from LangChain callbacks"""
+    print("\n🤖 اختبار مقاييس النموذج والأدوات...")
+
+    try:
+        import metrics
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        from langchain_core.tools import tool
+
+        @tool
+        def get_current_date() -> str:
+            """Return today's date"""
+            return "2024-01-01"
+
+        reply = AIMessage(content="hi", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+        llm = GenericFakeChatModel(messages=iter([reply]))
+        tokens_in = metrics.TOKENS.value("in")
+        tokens_out = metrics.TOKENS.value("out")
+        tools_before = metrics.TOOL_CALLS.value("get_current_date", "ok")
+
+        config = {"callbacks": [metrics.callback_handler()]}
+        llm.invoke("hello", config=config)
+        get_current_date.invoke({}, config=config)
+
+        if metrics.TOKENS.value("in") - tokens_in == 12 and metrics.TOKENS.value("out") - tokens_out == 3 \
+                and metrics.TOOL_CALLS.value("get_current_date", "ok") - tools_before == 1 \
+                and "rona_llm_latency_seconds_count" in metrics.REGISTRY.render():
+            print("✅ تم عد الرموز وزمن النموذج واستدعاءات الأدوات")
+            return True
+        print(f"❌ مقاييس غير متوقعة:\n{metrics.REGISTRY.render()}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار مقاييس النموذج: {e}")
+        return False
+
+def test_web_fetch_latency():
+    """Test that search requests are timed per engine"""
+    print("\n🔍 اختبار زمن طلبات البحث...")
+
+    try:
+        import metrics
+        from internet_search import InternetSearch
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer() as stub:
+            search = InternetSearch()
+            search.search_engines['bing'] = stub.url + "/search?q={}"
+            search.search_web("python", "bing")
+
+        if 'rona_web_fetch_seconds_count{engine="bing"} 1' in metrics.REGISTRY.render():
+            print("✅ تم قياس زمن الطلب لمحرك البحث")
+            return True
+        print("❌ لم يتم قياس زمن الطلب")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار زمن البحث: {e}")
+        return False
+
+def main():
+    """Run all metrics tests"""
+    print("🚀 بدء اختبارات مقاييس التشغيل...")
+
+    tests = [
+        ("أنواع المقاييس", test_metric_types),
+        ("نشر المقاييس", test_exporters),
+        ("مقاييس النموذج والأدوات", test_agent_callbacks),
+        ("زمن طلبات البحث", test_web_fetch_latency)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
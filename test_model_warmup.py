@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Model Warm-up
+اختبار تسخين النماذج وإبقائها في الذاكرة
+"""
+
+import sys
+import os
+import time
+
+def wait_until(condition, timeout=5.0):
+    """Poll a condition until it holds or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+def test_preload():
+    """Test that chat and embedding models are loaded once in parallel"""
+    print("🔥 اختبار تحميل النماذج مسبقاً...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from model_warmup import ModelWarmupManager
+
+        with OllamaStubServer(load_latency=0.3) as stub:
+            states = []
+            manager = ModelWarmupManager(
+                [("mistral:7b", "chat", stub.url), ("nomic-embed-text", "embeddings", stub.url)],
+                keep_alive=600,
+                on_status_change=lambda model, state: states.append((model, state))
+            )
+            if manager.state_of("chat") != "cold":
+                print("❌ النموذج ليس بارداً قبل التحميل")
+                return False
+
+            started = time.monotonic()
+            ok = manager.warm_all()
+            elapsed = time.monotonic() - started
+            if not ok or not manager.is_ready("chat") or not manager.is_ready("embeddings"):
+                print(f"❌ فشل التحميل: {manager.status()}")
+                return False
+            if elapsed > 0.55:
+                print(f"❌ لم يتم التحميل بالتوازي ({elapsed:.2f} ثانية)")
+                return False
+            print(f"✅ تم تحميل النموذجين بالتوازي في {elapsed:.2f} ثانية")
+
+            if set(stub.loaded_models()) != {"mistral:7b", "nomic-embed-text"}:
+                print(f"❌ النماذج غير محملة في الخادم: {stub.loaded_models()}")
+                return False
+            if ("mistral:7b", "warming") not in states or ("mistral:7b", "ready") not in states:
+                print(f"❌ لم يتم الإبلاغ عن تغير الحالة: {states}")
+                return False
+            print("✅ النماذج محملة والحالات مُبلّغ عنها")
+
+            manager.warm_all()
+            if stub.loads == 2:
+                print("✅ إعادة التسخين لا تعيد تحميل نموذج محمّل")
+                return True
+            print(f"❌ عدد مرات التحميل: {stub.loads}")
+            return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التحميل المسبق: {e}")
+        return False
+
+def test_refresh_before_expiry():
+    """Test that models are refreshed before their keep-alive runs out"""
+    print("\n♻️ اختبار التجديد قبل انتهاء المهلة...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from model_warmup import ModelWarmupManager
+
+        with OllamaStubServer() as stub:
+            manager = ModelWarmupManager([("mistral:7b", "chat", stub.url)], keep_alive=1, refresh_fraction=0.5)
+            manager.start()
+            try:
+                time.sleep(1.8)
+                refreshes = stub.requests_by_path.get("/api/generate", 0)
+                if "mistral:7b" in stub.loaded_models() and manager.is_ready("chat") and refreshes >= 3:
+                    print(f"✅ بقي النموذج محملاً بعد {refreshes} طلبات تجديد")
+                    return True
+                print(f"❌ النموذج لم يُجدد: {refreshes} طلبات، {manager.status()}")
+                return False
+            finally:
+                manager.stop()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التجديد: {e}")
+        return False
+
+def test_failure_and_retry():
+    """Test that a failed warm-up is reported and retried"""
+    print("\n🚑 اختبار فشل التسخين وإعادة المحاولة...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from model_warmup import ModelWarmupManager
+
+        with OllamaStubServer() as stub:
+            stub.fail = True
+            manager = ModelWarmupManager([("mistral:7b", "chat", stub.url)], keep_alive=600, retry_delay=0.2)
+            manager.start()
+            try:
+                if not wait_until(lambda: manager.state_of("chat") == "failed"):
+                    print("❌ لم يتم الإبلاغ عن الفشل")
+                    return False
+                print("✅ تم الإبلاغ عن فشل التسخين")
+
+                stub.fail = False
+                if wait_until(lambda: manager.is_ready("chat")):
+                    print("✅ نجحت إعادة المحاولة بعد عودة الخادم")
+                    return True
+                print("❌ لم تتم إعادة المحاولة")
+                return False
+            finally:
+                manager.stop()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار إعادة المحاولة: {e}")
+        return False
+
+def test_keep_alive_setting():
+    """Test parsing of the RONA_KEEP_ALIVE setting"""
+    print("\n⚙️ اختبار إعداد مدة البقاء في الذاكرة...")
+
+    try:
+        from model_warmup import configured_keep_alive, KEEP_ALIVE_ENV, DEFAULT_KEEP_ALIVE
+
+        saved = os.environ.get(KEEP_ALIVE_ENV)
+        try:
+            values = {}
+            for value in ("", "120", "10m", "1h", "bad"):
+                os.environ[KEEP_ALIVE_ENV] = value
+                values[value] = configured_keep_alive()
+        finally:
+            if saved is None:
+                os.environ.pop(KEEP_ALIVE_ENV, None)
+            else:
+                os.environ[KEEP_ALIVE_ENV] = saved
+
+        expected = {"": DEFAULT_KEEP_ALIVE, "120": 120, "10m": 600, "1h": 3600, "bad": DEFAULT_KEEP_ALIVE}
+        if values == expected:
+            print("✅ تم تحليل قيم مدة البقاء بشكل صحيح")
+            return True
+        print(f"❌ قيم غير متوقعة: {values}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الإعداد: {e}")
+        return False
+
+def test_warmup_uses_chat_options():
+    """Test that the chat model is warmed with the runner options the agent uses"""
+    print("\n🧩 اختبار تطابق إعدادات التسخين مع إعدادات المحادثة...")
+
+    try:
+        import hardware_tuner
+        from ollama_stub import OllamaStubServer
+        from model_warmup import ModelWarmupManager
+        from rona_v5_updated import get_agent_llm
+
+        with OllamaStubServer() as stub:
+            manager = ModelWarmupManager([("mistral:7b", "chat", stub.url)], keep_alive=600)
+            manager.warm_all()
+            warmed = stub.last_payload.get("options")
+            manager.warm_all()
+            refreshed = stub.last_payload.get("options")
+
+        llm = get_agent_llm("mistral:7b")
+        chat = {name: getattr(llm, name) for name in warmed or {}}
+        if warmed and warmed == refreshed == hardware_tuner.get_llm_options("mistral:7b") == chat:
+            print(f"✅ تم التسخين بنفس إعدادات المحادثة: {warmed}")
+            return True
+        print(f"❌ إعدادات مختلفة: {warmed} {refreshed} {chat}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار إعدادات التسخين: {e}")
+        return False
+
+def main():
+    """Run all warm-up tests"""
+    print("🚀 بدء اختبارات تسخين النماذج...")
+
+    tests = [
+        ("التحميل المسبق", test_preload),
+        ("التجديد قبل انتهاء المهلة", test_refresh_before_expiry),
+        ("الفشل وإعادة المحاولة", test_failure_and_retry),
+        ("إعداد مدة البقاء", test_keep_alive_setting),
+        ("إعدادات التسخين", test_warmup_uses_chat_options)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
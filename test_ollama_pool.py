@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Ollama Host Pool
+اختبار توزيع الطلبات على عدة خوادم Ollama
+"""
+
+import sys
+import threading
+
+def test_least_loaded_routing():
+    """Test that concurrent chat requests spread over all hosts"""
+    print("⚖️ اختبار توزيع الطلبات على الخوادم...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from ollama_pool import OllamaPool, PooledChatOllama
+
+        stubs = [OllamaStubServer(name=f"s{i}", latency=0.1).start() for i in range(3)]
+        try:
+            pool = OllamaPool([stub.url for stub in stubs])
+            llm = PooledChatOllama(pool=pool, model="mistral:7b")
+
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(llm.invoke("مرحباً").content))
+                       for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+
+            counts = [stub.requests_by_path.get("/api/chat", 0) for stub in stubs]
+            if len(results) == 6 and all(count == 2 for count in counts):
+                print(f"✅ تم توزيع الطلبات بالتساوي: {counts}")
+                return True
+            print(f"❌ توزيع غير متوقع: {counts} ({len(results)} ردود)")
+            return False
+        finally:
+            for stub in stubs:
+                stub.stop()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التوزيع: {e}")
+        return False
+
+def test_failover_and_ejection():
+    """Test retry on another host and ejection of a failing host"""
+    print("\n🚑 اختبار تجاوز الخادم المعطل...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from ollama_pool import OllamaPool, PooledChatOllama
+
+        healthy = OllamaStubServer(name="healthy", reply="تمام").start()
+        broken = OllamaStubServer(name="broken").start()
+        broken.fail = True
+        try:
+            pool = OllamaPool([broken.url, healthy.url], max_failures=2, eject_seconds=60)
+            llm = PooledChatOllama(pool=pool, model="mistral:7b")
+
+            replies = [llm.invoke("سؤال").content for _ in range(4)]
+            if any(reply != "تمام" for reply in replies):
+                print(f"❌ ردود غير متوقعة: {replies}")
+                return False
+            print("✅ تمت إعادة المحاولة على الخادم السليم")
+
+            status = {host["url"]: host for host in pool.status()}
+            broken_requests = broken.requests_by_path.get("/api/chat", 0)
+            if not status[broken.url]["healthy"] and broken_requests == 2:
+                print(f"✅ تم استبعاد الخادم المعطل بعد {broken_requests} أخطاء")
+            else:
+                print(f"❌ الخادم المعطل لم يُستبعد: {status[broken.url]}")
+                return False
+
+            broken.fail = False
+            pool.check_health()
+            if all(host["healthy"] for host in pool.status()):
+                print("✅ أعاد فحص الصحة الخادم بعد تعافيه")
+                return True
+            print("❌ الخادم لم يُعَد بعد تعافيه")
+            return False
+        finally:
+            healthy.stop()
+            broken.stop()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تجاوز الأعطال: {e}")
+        return False
+
+def test_dead_host():
+    """Test that an unreachable host is skipped and detected by health checks"""
+    print("\n🔌 اختبار خادم غير متصل...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from ollama_pool import OllamaPool, PooledOllamaEmbeddings
+
+        alive = OllamaStubServer(name="alive").start()
+        dead = OllamaStubServer(name="dead")
+        dead_url = dead.url
+        dead.httpd.server_close()
+        try:
+            pool = OllamaPool([dead_url, alive.url], health_check_timeout=0.5)
+            pool.check_health()
+            status = {host["url"]: host["healthy"] for host in pool.status()}
+            if status[dead_url] or not status[alive.url]:
+                print(f"❌ نتيجة فحص الصحة غير متوقعة: {status}")
+                return False
+            print("✅ فحص الصحة اكتشف الخادم غير المتصل")
+
+            embeddings = PooledOllamaEmbeddings(pool, "nomic-embed-text")
+            vector = embeddings.embed_query("Python")
+            vectors = embeddings.embed_documents(["a", "b"])
+            if len(vector) == 64 and len(vectors) == 2:
+                print("✅ تم توليد التضمينات من الخادم المتصل")
+                return True
+            print("❌ تضمينات غير متوقعة")
+            return False
+        finally:
+            alive.stop()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الخادم غير المتصل: {e}")
+        return False
+
+def test_separate_pools():
+    """Test that chat and embedding hosts are configured independently"""
+    print("\n🧭 اختبار فصل خوادم المحادثة والتضمين...")
+
+    try:
+        import os
+        from ollama_pool import configured_hosts, get_pool, CHAT_HOSTS_ENV, EMBED_HOSTS_ENV
+
+        saved = {name: os.environ.get(name) for name in (CHAT_HOSTS_ENV, EMBED_HOSTS_ENV)}
+        try:
+            os.environ[CHAT_HOSTS_ENV] = "gpu1:11434, gpu2:11434/"
+            os.environ.pop(EMBED_HOSTS_ENV, None)
+            if configured_hosts("embeddings") != ["http://gpu1:11434", "http://gpu2:11434"]:
+                print("❌ التضمين لا يستخدم خوادم المحادثة افتراضياً")
+                return False
+            print("✅ التضمين يستخدم خوادم المحادثة افتراضياً")
+
+            os.environ[EMBED_HOSTS_ENV] = "http://cpu1:11434"
+            chat_pool = get_pool(configured_hosts("chat"), start_health_checks=False)
+            embed_pool = get_pool(configured_hosts("embeddings"), start_health_checks=False)
+            if chat_pool is not embed_pool and embed_pool.urls == ["http://cpu1:11434"] \
+                    and get_pool(["http://gpu1:11434", "http://gpu2:11434"]) is chat_pool:
+                print("✅ لكل نوع مجموعة خوادم مستقلة")
+                return True
+            print("❌ مجموعات الخوادم غير مستقلة")
+            return False
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار فصل الخوادم: {e}")
+        return False
+
+def main():
+    """Run all pool tests"""
+    print("🚀 بدء اختبارات توزيع الطلبات على خوادم Ollama...")
+
+    tests = [
+        ("التوزيع على الخوادم", test_least_loaded_routing),
+        ("تجاوز الأعطال", test_failover_and_ejection),
+        ("الخادم غير المتصل", test_dead_host),
+        ("فصل الخوادم", test_separate_pools)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Ollama Stub Server
+اختبار خادم Ollama الوهمي
+"""
+
+import sys
+import time
+
+def test_token_rate():
+    """Test that replies stream at the configured token rate"""
+    print("⏱️ اختبار معدل الرموز...")
+
+    try:
+        from langchain_ollama import ChatOllama
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(token_rate=50, reply_tokens=20) as stub:
+            llm = ChatOllama(model="mistral:7b", base_url=stub.url)
+            started = time.time()
+            first_token = None
+            chunks = []
+            for chunk in llm.stream("مرحبا"):
+                if first_token is None:
+                    first_token = time.time() - started
+                chunks.append(chunk.content)
+            elapsed = time.time() - started
+            stats = stub.stats()
+
+        words = "".join(chunks).split()
+        # 20 tokens at 50/s take 0.4 s, and the first token arrives well before the last
+        if len(words) == 20 and 0.35 <= elapsed < 1.5 and first_token < elapsed / 2 \
+                and stats["tokens_generated"] == 20:
+            print(f"✅ 20 رمزاً في {elapsed:.2f} ثانية (أول رمز بعد {first_token:.2f})")
+            return True
+        print(f"❌ توقيت غير متوقع: {len(words)} رمزاً في {elapsed:.2f} ثانية، أول رمز {first_token}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار معدل الرموز: {e}")
+        return False
+
+def test_latency_distribution():
+    """Test latency specs and that a seed makes samples reproducible"""
+    print("\n📈 اختبار توزيع زمن الاستجابة...")
+
+    try:
+        import random
+        from ollama_stub import LatencyDistribution
+
+        lognormal = LatencyDistribution.parse("lognormal:0.2,0.5")
+        first = [lognormal.sample(random.Random(7)) for _ in range(3)]
+        rng_a, rng_b = random.Random(7), random.Random(7)
+        run_a = [lognormal.sample(rng_a) for _ in range(200)]
+        run_b = [lognormal.sample(rng_b) for _ in range(200)]
+        median = sorted(run_a)[100]
+
+        if run_a != run_b or len(set(first)) != 1 or not 0.15 < median < 0.27 or min(run_a) < 0:
+            print(f"❌ عينات غير متوقعة: median={median:.3f}")
+            return False
+        print(f"✅ عينات قابلة للتكرار (median={median:.3f})")
+
+        uniform = LatencyDistribution.parse("uniform:0.1,0.3")
+        if not all(0.1 <= uniform.sample(rng_a) <= 0.3 for _ in range(100)) \
+                or LatencyDistribution.parse(0.25).sample(rng_a) != 0.25:
+            print("❌ توزيع منتظم أو ثابت غير صحيح")
+            return False
+        try:
+            LatencyDistribution.parse("pareto:1")
+            print("❌ قُبل توزيع غير معروف")
+            return False
+        except ValueError:
+            pass
+        print("✅ التوزيعات المنتظمة والثابتة تعمل")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التوزيع: {e}")
+        return False
+
+def test_failure_injection():
+    """Test each failure mode and a seeded failure rate"""
+    print("\n💥 اختبار حقن الأعطال...")
+
+    try:
+        import requests
+        from ollama_stub import OllamaStubServer
+
+        body = {"model": "mistral:7b", "messages": [{"role": "user", "content": "hi"}], "stream": False}
+        outcomes = {}
+        for mode in ("error", "timeout", "disconnect", "malformed"):
+            with OllamaStubServer(failure_rate=1.0, failure_mode=mode, hang_seconds=2) as stub:
+                try:
+                    response = requests.post(stub.url + "/api/chat", json=body, timeout=0.5)
+                    if response.status_code != 200:
+                        outcomes[mode] = "error"
+                    else:
+                        response.json()
+                        outcomes[mode] = "ok"
+                except requests.exceptions.Timeout:
+                    outcomes[mode] = "timeout"
+                except requests.exceptions.ConnectionError:
+                    outcomes[mode] = "disconnect"
+                except ValueError:
+                    outcomes[mode] = "malformed"
+                # Health checks are never failed by the failure rate
+                if requests.get(stub.url + "/api/tags", timeout=5).status_code != 200:
+                    outcomes[mode] = "tags failed"
+
+        if outcomes != {mode: mode for mode in outcomes}:
+            print(f"❌ أعطال غير متوقعة: {outcomes}")
+            return False
+        print("✅ أنماط الأعطال الأربعة تعمل")
+
+        counts = []
+        for _ in range(2):
+            with OllamaStubServer(failure_rate=0.3, seed=42) as stub:
+                for _ in range(40):
+                    requests.post(stub.url + "/api/embed", json={"input": ["x"]}, timeout=5)
+                counts.append(stub.stats()["failures_injected"])
+        if counts[0] != counts[1] or not 4 <= counts[0] <= 22:
+            print(f"❌ معدل أعطال غير متوقع: {counts}")
+            return False
+        print(f"✅ معدل أعطال قابل للتكرار ({counts[0]}/40)")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار حقن الأعطال: {e}")
+        return False
+
+def test_deterministic_embeddings():
+    """Test that embeddings are stable, distinct and normalized"""
+    print("\n🧮 اختبار التضمينات الحتمية...")
+
+    try:
+        import math
+        from langchain_ollama import OllamaEmbeddings
+        from ollama_stub import OllamaStubServer
+
+        with OllamaStubServer(embedding_size=32) as first, OllamaStubServer(embedding_size=32) as second:
+            a = OllamaEmbeddings(model="nomic-embed-text", base_url=first.url)
+            b = OllamaEmbeddings(model="nomic-embed-text", base_url=second.url)
+            vectors = a.embed_documents(["رونا", "Python"])
+            again = b.embed_query("رونا")
+
+        norm = math.sqrt(sum(v * v for v in vectors[0]))
+        if len(vectors[0]) == 32 and vectors[0] == again and vectors[0] != vectors[1] and abs(norm - 1) < 1e-6:
+            print("✅ التضمينات ثابتة بين الخوادم ومُطبّعة")
+            return True
+        print("❌ التضمينات غير حتمية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التضمينات: {e}")
+        return False
+
+def main():
+    """Run all stub server tests"""
+    print("🚀 بدء اختبارات خادم Ollama الوهمي...")
+
+    tests = [
+        ("معدل الرموز", test_token_rate),
+        ("توزيع زمن الاستجابة", test_latency_distribution),
+        ("حقن الأعطال", test_failure_injection),
+        ("التضمينات الحتمية", test_deterministic_embeddings)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
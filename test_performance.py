@@ -52,220 +52,97 @@ def test_import_performance():
         print(f"❌ خطأ في اختبار الاستيراد: {e}")
         return False
 
+def run_offline_benchmarks(patterns, runs=5, warmup=1):
+    """Run part of the offline benchmark suite and print the timings"""
+    from benchmark_suite import run_suite, select_benchmarks, print_result
+
+    names = select_benchmarks(patterns)
+    document = run_suite(names, runs=runs, warmup=warmup, on_result=print_result)
+    failed = [name for name, result in document["results"].items() if "error" in result]
+    if failed:
+        print(f"❌ قياسات فشلت: {', '.join(failed)}")
+        return False
+    return True
+
 def test_ollama_performance():
-    """Test Ollama performance"""
-    print("\n🤖 اختبار أداء Ollama...")
+    """Test LLM and embedding performance against the Ollama stub"""
+    print("\n🤖 اختبار أداء Ollama (خادم وهمي)...")
     
     try:
-        from langchain_ollama import ChatOllama
-        
-        start_time = time.time()
-        start_memory = measure_memory_usage()
-        
-        # Initialize LLM
-        llm = ChatOllama(
-            model="mistral:7b",
-            temperature=0.1,
-            num_gpu_layers=0,  # Use CPU for testing
-            num_thread=4
-        )
-        
-        init_time = time.time() - start_time
-        init_memory = measure_memory_usage() - start_memory
-        
-        print(f"✅ وقت التهيئة: {init_time:.3f} ثانية")
-        print(f"✅ ذاكرة التهيئة: {init_memory:.2f} MB")
-        
-        # Test response time
-        test_queries = [
-            "Hello",
-            "What is 2+2?",
-            "Say hello in Arabic"
-        ]
-        
-        total_response_time = 0
-        successful_queries = 0
-        
-        for query in test_queries:
-            try:
-                query_start = time.time()
-                response = llm.invoke(query)
-                query_time = time.time() - query_start
-                
-                total_response_time += query_time
-                successful_queries += 1
-                
-                print(f"   '{query}': {query_time:.3f}s")
-                
-            except Exception as e:
-                print(f"   '{query}': فشل - {e}")
-        
-        if successful_queries > 0:
-            avg_response_time = total_response_time / successful_queries
-            print(f"✅ متوسط وقت الاستجابة: {avg_response_time:.3f} ثانية")
-            
-            if avg_response_time < 10.0:
-                print("✅ أداء Ollama مقبول")
-                return True
-            else:
-                print("⚠️ أداء Ollama بطيء")
-                return False
-        else:
-            print("❌ جميع الاستعلامات فشلت")
-            return False
+        if run_offline_benchmarks(["llm.*", "embeddings.*", "agent.turn"]):
+            print("✅ تم قياس أداء النموذج والتضمين")
+            return True
+        return False
             
     except Exception as e:
         print(f"❌ خطأ في اختبار أداء Ollama: {e}")
         return False
 
 def test_vector_database_performance():
-    """Test vector database performance"""
+    """Test vector database performance with stub embeddings"""
     print("\n📚 اختبار أداء قاعدة البيانات المتجهة...")
     
     try:
-        from langchain_ollama import OllamaEmbeddings
-        from langchain_chroma import Chroma
-        from langchain_core.documents import Document
-        import tempfile
-        import shutil
-        
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp()
-        
-        try:
-            start_time = time.time()
-            start_memory = measure_memory_usage()
-            
-            # Initialize embeddings and database
-            embeddings = OllamaEmbeddings(model="nomic-embed-text")
-            vector_db = Chroma(
-                persist_directory=temp_dir,
-                embedding_function=embeddings
-            )
-            
-            init_time = time.time() - start_time
-            init_memory = measure_memory_usage() - start_memory
-            
-            print(f"✅ وقت التهيئة: {init_time:.3f} ثانية")
-            print(f"✅ ذاكرة التهيئة: {init_memory:.2f} MB")
-            
-            # Test document addition
-            test_docs = [
-                Document(page_content=f"Test document {i}", metadata={"id": i})
-                for i in range(100)
-            ]
-            
-            add_start = time.time()
-            vector_db.add_documents(test_docs)
-            add_time = time.time() - add_start
-            
-            print(f"✅ إضافة 100 وثيقة: {add_time:.3f} ثانية")
-            
-            # Test search performance
-            search_queries = ["test", "document", "content"]
-            total_search_time = 0
-            successful_searches = 0
-            
-            for query in search_queries:
-                try:
-                    search_start = time.time()
-                    results = vector_db.similarity_search(query, k=5)
-                    search_time = time.time() - search_start
-                    
-                    total_search_time += search_time
-                    successful_searches += 1
-                    
-                    print(f"   البحث عن '{query}': {search_time:.3f}s ({len(results)} نتائج)")
-                    
-                except Exception as e:
-                    print(f"   البحث عن '{query}': فشل - {e}")
-            
-            if successful_searches > 0:
-                avg_search_time = total_search_time / successful_searches
-                print(f"✅ متوسط وقت البحث: {avg_search_time:.3f} ثانية")
-                
-                if avg_search_time < 2.0:
-                    print("✅ أداء قاعدة البيانات مقبول")
-                    return True
-                else:
-                    print("⚠️ أداء قاعدة البيانات بطيء")
-                    return False
-            else:
-                print("❌ جميع عمليات البحث فشلت")
-                return False
-                
-        finally:
-            # Clean up
-            shutil.rmtree(temp_dir)
+        if run_offline_benchmarks(["vector_db.*", "text_splitter.*"]):
+            print("✅ تم قياس أداء قاعدة البيانات")
+            return True
+        return False
             
     except Exception as e:
         print(f"❌ خطأ في اختبار أداء قاعدة البيانات: {e}")
         return False
 
 def test_internet_search_performance():
-    """Test internet search performance"""
-    print("\n🌐 اختبار أداء البحث في الإنترنت...")
+    """Test search parsing performance on recorded result pages"""
+    print("\n🌐 اختبار أداء البحث في الإنترنت (صفحات مسجلة)...")
     
     try:
+        from bs4 import BeautifulSoup
         from internet_search import InternetSearch
+        from benchmark_suite import load_fixture
         
-        start_time = time.time()
-        start_memory = measure_memory_usage()
-        
-        # Initialize search
+        # The recorded pages must still parse, otherwise the timings are meaningless
         search = InternetSearch()
+        for engine in ['google', 'bing', 'duckduckgo']:
+            soup = BeautifulSoup(load_fixture(f"{engine}.html"), 'html.parser')
+            results = getattr(search, f"_parse_{engine}_results")(soup)
+            if len(results) != search.max_results:
+                print(f"❌ {engine}: {len(results)} نتائج من الصفحة المسجلة")
+                return False
         
-        init_time = time.time() - start_time
-        init_memory = measure_memory_usage() - start_memory
-        
-        print(f"✅ وقت التهيئة: {init_time:.3f} ثانية")
-        print(f"✅ ذاكرة التهيئة: {init_memory:.2f} MB")
+        if run_offline_benchmarks(["parse.*", "web.*"]):
+            print("✅ تم قياس أداء البحث في الإنترنت")
+            return True
+        return False
+            
+    except Exception as e:
+        print(f"❌ خطأ في اختبار أداء البحث في الإنترنت: {e}")
+        return False
+
+def test_regression_detection():
+    """Test that comparing two benchmark runs flags regressions"""
+    print("\n📉 اختبار كشف التراجع في الأداء...")
+    
+    try:
+        from benchmark_suite import compare_runs
         
-        # Test search performance
-        test_queries = [
-            "Python programming",
-            "machine learning",
-            "artificial intelligence"
-        ]
+        def run(**medians):
+            return {"meta": {}, "results": {name: {"median_ms": value, "stdev_ms": 0.2}
+                                             for name, value in medians.items()}}
         
-        search_engines = ['google', 'bing', 'duckduckgo']
-        total_search_time = 0
-        successful_searches = 0
+        baseline = run(slow=10.0, fast=10.0, tiny=0.2, same=5.0)
+        current = run(slow=20.0, fast=5.0, tiny=0.4, same=5.3)
+        regressions, improvements = compare_runs(baseline, current, tolerance=0.25)
         
-        for engine in search_engines:
-            for query in test_queries:
-                try:
-                    search_start = time.time()
-                    results = search.search_web(query, engine)
-                    search_time = time.time() - search_start
-                    
-                    total_search_time += search_time
-                    successful_searches += 1
-                    
-                    print(f"   {engine}: '{query}' - {search_time:.3f}s ({len(results)} نتائج)")
-                    
-                    # Add delay to avoid rate limiting
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    print(f"   {engine}: '{query}' - فشل: {e}")
+        if [change.split(":")[0] for change in regressions] == ["slow"] and \
+                [change.split(":")[0] for change in improvements] == ["fast"]:
+            print("✅ تم كشف التراجع وتجاهل التغييرات الصغيرة")
+            return True
+        print(f"❌ نتيجة مقارنة غير متوقعة: {regressions} {improvements}")
+        return False
         
-        if successful_searches > 0:
-            avg_search_time = total_search_time / successful_searches
-            print(f"✅ متوسط وقت البحث: {avg_search_time:.3f} ثانية")
-            
-            if avg_search_time < 5.0:
-                print("✅ أداء البحث في الإنترنت مقبول")
-                return True
-            else:
-                print("⚠️ أداء البحث في الإنترنت بطيء")
-                return False
-        else:
-            print("❌ جميع عمليات البحث فشلت")
-            return False
-            
     except Exception as e:
-        print(f"❌ خطأ في اختبار أداء البحث في الإنترنت: {e}")
+        print(f"❌ خطأ في اختبار كشف التراجع: {e}")
         return False
 
 def test_gui_performance():
@@ -402,6 +279,7 @@ def main():
         ("أداء Ollama", test_ollama_performance),
         ("أداء قاعدة البيانات", test_vector_database_performance),
         ("أداء البحث في الإنترنت", test_internet_search_performance),
+        ("كشف التراجع في الأداء", test_regression_detection),
         ("أداء واجهة المستخدم", test_gui_performance),
         ("اختبار تسرب الذاكرة", test_memory_leaks)
     ]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Preflight Checks
+اختبار فحوصات ما قبل التشغيل
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+def test_dependency_check():
+    """Test that installed and missing packages are detected without importing them"""
+    print("📦 اختبار فحص المكتبات...")
+
+    try:
+        from preflight import check_dependencies
+
+        result = check_dependencies({"json": "json", "rona_missing_package": "rona-missing"})
+        if result.ok or result.details.get("missing") != ["rona-missing"]:
+            print(f"❌ نتيجة غير متوقعة: {result.message}")
+            return False
+        print("✅ تم اكتشاف المكتبة المفقودة")
+
+        before = set(sys.modules)
+        result = check_dependencies({"this": "this"})
+        if result.ok and "this" not in set(sys.modules) - before:
+            print("✅ تم الفحص بدون استيراد المكتبة")
+            return True
+        print("❌ الفحص استورد المكتبة")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار فحص المكتبات: {e}")
+        return False
+
+def test_ollama_probe():
+    """Test the HTTP probe, model detection and backoff polling"""
+    print("\n🤖 اختبار فحص Ollama عبر HTTP...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from preflight import check_ollama, wait_for_ollama
+
+        with OllamaStubServer(models=["mistral:7b", "nomic-embed-text:latest"]) as stub:
+            result = check_ollama(stub.url)
+            if not result.ok:
+                print(f"❌ فشل الفحص: {result.message}")
+                return False
+            print("✅ Ollama يعمل والنماذج متاحة")
+
+            result = check_ollama(stub.url, models=["llama3"])
+            if result.ok or result.details.get("missing_models") != ["llama3"]:
+                print("❌ لم يتم اكتشاف النموذج المفقود")
+                return False
+            print("✅ تم اكتشاف النموذج المفقود")
+
+        # An install set up before the embedding model was required still starts
+        with OllamaStubServer(models=["mistral:7b"]) as stub:
+            result = check_ollama(stub.url)
+            if not result.ok or result.details.get("missing_recommended") != ["nomic-embed-text"]:
+                print(f"❌ نموذج التضمين المفقود يجب أن يكون تحذيراً فقط: {result.message}")
+                return False
+            print("✅ نموذج التضمين المفقود يظهر كتحذير دون إيقاف التشغيل")
+
+        with OllamaStubServer(models=["mistral:7b", "nomic-embed-text:latest"]) as stub:
+
+            # The server comes up while we are polling
+            stub.fail = True
+            threading.Timer(0.3, setattr, (stub, "fail", False)).start()
+            started = time.monotonic()
+            models = wait_for_ollama(stub.url, max_wait=5)
+            waited = time.monotonic() - started
+            if models is None or waited > 2:
+                print(f"❌ الانتظار لم ينجح ({waited:.2f} ثانية)")
+                return False
+            print(f"✅ تم اكتشاف Ollama بعد {waited:.2f} ثانية من الانتظار التدريجي")
+
+            stub.fail = True
+            started = time.monotonic()
+            models = wait_for_ollama(stub.url, max_wait=0.5)
+            waited = time.monotonic() - started
+            if models is None and waited < 1.5:
+                print("✅ توقف الانتظار عند انتهاء المهلة")
+                return True
+            print(f"❌ نتيجة انتظار غير متوقعة: {models} بعد {waited:.2f} ثانية")
+            return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار فحص Ollama: {e}")
+        return False
+
+def test_parallel_checks_and_cache():
+    """Test that hosts are checked in parallel and successes are cached"""
+    print("\n⚡ اختبار الفحص المتوازي والتخزين المؤقت...")
+
+    try:
+        from ollama_stub import OllamaStubServer
+        from preflight import run_preflight
+
+        cache_file = os.path.join(tempfile.mkdtemp(), "preflight.json")
+        modules = {"json": "json"}
+        with OllamaStubServer(latency=0.4) as first, OllamaStubServer(latency=0.4) as second:
+            urls = [first.url, second.url]
+            report = run_preflight(urls, modules=modules, cache_file=cache_file)
+            if not report.ok or report.duration > 0.75:
+                print(f"❌ الفحص لم يكن متوازياً ({report.duration:.2f} ثانية)")
+                return False
+            print(f"✅ تم فحص خادمين في {report.duration:.2f} ثانية")
+
+            report = run_preflight(urls, modules=modules, cache_file=cache_file)
+            if not report.cached or first.request_count != 1:
+                print("❌ لم تُستخدم النتيجة المخزنة")
+                return False
+            print("✅ تم استخدام النتيجة المخزنة دون فحص جديد")
+
+            report = run_preflight(urls, modules=modules, cache_file=cache_file, ttl=0)
+            if report.cached:
+                print("❌ تم استخدام نتيجة منتهية الصلاحية")
+                return False
+
+            first.fail = True
+            os.remove(cache_file)
+            report = run_preflight(urls, modules=modules, cache_file=cache_file)
+            if not report.ok and not os.path.exists(cache_file):
+                print("✅ لا يتم تخزين نتيجة الفحص الفاشل")
+                return True
+            print("❌ تم تخزين نتيجة فاشلة")
+            return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الفحص المتوازي: {e}")
+        return False
+
+def test_hosts_checked_for_their_models():
+    """Test that chat hosts are checked for the chat model and embedding hosts for the embedding model"""
+    print("\n🔀 اختبار فحص كل خادم بنماذجه...")
+
+    saved_env = {name: os.environ.get(name) for name in ("RONA_OLLAMA_HOSTS", "RONA_OLLAMA_EMBED_HOSTS")}
+    try:
+        from ollama_stub import OllamaStubServer
+        from preflight import run_preflight
+
+        with OllamaStubServer(models=["mistral:7b"]) as chat, \
+                OllamaStubServer(models=["nomic-embed-text"]) as embeddings:
+            os.environ["RONA_OLLAMA_HOSTS"] = chat.url
+            os.environ["RONA_OLLAMA_EMBED_HOSTS"] = embeddings.url
+            report = run_preflight(modules={"json": "json"}, use_cache=False)
+            checked = {result.name for result in report.results}
+            if not report.ok or report.warnings() or embeddings.request_count != 1 \
+                    or checked != {"dependencies", f"ollama:{chat.url}", f"ollama:{embeddings.url}"}:
+                print(f"❌ نتيجة غير متوقعة: {report.ok} {[r.message for r in report.results]}")
+                return False
+            print("✅ تم فحص خادم المحادثة وخادم التضمين كل بنموذجه")
+
+            os.environ["RONA_OLLAMA_EMBED_HOSTS"] = chat.url
+            report = run_preflight(modules={"json": "json"}, use_cache=False)
+            if report.ok and len(report.results) == 2 and report.warnings():
+                print("✅ خادم مشترك يُفحص مرة واحدة لكل النماذج")
+                return True
+            print(f"❌ نتيجة غير متوقعة: {[r.message for r in report.results]}")
+            return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار فحص الخوادم: {e}")
+        return False
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def main():
+    """Run all preflight tests"""
+    print("🚀 بدء اختبارات فحوصات ما قبل التشغيل...")
+
+    tests = [
+        ("فحص المكتبات", test_dependency_check),
+        ("فحص Ollama", test_ollama_probe),
+        ("الفحص المتوازي والتخزين المؤقت", test_parallel_checks_and_cache),
+        ("فحص كل خادم بنماذجه", test_hosts_checked_for_their_models)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Headless HTTP Server
+اختبار خادم HTTP بدون واجهة رسومية
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import contextlib
+import urllib.request
+import urllib.error
+
+class FakeService:
+    """Stands in for RonaService without needing Ollama"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.documents = []
+        self.lock = threading.Lock()
+
+    def health(self):
+        return {"status": "ok", "model": "fake", "scheduler": {"queue_depth": 0}}
+
+    def list_sessions(self, user_id=None):
+        return [{"session_id": sid, "user_id": uid} for sid, uid in self.sessions.items()
+                if user_id is None or uid == user_id]
+
+    def create_session(self, title=None, user_id=None):
+        with self.lock:
+            session_id = f"s{len(self.sessions) + 1}"
+            self.sessions[session_id] = user_id
+        return session_id
+
+    def get_session(self, session_id):
+        if session_id not in self.sessions:
+            raise KeyError(session_id)
+        return session_id
+
+    def get_messages(self, session_id, limit=None, before_id=None):
+        self.get_session(session_id)
+        return [{"id": 1, "role": "user", "content": "مرحباً"}]
+
+    def chat(self, session_id, message, callbacks=None):
+        from llm_scheduler import SchedulerFullError
+
+        self.get_session(session_id)
+        if message == "busy":
+            raise SchedulerFullError("LLM queue is full")
+        return f"رد على: {message}"
+
+    def stream_chat(self, session_id, message):
+        for token in ["رد ", "على: ", message]:
+            yield "token", {"token": token}
+        yield "done", {"output": f"رد على: {message}"}
+
+    def ingest(self, text, source="api"):
+        self.documents.append((text, source))
+        return 1
+
+    def search(self, query, k=4):
+        from llm_scheduler import SchedulerFullError
+
+        if query == "busy":
+            raise SchedulerFullError("LLM queue is full")
+        return [{"content": text, "metadata": {"source": source}} for text, source in self.documents[:k]]
+
+    def web_search(self, query, engine="google"):
+        return [{"title": query, "url": "https://example.com", "snippet": engine}]
+
+def start_test_server():
+    """Start the HTTP server on a free port with a fake service"""
+    from rona_server import create_server
+
+    server = create_server(FakeService(), "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def request_json(url, payload=None, headers=None):
+    """Send a request and return (status, decoded JSON body)"""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers=headers or {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode("utf-8"))
+
+@contextlib.contextmanager
+def real_service(scheduler):
+    """A RonaService on the Ollama stub, with its databases in a temporary directory"""
+    import rona_v5_updated
+    from ollama_stub import OllamaStubServer
+    from rona_server import RonaService
+    from session_store import SessionStore
+
+    previous_db_dir = rona_v5_updated.VECTOR_DB_DIR
+    previous_host = os.environ.get("OLLAMA_HOST")
+    temp_dir = tempfile.mkdtemp(prefix="rona_server_test_")
+    with OllamaStubServer() as stub:
+        rona_v5_updated.VECTOR_DB_DIR = os.path.join(temp_dir, "chroma_db")
+        os.environ["OLLAMA_HOST"] = stub.url
+        try:
+            yield RonaService(SessionStore(os.path.join(temp_dir, "sessions.db")), scheduler=scheduler)
+        finally:
+            rona_v5_updated.VECTOR_DB_DIR = previous_db_dir
+            if previous_host is None:
+                os.environ.pop("OLLAMA_HOST", None)
+            else:
+                os.environ["OLLAMA_HOST"] = previous_host
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_sessions_and_chat():
+    """Test session creation and blocking chat"""
+    print("💬 اختبار الجلسات والمحادثة عبر HTTP...")
+
+    try:
+        server, base_url = start_test_server()
+        try:
+            status, body = request_json(f"{base_url}/health")
+            if status != 200 or body.get("status") != "ok":
+                print(f"❌ فحص الصحة فشل: {status}")
+                return False
+            print("✅ نقطة فحص الصحة تعمل")
+
+            status, body = request_json(f"{base_url}/sessions", {"user_id": "u1"})
+            session_id = body.get("session_id")
+            if status != 201 or not session_id:
+                print("❌ فشل إنشاء الجلسة")
+                return False
+            print(f"✅ تم إنشاء الجلسة: {session_id}")
+
+            status, body = request_json(f"{base_url}/chat", {"session_id": session_id, "message": "مرحباً"})
+            if status == 200 and body.get("output") == "رد على: مرحباً":
+                print("✅ تم استلام الرد")
+            else:
+                print(f"❌ رد غير متوقع: {status} {body}")
+                return False
+
+            status, body = request_json(f"{base_url}/chat", {"session_id": "missing", "message": "hi"})
+            if status == 404:
+                print("✅ الجلسة غير الموجودة تعيد 404")
+            else:
+                print(f"❌ حالة غير متوقعة للجلسة المفقودة: {status}")
+                return False
+
+            status, body = request_json(f"{base_url}/chat", {"session_id": session_id})
+            if status == 400:
+                print("✅ الرسالة الفارغة تعيد 400")
+            else:
+                print(f"❌ حالة غير متوقعة للرسالة الفارغة: {status}")
+                return False
+
+            status, body = request_json(f"{base_url}/chat", {"session_id": session_id, "message": "busy"})
+            if status == 503:
+                print("✅ الطابور الممتلئ يعيد 503")
+                return True
+            print(f"❌ حالة غير متوقعة عند امتلاء الطابور: {status}")
+            return False
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المحادثة: {e}")
+        return False
+
+def test_streaming_chat():
+    """Test Server-Sent Events streaming"""
+    print("\n📡 اختبار البث المباشر للردود (SSE)...")
+
+    try:
+        server, base_url = start_test_server()
+        try:
+            _, body = request_json(f"{base_url}/sessions", {})
+            request = urllib.request.Request(
+                f"{base_url}/chat",
+                data=json.dumps({"session_id": body["session_id"], "message": "Python"}).encode("utf-8"),
+                headers={"Content-Type": "application/json", "Accept": "text/event-stream"}
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                content_type = response.headers.get("Content-Type", "")
+                raw = response.read().decode("utf-8")
+
+            events = []
+            for block in raw.strip().split("\n\n"):
+                lines = dict(line.split(": ", 1) for line in block.split("\n"))
+                events.append((lines["event"], json.loads(lines["data"])))
+
+            names = [name for name, _ in events]
+            tokens = "".join(data["token"] for name, data in events if name == "token")
+            if content_type.startswith("text/event-stream") and names[0] == "session" \
+                    and names[-1] == "done" and tokens == "رد على: Python":
+                print(f"✅ تم استلام {len(events)} حدث بالترتيب الصحيح")
+                return True
+            print(f"❌ أحداث غير متوقعة: {names}")
+            return False
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار البث: {e}")
+        return False
+
+def test_ingest_and_search():
+    """Test document ingestion and local/web search endpoints"""
+    print("\n📚 اختبار الإضافة والبحث عبر HTTP...")
+
+    try:
+        server, base_url = start_test_server()
+        try:
+            status, body = request_json(f"{base_url}/ingest", {"text": "Python لغة برمجة", "source": "test"})
+            if status != 200 or body.get("chunks") != 1:
+                print(f"❌ فشل إضافة النص: {status}")
+                return False
+            print("✅ تمت إضافة النص")
+
+            status, body = request_json(f"{base_url}/search?q=Python")
+            if status == 200 and body["results"][0]["metadata"]["source"] == "test":
+                print("✅ البحث المحلي يعمل")
+            else:
+                print(f"❌ نتيجة بحث محلي غير متوقعة: {body}")
+                return False
+
+            status, body = request_json(f"{base_url}/search?q=Python&source=web&engine=bing")
+            if status == 200 and body["results"][0]["snippet"] == "bing":
+                print("✅ البحث في الإنترنت يعمل")
+            else:
+                print(f"❌ نتيجة بحث ويب غير متوقعة: {body}")
+                return False
+
+            status, _ = request_json(f"{base_url}/search?q=busy")
+            if status == 503:
+                print("✅ البحث المحلي عند امتلاء الطابور يعيد 503")
+            else:
+                print(f"❌ حالة غير متوقعة عند امتلاء الطابور: {status}")
+                return False
+
+            status, _ = request_json(f"{base_url}/search")
+            if status == 400:
+                print("✅ البحث بدون استعلام يعيد 400")
+                return True
+            print(f"❌ حالة غير متوقعة: {status}")
+            return False
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الإضافة والبحث: {e}")
+        return False
+
+def test_queued_session_not_unloaded():
+    """Test that a session with a queued turn is not unloaded to make room for others"""
+    print("\n🗂️ اختبار عدم إلغاء تحميل جلسة لها رسالة في الانتظار...")
+
+    try:
+        import rona_server
+        from llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_workers=1)
+        worker_busy = threading.Event()
+        saved_limit = rona_server.MAX_ACTIVE_SESSIONS
+        rona_server.MAX_ACTIVE_SESSIONS = 1
+        try:
+            with real_service(scheduler) as service:
+                # Keep the only worker busy so the turn stays queued
+                scheduler.submit(worker_busy.wait, 10)
+                first, second, third = (service.create_session(user_id=name) for name in ("a", "b", "c"))
+                queued_state = service.get_session(first)
+                future = service.submit_turn(first, "مرحباً", key="queued")
+                service.get_session(second)
+                service.get_session(third)
+                kept = first in service._sessions and service.get_session(first) is queued_state
+
+                scheduler.cancel("queued")
+                worker_busy.set()
+                service.get_session(second)
+                released = future.cancelled() and first not in service._sessions
+        finally:
+            rona_server.MAX_ACTIVE_SESSIONS = saved_limit
+            worker_busy.set()
+            scheduler.shutdown()
+
+        if kept and released:
+            print("✅ بقيت الجلسة محملة حتى انتهت رسالتها ثم أمكن إلغاء تحميلها")
+            return True
+        print(f"❌ نتيجة غير متوقعة: kept={kept} released={released}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار إلغاء تحميل الجلسات: {e}")
+        return False
+
+def main():
+    """Run all server tests"""
+    print("🚀 بدء اختبارات خادم HTTP...")
+
+    tests = [
+        ("الجلسات والمحادثة", test_sessions_and_chat),
+        ("البث المباشر", test_streaming_chat),
+        ("الإضافة والبحث", test_ingest_and_search),
+        ("الجلسات المنتظرة", test_queued_session_not_unloaded)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Parallel Test Runner
+اختبار مشغل الاختبارات المتوازي
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# Writes a state file in its working directory; fails if another script's file is there
+STATE_SCRIPT = """
+import os, sys, time
+name = os.path.basename(__file__)
+if os.path.exists("conversation_history.json"):
+    print("collision")
+    sys.exit(1)
+with open("conversation_history.json", "w") as f:
+    f.write(name)
+time.sleep(0.5)
+print("done", name)
+"""
+
+def make_scripts(count):
+    """Create small test scripts in a temporary directory"""
+    directory = tempfile.mkdtemp()
+    for i in range(count):
+        with open(os.path.join(directory, f"test_state_{i}.py"), "w", encoding="utf-8") as f:
+            f.write(STATE_SCRIPT)
+    with open(os.path.join(directory, "test_fails.py"), "w", encoding="utf-8") as f:
+        f.write("import sys\nprint('failing')\nsys.exit(3)\n")
+    with open(os.path.join(directory, "test_hangs.py"), "w", encoding="utf-8") as f:
+        f.write("import time\ntime.sleep(30)\n")
+    return directory
+
+def test_parallel_isolated_runs():
+    """Test that scripts run in parallel, each in its own working directory"""
+    print("⚡ اختبار التشغيل المتوازي المعزول...")
+
+    try:
+        import run_all_tests
+
+        saved = run_all_tests.REPO_DIR, run_all_tests.TIMINGS_FILE
+        run_all_tests.REPO_DIR = make_scripts(4)
+        run_all_tests.TIMINGS_FILE = os.path.join(run_all_tests.REPO_DIR, "timings.json")
+        try:
+            tests = [(f"test_state_{i}.py", f"state {i}") for i in range(4)]
+            started = time.time()
+            results = run_all_tests.run_scripts(tests, jobs=4)
+            elapsed = time.time() - started
+        finally:
+            run_all_tests.REPO_DIR, run_all_tests.TIMINGS_FILE = saved
+
+        if not all(result["success"] for result in results):
+            print(f"❌ تعارض بين ملفات الحالة: {results}")
+            return False
+        if [result["script"] for result in results] != [test[0] for test in tests]:
+            print("❌ ترتيب النتائج لا يطابق ترتيب الاختبارات")
+            return False
+        if elapsed > 1.8:
+            print(f"❌ لم يتم التشغيل بالتوازي ({elapsed:.1f} ثانية)")
+            return False
+        print(f"✅ 4 اختبارات معزولة في {elapsed:.1f} ثانية")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التشغيل المتوازي: {e}")
+        return False
+
+def test_failures_and_timeouts():
+    """Test that failing, hanging and missing scripts are reported"""
+    print("\n⏰ اختبار الفشل وانتهاء المهلة...")
+
+    try:
+        import run_all_tests
+
+        saved = run_all_tests.REPO_DIR, run_all_tests.TIMINGS_FILE
+        run_all_tests.REPO_DIR = make_scripts(0)
+        run_all_tests.TIMINGS_FILE = os.path.join(run_all_tests.REPO_DIR, "timings.json")
+        try:
+            results = run_all_tests.run_scripts(
+                [("test_fails.py", "fails"), ("test_hangs.py", "hangs"), ("test_missing.py", "missing")],
+                jobs=3, timeout=1
+            )
+        finally:
+            run_all_tests.REPO_DIR, run_all_tests.TIMINGS_FILE = saved
+
+        fails, hangs, missing = results
+        if not any(result["success"] for result in results) and fails["returncode"] == 3 \
+                and hangs["duration"] < 5:
+            print("✅ تم الإبلاغ عن الفشل وانتهاء المهلة والملف المفقود")
+            return True
+        print(f"❌ نتائج غير متوقعة: {results}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الفشل: {e}")
+        return False
+
+def test_critical_path():
+    """Test the critical path of a schedule"""
+    print("\n🛤️ اختبار المسار الحرج...")
+
+    try:
+        from run_all_tests import critical_path, print_timing_report
+
+        results = [
+            {"script": "a.py", "worker": "worker_0", "start": 0.0, "duration": 5.0},
+            {"script": "b.py", "worker": "worker_1", "start": 0.0, "duration": 2.0},
+            {"script": "c.py", "worker": "worker_1", "start": 2.0, "duration": 4.0},
+            {"script": "d.py", "worker": "worker_0", "start": 5.0, "duration": 0.5},
+        ]
+        path = [result["script"] for result in critical_path(results)]
+        print_timing_report(results)
+        if path == ["b.py", "c.py"]:
+            print("✅ تم تحديد المسار الحرج")
+            return True
+        print(f"❌ مسار غير متوقع: {path}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار المسار الحرج: {e}")
+        return False
+
+def main():
+    """Run all test runner tests"""
+    print("🚀 بدء اختبارات مشغل الاختبارات...")
+
+    tests = [
+        ("التشغيل المتوازي المعزول", test_parallel_isolated_runs),
+        ("الفشل وانتهاء المهلة", test_failures_and_timeouts),
+        ("المسار الحرج", test_critical_path)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Session-scoped Conversation Store
+اختبار تخزين المحادثات حسب الجلسة
+"""
+
+import sys
+import os
+import json
+import tempfile
+import shutil
+
+def test_sessions_and_messages():
+    """Test creating, listing and paging sessions"""
+    print("🗂️ اختبار الجلسات والرسائل...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        from session_store import SessionStore
+
+        store = SessionStore(os.path.join(temp_dir, "sessions.db"))
+        first = store.create_session(title="الأولى", user_id="user-a")
+        second = store.create_session(title="الثانية", user_id="user-b")
+
+        for i in range(5):
+            store.append_message(first, "user", f"رسالة {i}", f"2024-01-01T00:00:0{i}")
+        store.append_message(second, "user", "مرحباً", "2024-01-02T00:00:00")
+
+        sessions = store.list_sessions()
+        if [s["session_id"] for s in sessions] != [second, first]:
+            print("❌ ترتيب الجلسات غير صحيح")
+            return False
+        print(f"✅ تم سرد {len(sessions)} جلسة بالترتيب الصحيح")
+
+        if [s["session_id"] for s in store.list_sessions(user_id="user-a")] != [first]:
+            print("❌ فشل تصفية الجلسات حسب المستخدم")
+            return False
+        print("✅ تمت تصفية الجلسات حسب المستخدم")
+
+        latest = store.get_messages(first, limit=2)
+        older = store.get_messages(first, limit=2, before_id=latest[0]["id"])
+        newer = store.get_messages(first, limit=2, after_id=older[0]["id"])
+        if [m["content"] for m in latest] == ["رسالة 3", "رسالة 4"] and \
+                [m["content"] for m in older] == ["رسالة 1", "رسالة 2"] and \
+                [m["content"] for m in newer] == ["رسالة 2", "رسالة 3"]:
+            print("✅ تم تحميل الرسائل على صفحات")
+        else:
+            print("❌ ترتيب الرسائل المحملة غير صحيح")
+            return False
+
+        store.clear_messages(first)
+        if store.count_messages(first) == 0 and store.count_messages(second) == 1:
+            print("✅ مسح جلسة واحدة لا يؤثر على غيرها")
+        else:
+            print("❌ المسح أثر على جلسة أخرى")
+            return False
+
+        store.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الجلسات: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_indexed_session_lookup():
+    """Test that session lookups use an index instead of scanning all messages"""
+    print("\n⚡ اختبار استخدام الفهارس...")
+
+    try:
+        from session_store import SessionStore
+
+        store = SessionStore(":memory:")
+        plan = store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id, role, content, timestamp FROM messages "
+            "WHERE session_id = ? ORDER BY id DESC LIMIT ?", ("x", 10)
+        ).fetchall()
+        details = " ".join(str(row[-1]) for row in plan)
+        store.close()
+
+        if "idx_messages_session_id" in details:
+            print("✅ تحميل الجلسة يستخدم الفهرس")
+            return True
+        print(f"❌ خطة الاستعلام لا تستخدم الفهرس: {details}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الفهارس: {e}")
+        return False
+
+def test_conversation_manager_with_store():
+    """Test ConversationManager scoped to a session"""
+    print("\n💬 اختبار مدير المحادثة مع الجلسات...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        from session_store import SessionStore
+        from rona_v5_updated import ConversationManager
+
+        store = SessionStore(os.path.join(temp_dir, "sessions.db"))
+        session_a = store.create_session()
+        session_b = store.create_session()
+
+        manager_a = ConversationManager(max_history=3, store=store, session_id=session_a)
+        manager_b = ConversationManager(max_history=3, store=store, session_id=session_b)
+        for i in range(5):
+            manager_a.add_message("user", f"أ {i}")
+        manager_b.add_message("user", "ب 0")
+
+        reloaded = ConversationManager(max_history=3, store=store, session_id=session_a)
+        contents = [m["content"] for m in reloaded.conversation_history]
+        if contents == ["أ 2", "أ 3", "أ 4"] and all("id" in m for m in reloaded.conversation_history):
+            print("✅ تم تحميل آخر الرسائل للجلسة فقط")
+        else:
+            print(f"❌ محتوى غير متوقع: {contents}")
+            return False
+
+        if store.count_messages(session_a) == 5:
+            print("✅ تم الاحتفاظ بكامل تاريخ الجلسة في المخزن")
+        else:
+            print("❌ لم يتم حفظ جميع الرسائل")
+            return False
+
+        if [m["content"] for m in manager_b.conversation_history] == ["ب 0"]:
+            print("✅ الجلسات معزولة عن بعضها")
+        else:
+            print("❌ تداخل بين الجلسات")
+            return False
+
+        store.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار مدير المحادثة: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_agent_memory_and_migration():
+    """Test per-session agent memory and legacy history import"""
+    print("\n📥 اختبار ذاكرة الوكيل واستيراد الملفات القديمة...")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        from session_store import SessionStore
+
+        store = SessionStore(os.path.join(temp_dir, "sessions.db"))
+        store.save_agent_memory("s1", [{"type": "human", "data": {"content": "مرحباً"}}])
+        if store.load_agent_memory("s1")[0]["data"]["content"] == "مرحباً" and store.load_agent_memory("s2") == []:
+            print("✅ ذاكرة الوكيل محفوظة لكل جلسة")
+        else:
+            print("❌ فشل حفظ ذاكرة الوكيل")
+            return False
+
+        legacy_file = os.path.join(temp_dir, "conversation_history.json")
+        with open(legacy_file, 'w', encoding='utf-8') as f:
+            json.dump([
+                {"role": "user", "content": "سؤال", "timestamp": "2024-01-01T00:00:00"},
+                {"role": "assistant", "content": "جواب", "timestamp": "2024-01-01T00:00:01"}
+            ], f, ensure_ascii=False)
+
+        imported = store.import_history_file(legacy_file, "legacy")
+        if imported == 2 and store.count_messages("legacy") == 2:
+            print("✅ تم استيراد المحادثة القديمة")
+            store.close()
+            return True
+        print(f"❌ عدد الرسائل المستوردة: {imported}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاستيراد: {e}")
+        return False
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def main():
+    """Run all session store tests"""
+    print("🚀 بدء اختبارات تخزين الجلسات...")
+
+    tests = [
+        ("الجلسات والرسائل", test_sessions_and_messages),
+        ("استخدام الفهارس", test_indexed_session_lookup),
+        ("مدير المحادثة مع الجلسات", test_conversation_manager_with_store),
+        ("ذاكرة الوكيل والاستيراد", test_agent_memory_and_migration)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
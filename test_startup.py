@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Fast Startup
+اختبار سرعة بدء التشغيل والتحميل المؤجل
+"""
+
+import sys
+import threading
+import time
+
+def test_lazy_imports():
+    """Test that importing the app does not load LangChain or Chroma"""
+    print("📦 اختبار الاستيراد المؤجل...")
+
+    try:
+        from startup_benchmark import run_import
+
+        wall, entries, loaded = run_import("rona_v5_updated")
+        if loaded:
+            print(f"❌ حزم ثقيلة محملة عند الاستيراد: {loaded}")
+            return False
+        print(f"✅ تم استيراد التطبيق في {wall * 1000:.0f} ms بدون حزم ثقيلة ({len(entries)} وحدة)")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الاستيراد المؤجل: {e}")
+        return False
+
+def test_component_loader():
+    """Test background loading, dependencies and readiness states"""
+    print("\n⏳ اختبار تحميل المكونات في الخلفية...")
+
+    try:
+        from lazy_components import ComponentLoader, ComponentFailedError, STATE_READY, STATE_FAILED
+
+        transitions = []
+        lock = threading.Lock()
+
+        def record(name, state):
+            with lock:
+                transitions.append((name, state))
+
+        gate = threading.Event()
+        loader = ComponentLoader(on_state_change=record)
+        loader.add("db", lambda: (gate.wait(5), "db")[1])
+        loader.add("agent", lambda db: f"agent({db})", depends_on=["db"])
+        loader.add("broken", lambda: 1 / 0)
+        loader.add("needs_broken", lambda value: value, depends_on=["broken"])
+
+        started = time.monotonic()
+        loader.start_all()
+        if time.monotonic() - started > 1 or loader.is_ready("agent"):
+            print("❌ التحميل لم يتم في الخلفية")
+            return False
+        print("✅ بدأ التحميل في الخلفية دون انتظار")
+
+        gate.set()
+        if loader.get("agent", timeout=5) != "agent(db)":
+            print("❌ قيمة المكون غير صحيحة")
+            return False
+        print("✅ تم تحميل المكون بعد اعتماده")
+
+        loader.wait("needs_broken", timeout=5)
+        try:
+            loader.get("needs_broken")
+            print("❌ لم يتم الإبلاغ عن فشل الاعتمادية")
+            return False
+        except ComponentFailedError:
+            pass
+
+        states = loader.states()
+        if states["db"] == STATE_READY and states["broken"] == STATE_FAILED \
+                and states["needs_broken"] == STATE_FAILED and ("agent", STATE_READY) in transitions:
+            print(f"✅ حالات الجاهزية صحيحة: {states}")
+            return True
+        print(f"❌ حالات غير متوقعة: {states}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار تحميل المكونات: {e}")
+        return False
+
+def test_importtime_parsing():
+    """Test parsing of -X importtime output and baseline comparison"""
+    print("\n📊 اختبار تحليل نتائج importtime...")
+
+    try:
+        from startup_benchmark import parse_importtime, compare_to_baseline
+
+        sample = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   json.decoder\n"
+            "import time:       250 |        350 | json\n"
+        )
+        entries = parse_importtime(sample)
+        if entries != [("json.decoder", 100, 100, 1), ("json", 250, 350, 0)]:
+            print(f"❌ تحليل غير صحيح: {entries}")
+            return False
+        print("✅ تم تحليل مخرجات importtime")
+
+        baseline = {"import_ms": 100, "wall_ms": 200, "heavy_packages_loaded": []}
+        ok = {"import_ms": 110, "wall_ms": 210, "heavy_packages_loaded": []}
+        slow = {"import_ms": 300, "wall_ms": 210, "heavy_packages_loaded": ["chromadb"]}
+        if not compare_to_baseline(ok, baseline) and len(compare_to_baseline(slow, baseline)) == 2:
+            print("✅ تم اكتشاف التراجع مقارنة بخط الأساس")
+            return True
+        print("❌ مقارنة خط الأساس غير صحيحة")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التحليل: {e}")
+        return False
+
+def main():
+    """Run all startup tests"""
+    print("🚀 بدء اختبارات سرعة بدء التشغيل...")
+
+    tests = [
+        ("الاستيراد المؤجل", test_lazy_imports),
+        ("تحميل المكونات", test_component_loader),
+        ("تحليل importtime", test_importtime_parsing)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Latency Tracing
+اختبار تتبع زمن مراحل المعالجة
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+def trace_path():
+    return os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+
+def test_nested_spans():
+    """Test that nested spans are written with parent links and errors"""
+    print("🧵 اختبار تداخل الـ spans...")
+
+    try:
+        import tracing
+
+        path = trace_path()
+        tracing.configure(path)
+        try:
+            with tracing.trace("turn", session_id="s1"):
+                with tracing.span("retrieval.similarity_search", k=2) as search_span:
+                    time.sleep(0.02)
+                    search_span.set(results=2)
+                try:
+                    with tracing.span("persist.append_message"):
+                        raise IOError("disk full")
+                except IOError:
+                    pass
+            tracing.flush()
+        finally:
+            tracing.configure(None)
+
+        spans = {record["name"]: record for record in tracing.read_spans(path)}
+        turn = spans["turn"]
+        search = spans["retrieval.similarity_search"]
+        persist = spans["persist.append_message"]
+
+        if search["parent_id"] != turn["span_id"] or search["trace_id"] != turn["trace_id"]:
+            print(f"❌ روابط غير صحيحة بين الـ spans: {spans}")
+            return False
+        if search["duration_ms"] < 15 or search["attrs"] != {"k": 2, "results": 2}:
+            print(f"❌ span البحث غير صحيح: {search}")
+            return False
+        if "disk full" not in persist.get("error", ""):
+            print(f"❌ لم يُسجل الخطأ: {persist}")
+            return False
+        print("✅ تم تسجيل الـ spans المتداخلة والأخطاء")
+        return True
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التداخل: {e}")
+        return False
+
+def test_disabled_is_noop():
+    """Test that nothing is recorded while tracing is off"""
+    print("\n💤 اختبار التعطيل...")
+
+    try:
+        import tracing
+
+        tracing.configure(None)
+
+        @tracing.traced("ui.render")
+        def render(value):
+            return value * 2
+
+        with tracing.trace("turn") as root:
+            root.set(ignored=True)
+            result = render(21)
+
+        if not tracing.is_enabled() and result == 42 and tracing.callback_handler() is None:
+            print("✅ التتبع المعطل لا يسجل شيئاً")
+            return True
+        print("❌ التتبع المعطل غير صامت")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التعطيل: {e}")
+        return False
+
+def test_agent_callbacks():
+    """Test spans for LLM iterations and tool calls from LangChain callbacks"""
+    print("\n🤖 اختبار spans الوكيل والأدوات...")
+
+    try:
+        import tracing
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        from langchain_core.tools import tool
+
+        @tool
+        def web_search(query: str) -> str:
+            """Search the web"""
+            return f"results for {query}"
+
+        llm = FakeListChatModel(responses=["first", "second"])
+        path = trace_path()
+        tracing.configure(path)
+        try:
+            with tracing.trace("turn"):
+                handler = tracing.callback_handler()
+                config = {"callbacks": [handler]}
+                llm.invoke("hello", config=config)
+                web_search.invoke({"query": "python"}, config=config)
+                llm.invoke("again", config=config)
+            tracing.flush()
+        finally:
+            tracing.configure(None)
+
+        spans = tracing.read_spans(path)
+        names = [record["name"] for record in spans]
+        turn_id = next(record["span_id"] for record in spans if record["name"] == "turn")
+        iterations = [record["attrs"]["iteration"] for record in spans if record["name"] == "agent.llm"]
+
+        if names.count("agent.llm") == 2 and "tool.web_search" in names and iterations == [1, 2] \
+                and all(record["parent_id"] == turn_id for record in spans if record["name"] != "turn"):
+            print("✅ تم تسجيل كل استدعاء للنموذج والأدوات")
+            return True
+        print(f"❌ spans غير متوقعة: {spans}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الوكيل: {e}")
+        return False
+
+def test_summary():
+    """Test p50/p95 per stage and the summary command"""
+    print("\n📊 اختبار ملخص الأزمنة...")
+
+    try:
+        import json
+        import tracing
+
+        spans = [{"trace_id": "t", "name": "agent.llm", "duration_ms": float(ms)} for ms in range(1, 101)]
+        spans.append({"trace_id": "t", "name": "turn", "duration_ms": 500.0})
+        summary = tracing.summarize(spans)
+        llm = summary["agent.llm"]
+        if (llm["count"], llm["p50_ms"], llm["p95_ms"], llm["max_ms"]) != (100, 50.0, 95.0, 100.0):
+            print(f"❌ ملخص غير صحيح: {llm}")
+            return False
+        print("✅ تم حساب p50/p95 بشكل صحيح")
+
+        path = trace_path()
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in spans:
+                f.write(json.dumps(record) + "\n")
+            f.write("not json\n")
+        if tracing.main(["summary", path]) == 0 and tracing.main(["summary", path + ".missing"]) == 1:
+            print("✅ أمر الملخص يعمل")
+            return True
+        print("❌ أمر الملخص فشل")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الملخص: {e}")
+        return False
+
+def main():
+    """Run all tracing tests"""
+    print("🚀 بدء اختبارات تتبع الأزمنة...")
+
+    tests = [
+        ("تداخل الـ spans", test_nested_spans),
+        ("التعطيل", test_disabled_is_noop),
+        ("spans الوكيل والأدوات", test_agent_callbacks),
+        ("ملخص الأزمنة", test_summary)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test Turn Queue
+اختبار طابور رسائل المحادثة
+"""
+
+import sys
+import os
+import time
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+
+def test_turns_run_in_order():
+    """Test that queued turns run one at a time in the order they were sent"""
+    print("📨 اختبار ترتيب الرسائل في الطابور...")
+
+    try:
+        from llm_scheduler import LLMScheduler
+        from turn_queue import TurnQueue
+
+        scheduler = LLMScheduler(max_workers=2)
+        events = []
+        lock = threading.Lock()
+
+        def run_turn(turn):
+            with lock:
+                events.append(("start", turn.message))
+            time.sleep(0.05)
+            with lock:
+                events.append(("end", turn.message))
+
+        queue = TurnQueue(scheduler, run_turn)
+        turns = [queue.submit(message, key="turn:a") for message in ["1", "2", "3"]]
+        waiting = queue.pending()
+        for _ in range(100):
+            if not queue.busy:
+                break
+            time.sleep(0.02)
+        scheduler.shutdown()
+
+        expected = [(step, message) for message in ["1", "2", "3"] for step in ("start", "end")]
+        if events == expected and waiting == ["2", "3"] and not queue.busy and not any(t.cancelled for t in turns):
+            print("✅ تم تنفيذ الرسائل بالترتيب دون تداخل")
+            return True
+        print(f"❌ ترتيب غير متوقع: {events} {waiting}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الترتيب: {e}")
+        return False
+
+def test_prefetch_overlaps_generation():
+    """Test that retrieval for waiting turns runs while the current turn generates"""
+    print("\n⚡ اختبار الجلب المسبق أثناء التوليد...")
+
+    try:
+        from llm_scheduler import LLMScheduler
+        from turn_queue import TurnQueue
+
+        scheduler = LLMScheduler(max_workers=2)
+        contexts = {}
+
+        def prefetch(turn):
+            time.sleep(0.2)
+            return f"context:{turn.message}"
+
+        def run_turn(turn):
+            context = turn.prefetch_result()
+            if context is None:
+                context = prefetch(turn)
+                contexts[turn.message] = ("inline", context)
+            else:
+                contexts[turn.message] = ("prefetched", context)
+            time.sleep(0.3)
+
+        queue = TurnQueue(scheduler, run_turn, prefetch=prefetch)
+        started = time.perf_counter()
+        for message in ["1", "2", "3"]:
+            queue.submit(message, key="turn:a")
+        while queue.busy:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        scheduler.shutdown()
+
+        # Sequential retrieval and generation would take 3 * (0.2 + 0.3) = 1.5 seconds
+        sources = {message: source for message, (source, _) in contexts.items()}
+        if sources == {"1": "inline", "2": "prefetched", "3": "prefetched"} and elapsed < 1.25:
+            print(f"✅ تم جلب السياق مسبقاً للرسائل المنتظرة ({elapsed:.2f} ثانية بدلاً من 1.5)")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {contexts} بعد {elapsed:.2f} ثانية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الجلب المسبق: {e}")
+        return False
+
+def test_cancel_all_and_resume():
+    """Test that stopping cancels the running turn, drops waiting ones and leaves the queue usable"""
+    print("\n⏹️ اختبار إيقاف الطابور واستئنافه...")
+
+    try:
+        import cancellation
+        from llm_scheduler import LLMScheduler
+        from turn_queue import TurnQueue
+
+        scheduler = LLMScheduler(max_workers=1)
+        started = threading.Event()
+        finished = []
+        changes = []
+
+        def run_turn(turn):
+            if turn.message == "slow":
+                started.set()
+                token = cancellation.current_token()
+                while True:
+                    token.raise_if_cancelled()
+                    time.sleep(0.01)
+            finished.append(turn.message)
+
+        queue = TurnQueue(scheduler, run_turn, prefetch=lambda turn: turn.message,
+                          on_change=lambda queue: changes.append(queue.busy))
+        queue.submit("slow", key="turn:a")
+        waiting = [queue.submit(message, key="turn:a") for message in ["b", "c"]]
+        started.wait(2)
+        dropped = queue.cancel_all()
+        for _ in range(100):
+            if not queue.busy:
+                break
+            time.sleep(0.02)
+        idle_after_cancel = not queue.busy
+
+        queue.submit("after", key="turn:a")
+        for _ in range(100):
+            if not queue.busy:
+                break
+            time.sleep(0.02)
+        scheduler.shutdown()
+
+        if dropped == 2 and idle_after_cancel and finished == ["after"] \
+                and all(turn.cancelled for turn in waiting) and changes[-1] is False:
+            print("✅ تم إيقاف الرسالة الجارية وإلغاء المنتظرة ثم استئناف الطابور")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {dropped} {idle_after_cancel} {finished}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الإيقاف: {e}")
+        return False
+
+class CountingFixtureHandler(SimpleHTTPRequestHandler):
+    """Serve the recorded search pages and count the requests"""
+
+    requests_served = 0
+    delay = 0.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def do_GET(self):
+        CountingFixtureHandler.requests_served += 1
+        time.sleep(CountingFixtureHandler.delay)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+def test_web_prefetch_shared_with_tool():
+    """Test that a prefetched web search is reused once by another InternetSearch"""
+    print("\n🌐 اختبار مشاركة نتائج البحث المسبق...")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingFixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        from internet_search import InternetSearch
+
+        url = "http://%s:%d/google.html?q={}" % server.server_address[:2]
+        prefetcher, tool_search = InternetSearch(), InternetSearch()
+        prefetcher.search_engines['google'] = tool_search.search_engines['google'] = url
+
+        CountingFixtureHandler.requests_served = 0
+        prefetched = prefetcher.prefetch("Python  release").result(timeout=30)
+        reused = tool_search.search_web("python release")
+        after_reuse = CountingFixtureHandler.requests_served
+        tool_search.search_web("python release")
+        after_second = CountingFixtureHandler.requests_served
+
+        if prefetched and reused == prefetched and after_reuse == 1 and after_second == 2:
+            print("✅ استخدمت أداة البحث النتائج المجلوبة مسبقاً مرة واحدة")
+            return True
+        print(f"❌ نتيجة غير متوقعة: {len(prefetched)} {len(reused)} {after_reuse} {after_second}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار البحث المسبق: {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_web_prefetch_wait_bounded():
+    """Test that a slow prefetch falls back to a live search and honours cancellation"""
+    print("\n⏱️ اختبار مهلة انتظار البحث المسبق...")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingFixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    original_timeout = None
+    try:
+        import cancellation
+        import internet_search
+        from internet_search import InternetSearch
+
+        original_timeout = internet_search.PREFETCH_WAIT_TIMEOUT
+        search = InternetSearch()
+        search.search_engines['google'] = "http://%s:%d/google.html?q={}" % server.server_address[:2]
+
+        # A prefetch slower than the wait timeout is not waited for
+        CountingFixtureHandler.requests_served = 0
+        CountingFixtureHandler.delay = 1.0
+        internet_search.PREFETCH_WAIT_TIMEOUT = 0.2
+        search.prefetch("slow prefetch")
+        results = search.search_web("slow prefetch")
+        if results and CountingFixtureHandler.requests_served == 2:
+            print("✅ تم البحث مباشرة بعد انتهاء مهلة البحث المسبق")
+        else:
+            print(f"❌ نتيجة غير متوقعة: {len(results)} {CountingFixtureHandler.requests_served}")
+            return False
+
+        # Cancelling the turn stops the wait straight away
+        internet_search.PREFETCH_WAIT_TIMEOUT = 30
+        token = cancellation.CancellationToken()
+        search.prefetch("cancelled prefetch")
+        threading.Timer(0.2, token.cancel).start()
+        started = time.monotonic()
+        try:
+            with cancellation.use_token(token):
+                search.search_web("cancelled prefetch")
+            print("❌ لم يتوقف الانتظار عند الإلغاء")
+            return False
+        except cancellation.OperationCancelled:
+            elapsed = time.monotonic() - started
+
+        if elapsed < 0.8:
+            print(f"✅ توقف الانتظار عند الإلغاء بعد {elapsed:.2f} ثانية")
+            return True
+        print(f"❌ استغرق الإلغاء {elapsed:.2f} ثانية")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار مهلة البحث المسبق: {e}")
+        return False
+    finally:
+        CountingFixtureHandler.delay = 0.0
+        if original_timeout is not None:
+            internet_search.PREFETCH_WAIT_TIMEOUT = original_timeout
+        server.shutdown()
+        server.server_close()
+
+def main():
+    """Run all turn queue tests"""
+    print("🚀 بدء اختبارات طابور الرسائل...")
+
+    tests = [
+        ("ترتيب الرسائل", test_turns_run_in_order),
+        ("الجلب المسبق", test_prefetch_overlaps_generation),
+        ("الإيقاف والاستئناف", test_cancel_all_and_resume),
+        ("مشاركة البحث المسبق", test_web_prefetch_shared_with_tool),
+        ("مهلة البحث المسبق", test_web_prefetch_wait_bounded)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
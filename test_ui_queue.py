@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test UI Event Queue
+اختبار طابور تحديثات الواجهة
+"""
+
+import sys
+import time
+import threading
+import tkinter as tk
+
+class FakeWidget:
+    """Stands in for a Tk widget's after/after_cancel"""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.counter = 0
+
+    def after(self, ms, callback):
+        self.counter += 1
+        self.scheduled[self.counter] = callback
+        return self.counter
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+def test_coalescing_and_order():
+    """Test that keyed updates run once with their latest arguments, in order"""
+    print("🧩 اختبار دمج التحديثات المكررة...")
+
+    try:
+        from ui_queue import UIEventQueue
+
+        queue = UIEventQueue(FakeWidget())
+        calls = []
+        queue.post(calls.append, "first")
+        for i in range(100):
+            queue.post(calls.append, f"redraw {i}", key="redraw")
+        queue.post(calls.append, "last")
+        queue.at_frame_end(lambda: calls.append("scroll"), key="scroll")
+        queue.at_frame_end(lambda: calls.append("scroll"), key="scroll")
+        ran = queue.pump()
+
+        if calls == ["first", "redraw 99", "last", "scroll"] and ran == 3 and queue.coalesced == 99:
+            print("✅ تم تنفيذ 100 طلب إعادة رسم مرة واحدة والتمرير مرة واحدة في نهاية الإطار")
+            return True
+        print(f"❌ ترتيب غير متوقع: {calls}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الدمج: {e}")
+        return False
+
+def test_batched_items():
+    """Test that consecutive batch items reach their handler together"""
+    print("\n📦 اختبار تجميع العناصر...")
+
+    try:
+        from ui_queue import UIEventQueue
+
+        queue = UIEventQueue(FakeWidget())
+        calls = []
+        for i in range(3):
+            queue.post_batch(calls.append, i, key="notices")
+        queue.post(calls.append, "between")
+        queue.post_batch(calls.append, 3, key="notices")
+        queue.pump()
+
+        if calls == [[0, 1, 2], "between", [3]]:
+            print("✅ تم تسليم العناصر المتتالية دفعة واحدة مع الحفاظ على الترتيب")
+            return True
+        print(f"❌ دفعات غير متوقعة: {calls}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التجميع: {e}")
+        return False
+
+def test_posting_from_threads():
+    """Test that updates posted from many threads are all applied on the pump"""
+    print("\n🧵 اختبار النشر من عدة خيوط...")
+
+    try:
+        from ui_queue import UIEventQueue
+
+        queue = UIEventQueue(FakeWidget())
+        received = []
+        pump_threads = set()
+
+        def record(value):
+            received.append(value)
+            pump_threads.add(threading.get_ident())
+
+        def worker(offset):
+            for i in range(1000):
+                queue.post(record, offset + i)
+
+        threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads) or len(queue):
+            queue.budget_seconds = 1.0
+            queue.pump()
+        for thread in threads:
+            thread.join()
+
+        if sorted(received) == list(range(8000)) and pump_threads == {threading.get_ident()}:
+            print("✅ تم تطبيق 8000 تحديث من 8 خيوط على خيط الواجهة فقط")
+            return True
+        print(f"❌ تم استلام {len(received)} تحديث")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار الخيوط: {e}")
+        return False
+
+def test_frame_budget():
+    """Test that a frame stops at its budget and the pump keeps rescheduling itself"""
+    print("\n⏱️ اختبار ميزانية الإطار...")
+
+    try:
+        from ui_queue import UIEventQueue
+
+        widget = FakeWidget()
+        queue = UIEventQueue(widget, budget_seconds=0.02).start()
+        for _ in range(10):
+            queue.post(time.sleep, 0.01)
+        frames = []
+        while len(queue):
+            tick = widget.scheduled.pop(max(widget.scheduled))
+            started = time.perf_counter()
+            tick()
+            frames.append(time.perf_counter() - started)
+        queue.stop()
+
+        if len(frames) >= 3 and max(frames) < 0.06 and not widget.scheduled:
+            print(f"✅ تم توزيع التحديثات على {len(frames)} إطارات، أطولها {max(frames) * 1000:.0f} ميلي ثانية")
+            return True
+        print(f"❌ إطارات غير متوقعة: {frames}")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار ميزانية الإطار: {e}")
+        return False
+
+def make_textbox():
+    root = tk.Tk()
+    root.withdraw()
+    return root, tk.Text(root)
+
+def test_streamed_notices_render_once():
+    """Test that notices posted in one frame take one insert and one scroll"""
+    print("\n🖥️ اختبار عرض التنبيهات المتدفقة...")
+
+    try:
+        from chat_renderer import ChatRenderer
+        from ui_queue import UIEventQueue
+
+        root, textbox = make_textbox()
+        try:
+            queue = UIEventQueue(FakeWidget())
+            scrolls = []
+            renderer = ChatRenderer(textbox, scroll=lambda: queue.at_frame_end(lambda: scrolls.append(1), key="scroll"))
+
+            def show(messages):
+                renderer.extend([{"role": "assistant", "content": message} for message in messages])
+
+            inserts = []
+            original = renderer._text.insert
+            renderer._text.insert = lambda *args: inserts.append(args) or original(*args)
+            worker = threading.Thread(target=lambda: [queue.post_batch(show, f"جزء {i}", key="notices") for i in range(200)])
+            worker.start()
+            worker.join()
+            queue.pump()
+            text = textbox.get("1.0", "end-1c")
+        finally:
+            root.destroy()
+
+        if len(renderer) == 200 and len(inserts) == 1 and len(scrolls) == 1 and "جزء 199" in text:
+            print("✅ تم عرض 200 تنبيه بعملية إدراج واحدة وتمرير واحد")
+            return True
+        print(f"❌ {len(inserts)} عمليات إدراج و {len(scrolls)} تمرير")
+        return False
+
+    except Exception as e:
+        print(f"❌ خطأ في اختبار التنبيهات: {e}")
+        return False
+
+def main():
+    """Run all UI queue tests"""
+    print("🚀 بدء اختبارات طابور الواجهة...")
+
+    tests = [
+        ("دمج التحديثات المكررة", test_coalescing_and_order),
+        ("تجميع العناصر", test_batched_items),
+        ("النشر من عدة خيوط", test_posting_from_threads),
+        ("ميزانية الإطار", test_frame_budget),
+        ("عرض التنبيهات المتدفقة", test_streamed_notices_render_once)
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        results[test_name] = test_func()
+
+    print("\n" + "=" * 50)
+    print("📊 نتائج الاختبارات:")
+    passed = sum(results.values())
+    for test_name, success in results.items():
+        status = "✅ نجح" if success else "❌ فشل"
+        print(f"   {test_name}: {status}")
+    print(f"\n📈 النتيجة النهائية: {passed}/{len(results)} نجح")
+
+    return passed == len(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
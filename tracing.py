@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latency Tracing for Rona_v5
+تتبع زمن كل مرحلة في معالجة الرسائل لرونا
+
+Spans mark how long each stage of a turn takes (retrieval, each LLM call of the
+agent loop, tool calls, web requests, persistence and UI rendering). Finished
+spans are appended to a JSONL file by a background writer, and
+`python tracing.py summary` prints p50/p95 per stage.
+
+Tracing is off unless configure() is called or RONA_TRACE_FILE is set; while
+off, span() returns a shared no-op context manager.
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+
+# --- Tracing Configurations ---
+TRACE_FILE_ENV = "RONA_TRACE_FILE"
+DEFAULT_TRACE_FILE = "rona_trace.jsonl"
+
+_current_span = contextvars.ContextVar("rona_current_span", default=None)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class TraceWriter:
+    """Append span records to a JSONL file from a background thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            # Drain whatever else is waiting so a burst becomes one write
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for item in batch:
+                        if item is not None:
+                            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            except IOError as e:
+                print(f"⚠️ Could not write trace file: {str(e)[:100]}")
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued span has been written"""
+        done = threading.Event()
+
+        def wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+
+def configure(path=DEFAULT_TRACE_FILE):
+    """Start writing spans to a JSONL file; pass None to turn tracing off"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.flush()
+        _writer = TraceWriter(path) if path else None
+    return _writer
+
+
+def is_enabled():
+    return _writer is not None
+
+
+def flush(timeout=5.0):
+    if _writer is not None:
+        return _writer.flush(timeout)
+    return True
+
+
+class Span:
+    """One timed stage; used as a context manager"""
+
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "_started", "_token")
+
+    def __init__(self, name, attrs, parent=None, trace_id=None):
+        parent = parent if parent is not None else _current_span.get()
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = trace_id or (parent.trace_id if parent is not None else uuid.uuid4().hex)
+        self.start = None
+        self._started = None
+        self._token = None
+
+    def set(self, **attrs):
+        """Attach attributes known only after the span started"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.finish(error=exc)
+        return False
+
+    def begin(self):
+        """Start the span without making it current (for callback-driven spans)"""
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def finish(self, error=None):
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {str(error)[:100]}"
+        writer = _writer
+        if writer is not None:
+            writer.write(record)
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is off"""
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attrs):
+    """Time a block of code as a child of the current span"""
+    if _writer is None:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def trace(name, **attrs):
+    """Start a new trace (one conversation turn) with a root span"""
+    if _writer is None:
+        return _NOOP_SPAN
+    return Span(name, attrs, trace_id=uuid.uuid4().hex)
+
+
+def traced(name):
+    """Decorator that wraps every call of a function in a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _writer is None:
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def callback_handler():
+    """Return a LangChain callback handler that records LLM and tool spans, or None when off"""
+    if _writer is None:
+        return None
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TracingCallbackHandler(BaseCallbackHandler):
+        """Turns LangChain LLM and tool callbacks into spans under the current span"""
+
+        def __init__(self, parent):
+            self.parent = parent
+            self.iteration = 0
+            self.spans = {}
+
+        def _start(self, run_id, name, attrs):
+            self.spans[run_id] = Span(name, attrs, parent=self.parent).begin()
+
+        def _end(self, run_id, error=None, **attrs):
+            active = self.spans.pop(run_id, None)
+            if active is not None:
+                active.set(**attrs)
+                active.finish(error=error)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self.iteration += 1
+            self._start(run_id, "agent.llm", {"iteration": self.iteration})
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self.iteration += 1
+            self._start(run_id, "agent.llm", {"iteration": self.iteration})
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            usage = {}
+            try:
+                message = response.generations[0][0].message
+                metadata = getattr(message, "usage_metadata", None) or {}
+                usage = {"input_tokens": metadata.get("input_tokens"), "output_tokens": metadata.get("output_tokens")}
+            except (AttributeError, IndexError):
+                pass
+            self._end(run_id, **{key: value for key, value in usage.items() if value is not None})
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error=error)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            tool_name = (serialized or {}).get("name", "tool")
+            self._start(run_id, f"tool.{tool_name}", {"iteration": self.iteration})
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self._end(run_id)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error=error)
+
+    return TracingCallbackHandler(_current_span.get())
+
+
+def read_spans(path=DEFAULT_TRACE_FILE):
+    """Load span records from a trace file, skipping malformed lines"""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered), math.ceil(fraction * len(ordered))) - 1)
+    return ordered[index]
+
+
+def summarize(spans):
+    """Return count, p50, p95, max and total duration per span name"""
+    durations = {}
+    for record in spans:
+        durations.setdefault(record["name"], []).append(record["duration_ms"])
+    summary = {}
+    for name, values in durations.items():
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50), 1),
+            "p95_ms": round(percentile(values, 0.95), 1),
+            "max_ms": round(max(values), 1),
+            "total_ms": round(sum(values), 1),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'المرحلة':<36} {'العدد':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    print("-" * 78)
+    for name, stats in sorted(summary.items(), key=lambda item: item[1]["total_ms"], reverse=True):
+        print(f"{name:<36} {stats['count']:>7} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} {stats['max_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize Rona_v5 latency traces")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subcommands.add_parser("summary", help="print p50/p95 per stage")
+    summary_parser.add_argument("file", nargs="?", default=os.environ.get(TRACE_FILE_ENV, DEFAULT_TRACE_FILE))
+    summary_parser.add_argument("--trace-id", help="only spans of one turn")
+    summary_parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    try:
+        spans = read_spans(args.file)
+    except IOError as e:
+        print(f"❌ لا يمكن قراءة ملف التتبع: {str(e)[:100]}")
+        return 1
+    if args.trace_id:
+        spans = [record for record in spans if record["trace_id"] == args.trace_id]
+    if not spans:
+        print("⚠️ لا توجد بيانات تتبع")
+        return 1
+
+    summary = summarize(spans)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"📊 {len(spans)} span من {len({record['trace_id'] for record in spans})} تتبع\n")
+        print_summary(summary)
+    return 0
+
+
+if os.environ.get(TRACE_FILE_ENV):
+    configure(os.environ[TRACE_FILE_ENV])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
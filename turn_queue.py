@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Turn Queue for Rona_v5
+طابور رسائل المحادثة في رونا
+
+The input box used to be disabled until the reply to the previous message had
+arrived. TurnQueue accepts follow-up messages while a turn is running and runs
+them one at a time, in the order they were sent, so each turn sees the
+conversation and agent memory as the previous turn left them. While a message
+waits, its prefetch (retrieval, web search and processing of pasted text,
+none of which depend on the conversation) already runs on the LLM scheduler at
+PRIORITY_PREFETCH, so that I/O overlaps with the generation of the turns ahead
+of it.
+"""
+
+import collections
+import threading
+import time
+
+import metrics
+from llm_scheduler import PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, SchedulerFullError
+
+
+class QueuedTurn:
+    """One user message waiting for, or getting, its reply"""
+
+    def __init__(self, message, key, attachment=None):
+        self.message = message
+        self.key = key
+        self.attachment = attachment
+        self.queued_at = time.monotonic()
+        self.prefetched = None
+        self.future = None
+        self.cancelled = False
+
+    def prefetch_result(self):
+        """Return what the prefetch produced, or None to do the work inline
+
+        A prefetch that has not started yet is cancelled rather than waited
+        for, since it may be queued behind this very turn.
+        """
+        if self.prefetched is None or self.prefetched.cancel():
+            metrics.record_cache("turn_prefetch", False)
+            return None
+        try:
+            result = self.prefetched.result()
+        except BaseException as e:
+            print(f"Turn prefetch failed: {str(e)[:100]}")
+            result = None
+        metrics.record_cache("turn_prefetch", result is not None)
+        return result
+
+
+class TurnQueue:
+    """Runs the turns of a conversation on the LLM scheduler one at a time
+
+    run_turn(turn) is called on a scheduler worker with the turn's
+    cancellation token current. prefetch(turn) is called on a scheduler
+    worker for turns that have to wait. on_change(queue) is called from any
+    thread whenever the running or waiting turns change, and on_dropped(turn)
+    when a waiting turn cannot be started because the scheduler is full; post
+    them to the UI queue before touching widgets.
+    """
+
+    def __init__(self, scheduler, run_turn, prefetch=None, on_change=None, on_dropped=None,
+                 priority=PRIORITY_INTERACTIVE):
+        self.scheduler = scheduler
+        self.run_turn = run_turn
+        self.prefetch = prefetch
+        self.on_change = on_change
+        self.on_dropped = on_dropped
+        self.priority = priority
+        self._pending = collections.deque()
+        self._active = None
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self):
+        """Whether a turn is running or waiting"""
+        with self._lock:
+            return self._active is not None or bool(self._pending)
+
+    @property
+    def active(self):
+        with self._lock:
+            return self._active
+
+    def pending(self):
+        """Return the messages waiting behind the running turn, in order"""
+        with self._lock:
+            return [turn.message for turn in self._pending]
+
+    def submit(self, message, key, attachment=None):
+        """Queue a message, with pasted text to process alongside it, and return its QueuedTurn
+
+        The turn starts right away when the queue is idle; SchedulerFullError
+        is raised then if the scheduler has no room for it.
+        """
+        turn = QueuedTurn(message, key, attachment)
+        with self._lock:
+            idle = self._active is None
+            if idle:
+                self._active = turn
+            else:
+                self._pending.append(turn)
+
+        if idle:
+            try:
+                self._start(turn)
+            except SchedulerFullError:
+                with self._lock:
+                    self._active = None
+                raise
+        elif self.prefetch is not None:
+            try:
+                turn.prefetched = self.scheduler.submit(self.prefetch, turn, priority=PRIORITY_PREFETCH)
+            except SchedulerFullError:
+                # The turn does its own preparation when it starts
+                pass
+        self._changed()
+        return turn
+
+    def cancel_all(self):
+        """Stop the running turn and drop the waiting ones; return how many were dropped"""
+        with self._lock:
+            dropped = list(self._pending)
+            self._pending.clear()
+            active = self._active
+
+        for turn in dropped:
+            turn.cancelled = True
+            if turn.prefetched is not None:
+                turn.prefetched.cancel()
+        if active is not None and not active.cancelled:
+            active.cancelled = True
+            # Cancelling the token aborts open web requests and closes the stream to Ollama
+            self.scheduler.cancel(active.key)
+        self._changed()
+        return len(dropped)
+
+    def _start(self, turn):
+        turn.future = self.scheduler.submit(self.run_turn, turn, priority=self.priority, key=turn.key)
+        # Also called when the turn is cancelled before a worker has picked it up
+        turn.future.add_done_callback(lambda future: self._finished(turn))
+
+    def _finished(self, turn):
+        """Hand the next waiting turn to the scheduler once the running one is over"""
+        while True:
+            with self._lock:
+                if self._active is not turn:
+                    return
+                if not self._pending:
+                    self._active = None
+                    break
+                turn = self._active = self._pending.popleft()
+            try:
+                self._start(turn)
+                break
+            except SchedulerFullError:
+                # Workers cannot wait for room without risking a deadlock, so the turn is dropped
+                turn.cancelled = True
+                if self.on_dropped is not None:
+                    self.on_dropped(turn)
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+UI Event Queue for Rona_v5
+طابور تحديثات واجهة رونا
+
+Worker threads must not touch Tk widgets. Instead of each of them calling
+widget.after(0, ...) several times per turn, they post updates to one queue
+that a single periodic `after` pump drains on the UI thread. Within a frame,
+updates posted with the same key are coalesced into one call, consecutive
+batch items are handed to their handler together, and end-of-frame callbacks
+such as scrolling to the end run once after everything else.
+"""
+
+import collections
+import time
+
+import metrics
+
+# --- Queue Configurations ---
+FRAME_INTERVAL_MS = 16
+# Stop applying updates once a frame has taken this long; the rest wait for the next frame
+FRAME_BUDGET_SECONDS = 0.012
+
+_CALL = "call"
+_BATCH = "batch"
+
+
+class UIEventQueue:
+    """Thread-safe queue of UI updates applied by a periodic pump on the UI thread
+
+    post, post_batch and at_frame_end may be called from any thread; pump
+    runs on the UI thread, either from the `after` loop started by start()
+    or directly.
+    """
+
+    def __init__(self, widget, interval_ms=FRAME_INTERVAL_MS, budget_seconds=FRAME_BUDGET_SECONDS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.budget_seconds = budget_seconds
+        # deque.append and popleft are atomic, so posting needs no lock
+        self._incoming = collections.deque()
+        self._plan = collections.deque()
+        self._keyed = {}
+        self._frame_end = {}
+        self._after_id = None
+        self.frames = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._incoming) + len(self._plan)
+
+    def post(self, callback, *args, key=None):
+        """Queue callback(*args) for the next frame
+
+        With a key, calls that are still waiting are coalesced: only the
+        latest arguments are used, at the position of the first call.
+        """
+        self._incoming.append((_CALL, key, callback, args))
+
+    def post_batch(self, handler, item, key):
+        """Queue an item for handler(items); consecutive items for the same key go in one call"""
+        self._incoming.append((_BATCH, key, handler, item))
+
+    def at_frame_end(self, callback, key):
+        """Run callback() once at the end of the next frame, however often it is requested"""
+        self._incoming.append((None, key, callback, None))
+
+    def _drain(self):
+        while self._incoming:
+            kind, key, callback, payload = self._incoming.popleft()
+            if kind is None:
+                self._frame_end[key] = callback
+                continue
+            if kind == _BATCH:
+                last = self._plan[-1] if self._plan else None
+                if last is not None and last[0] == _BATCH and last[1] == key:
+                    last[3].append(payload)
+                    continue
+                self._plan.append([_BATCH, key, callback, [payload]])
+                continue
+            entry = self._keyed.get(key) if key is not None else None
+            if entry is not None:
+                entry[2], entry[3] = callback, payload
+                self.coalesced += 1
+                continue
+            entry = [_CALL, key, callback, payload]
+            self._plan.append(entry)
+            if key is not None:
+                self._keyed[key] = entry
+
+    def _run(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"UI update failed: {str(e)[:100]}")
+
+    def pump(self):
+        """Apply the updates posted so far within the frame budget; return how many ran"""
+        started = time.perf_counter()
+        self._drain()
+        ran = 0
+        while self._plan:
+            if ran and time.perf_counter() - started > self.budget_seconds:
+                break
+            kind, key, callback, payload = self._plan.popleft()
+            if kind == _CALL and key is not None:
+                self._keyed.pop(key, None)
+            if kind == _BATCH:
+                self._run(callback, payload)
+            else:
+                self._run(callback, *payload)
+            ran += 1
+        # Pick up end-of-frame requests made by the updates that just ran
+        self._drain()
+        frame_end, self._frame_end = self._frame_end, {}
+        for callback in frame_end.values():
+            self._run(callback)
+        if ran or frame_end:
+            self.frames += 1
+            metrics.UI_FRAME_SECONDS.observe(time.perf_counter() - started)
+        return ran
+
+    def _tick(self):
+        self._after_id = None
+        self.pump()
+        self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def start(self):
+        """Start pumping the queue every interval_ms on the widget's event loop"""
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None